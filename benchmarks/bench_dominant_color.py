@@ -0,0 +1,78 @@
+"""
+Compares the thumbnail color computation against the original implementation.
+
+Runs offline on generated JPEG thumbnails at the sizes YouTube serves.
+
+Usage: python -m benchmarks.bench_dominant_color [--repeat N]
+"""
+import argparse
+import io
+import random
+import timeit
+import warnings
+
+from PIL import Image
+
+from bot.utils.dominant_color import compute_dominant_color
+
+# (name, width, height) of common YouTube thumbnail variants
+THUMBNAIL_SIZES = [
+    ("default", 120, 90),
+    ("hqdefault", 480, 360),
+    ("maxresdefault", 1280, 720),
+]
+
+
+def legacy_dominant_color(data):
+    """
+    The original implementation: resize to 50x50, then average the pixels in Python.
+    """
+    image = Image.open(io.BytesIO(data))
+    image = image.convert("RGB")
+    image = image.resize((50, 50))
+
+    pixels = list(image.getdata())
+    avg_color = tuple(sum(x) // len(x) for x in zip(*pixels))
+
+    return (avg_color[0] << 16) + (avg_color[1] << 8) + avg_color[2]
+
+
+def make_thumbnail(width, height, seed=0):
+    """
+    Builds a noisy JPEG so the decoder has realistic work to do.
+    """
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width // 8, height // 8))
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(image.width * image.height)])
+    image = image.resize((width, height), Image.Resampling.BILINEAR)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per measurement (default: 200)")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", DeprecationWarning)  # Image.getdata, used by the legacy implementation
+
+    implementations = [
+        ("legacy", legacy_dominant_color),
+        ("average", lambda data: compute_dominant_color(data, "average")),
+        ("dominant", lambda data: compute_dominant_color(data, "dominant")),
+    ]
+
+    print(f"{'thumbnail':<14} {'size':>10} " + " ".join(f"{name:>12}" for name, _ in implementations))
+    for name, width, height in THUMBNAIL_SIZES:
+        data = make_thumbnail(width, height)
+        timings = []
+        for _, func in implementations:
+            seconds = min(timeit.repeat(lambda: func(data), number=args.repeat, repeat=3)) / args.repeat
+            timings.append(f"{seconds * 1000:>10.3f}ms")
+        print(f"{name:<14} {f'{width}x{height}':>10} " + " ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Measures the handoff between two songs: the original blocking track-end callback
+against the event based one.
+
+Runs the real Music cog against an in-process stand-in for discord's voice client:
+each song "plays" on its own thread for --song-ms, then the after callback runs on
+that thread, as in discord.AudioPlayer. Thumbnail color lookups and message sends
+are simulated with --network-ms of latency each. Next sources are prefetched.
+
+Reports, per song change:
+- gap: from the end of a song to the start of the next one
+- player thread held: how long the after callback keeps the player thread busy
+  (the finished song's ffmpeg process is only cleaned up after that)
+
+Usage: python -m benchmarks.bench_handoff [--songs 20] [--song-ms 50] [--network-ms 150]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from bot.cogs.music_cog import Music
+
+
+class FakeSource(discord.AudioSource):
+    def read(self):
+        return b""
+
+
+class FakeVoice:
+    """
+    Plays sources the way discord.AudioPlayer does, without audio: one thread per
+    song, calling `after` on that thread once the song is over, then cleaning up.
+    """
+
+    def __init__(self, guild, song_seconds, stats):
+        self.guild = guild
+        self.channel = SimpleNamespace(id=1, members=[SimpleNamespace(bot=False)], bitrate=64000)
+        self.song_seconds = song_seconds
+        self.stats = stats
+        self._playing = False
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self._playing
+
+    def is_paused(self):
+        return False
+
+    def stop(self):
+        self._playing = False
+
+    def play(self, source, after=None):
+        self.stats['started'].append(time.perf_counter())
+        self._playing = True
+        threading.Thread(target=self._run, args=(after,), daemon=True).start()
+
+    def _run(self, after):
+        time.sleep(self.song_seconds)
+        self._playing = False
+        self.stats['ended'].append(time.perf_counter())
+        after(None)
+        self.stats['held'].append(time.perf_counter() - self.stats['ended'][-1])
+
+
+def legacy_prepare_continue_queue(self, ctx, error=None):
+    """
+    The original track-end callback: blocks the player thread until continue_queue,
+    including the "Now playing" message, is done.
+    """
+    fut = asyncio.run_coroutine_threadsafe(self.legacy_continue_queue(ctx), self.bot.loop)
+    try:
+        fut.result()
+    except Exception as e:
+        print(repr(e))
+
+
+async def legacy_continue_queue(self, ctx):
+    """
+    The original continue_queue ordering: the message is sent before returning.
+    """
+    await Music.continue_queue(self, ctx)
+    await asyncio.gather(*self.background_tasks)
+
+
+async def run(handoff, songs, song_seconds, network_seconds):
+    stats = {'started': [], 'ended': [], 'held': []}
+    guild = SimpleNamespace(id=1)
+    voice = FakeVoice(guild, song_seconds, stats)
+    guild.voice_client = voice
+
+    async def slow_network(*args, **kwargs):
+        await asyncio.sleep(network_seconds)
+        return 0
+
+    bot = commands.Bot(command_prefix=".", intents=discord.Intents.none())
+    bot.loop = asyncio.get_running_loop()  # Normally set when the bot logs in
+    bot.get_channel = lambda channel_id: voice.channel
+    bot._connection._voice_clients[guild.id] = voice
+    music = Music(bot)
+    music.colors.get = slow_network
+
+    async def create_source(session, music_, reason):
+        return FakeSource()
+    music.create_source = create_source
+
+    if handoff == "legacy":
+        music.prepare_continue_queue = legacy_prepare_continue_queue.__get__(music)
+        music.legacy_continue_queue = legacy_continue_queue.__get__(music)
+
+    finished = asyncio.Event()
+
+    async def send(*args, **kwargs):
+        if kwargs.get('embed') is None:  # "Queue has ended"
+            finished.set()
+        await asyncio.sleep(network_seconds)
+
+    ctx = SimpleNamespace(guild=guild, channel=None, author=SimpleNamespace(id=1), send=send)
+
+    session = music.sessions.create(guild.id, voice.channel.id)
+    for i in range(songs):
+        session.q.enqueue(f"Song {i}", f"https://stream/{i}", "", f"https://youtube/{i}", 1, 1)
+    music.start_playback(ctx, session, voice, FakeSource())
+
+    await finished.wait()
+    while len(stats['held']) < songs:  # Player threads still blocked in the after callback
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*music.background_tasks)
+    music.idle.close()
+    music.resolver.shutdown()
+    await music.colors.close()
+
+    gaps = [start - end for end, start in zip(stats['ended'], stats['started'][1:])]
+    return gaps, stats['held']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, default=20)
+    parser.add_argument("--song-ms", type=float, default=50)
+    parser.add_argument("--network-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    print(f"{'handoff':<8} {'gap p50':>10} {'gap max':>10} {'held p50':>10} {'held max':>10}")
+    for handoff in ("legacy", "event"):
+        gaps, held = asyncio.run(run(handoff, args.songs, args.song_ms / 1000, args.network_ms / 1000))
+        print(
+            f"{handoff:<8} {statistics.median(gaps) * 1000:>8.2f}ms {max(gaps) * 1000:>8.2f}ms "
+            f"{statistics.median(held) * 1000:>8.2f}ms {max(held) * 1000:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
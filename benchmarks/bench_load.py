@@ -0,0 +1,189 @@
+"""
+Load test of the Music cog with hundreds of simulated guilds, fully offline.
+
+Runs the real cog against the stand-ins of benchmarks/standins.py: canned yt-dlp
+metadata, silent Opus sources instead of ffmpeg, and a stub Discord client whose
+REST calls take --network-ms. Each guild is one user issuing a random mix of
+commands with --think-ms (mean) between them, for --duration seconds.
+
+Reports:
+- command latency: p50/p95/p99 per command
+- time to first audio of play requests (see bot.utils.tracing)
+- event loop lag: how late a 10 ms timer fires
+- inter-track gap: from the end of a song to the start of the next one
+- memory: resident set size before and after the run
+
+Usage: python -m benchmarks.bench_load [--guilds 200] [--duration 60] [--mix play=50,skip=15,queue=20,search=10,pick=5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+
+from benchmarks.standins import Latency, Simulation, SongPool
+from bot.utils.tracing import TRACER, percentile
+
+# Interval (seconds) of the event loop lag probe.
+LAG_PROBE_INTERVAL = 0.01
+
+# Words search queries are made of; a small vocabulary makes users repeat each other's queries.
+WORDS = ("love", "night", "summer", "dance", "rain", "fire", "heart", "city", "dream", "blue", "road", "gold")
+
+
+def rss_mb():
+    """
+    Returns the resident set size of the process in MB (Linux only).
+    """
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+
+
+def offline_environment():
+    """
+    Keeps the simulation away from the real track catalog, command trace and voice workers, and quiets the logs.
+    """
+    os.environ["TRACK_CATALOG_PATH"] = ""
+    os.environ["COMMAND_TRACE_PATH"] = ""
+    os.environ["VOICE_WORKERS"] = "0"
+    logging.basicConfig(level=logging.WARNING)
+
+
+def parse_mix(text):
+    """
+    Parses "play=50,skip=15" into ([commands], [weights]).
+    """
+    pairs = [item.split("=") for item in text.split(",") if item]
+    return [name for name, _ in pairs], [float(weight) for _, weight in pairs]
+
+
+async def probe_lag(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_PROBE_INTERVAL
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lags.append(loop.time() - expected)
+
+
+async def run_guild(simulation, guild_id, args, names, weights, latencies, errors, deadline):
+    rng = random.Random(args.seed * 100003 + guild_id)
+    await asyncio.sleep(rng.uniform(0, args.think_ms / 1000))  # Spread the first commands
+    while time.perf_counter() < deadline:
+        command = rng.choices(names, weights)[0]
+        argument = f"{rng.choice(WORDS)} {rng.choice(WORDS)}" if command in ("play", "search", "pick") else None
+        try:
+            latencies[command].append(await simulation.invoke(guild_id, guild_id, command, argument))
+        except Exception as e:
+            errors[f"{command}: {type(e).__name__}: {e}"] += 1
+        await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+
+async def measure(simulation, workload):
+    """
+    Runs a workload against a started simulation, then closes it.
+
+    :param simulation: Simulation
+    :param workload: async function taking (latencies, errors): command -> list of seconds,
+        error message -> count, which it fills.
+    :return: dict - Measurements, to pass to report().
+    """
+    rss_before = rss_mb()
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lags = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(probe_lag(lags, stop))
+
+    started = time.perf_counter()
+    await workload(latencies, errors)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+
+    results = {
+        'elapsed': elapsed,
+        'latencies': latencies,
+        'errors': errors,
+        'lags': lags,
+        'gaps': simulation.gaps(),
+        'songs': sum(1 for _, event, _ in simulation.events if event == "start"),
+        'rss': (rss_before, rss_mb()),
+    }
+    await simulation.close()
+    return results
+
+
+def ms(values, p):
+    return f"{percentile(values, p) * 1000:>9.1f}"
+
+
+def report(title, results):
+    """
+    Prints the measurements of a run.
+    """
+    latencies, lags, gaps = results['latencies'], results['lags'], results['gaps']
+    elapsed = results['elapsed']
+    total = sum(len(values) for values in latencies.values())
+    print(f"{title}, {elapsed:.1f}s, {total} commands ({total / elapsed:.1f}/s), {results['songs']} songs started")
+    print()
+    print(f"{'command':<12}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for command in sorted(latencies):
+        values = latencies[command]
+        print(f"{command:<12}{len(values):>7}{ms(values, 50)} {ms(values, 95)} {ms(values, 99)}")
+
+    summary = TRACER.summary()
+    print()
+    print(f"{'first audio':<12}{summary['count']:>7}{summary['total'][0] * 1000:>9.1f} {summary['total'][1] * 1000:>9.1f}")
+    print(f"{'loop lag':<12}{len(lags):>7}{ms(lags, 50)} {ms(lags, 95)} {ms(lags, 99)}  max {max(lags, default=0) * 1000:.1f}")
+    print(f"{'track gap':<12}{len(gaps):>7}{ms(gaps, 50)} {ms(gaps, 95)} {ms(gaps, 99)}  max {max(gaps, default=0) * 1000:.1f}")
+    print()
+    rss_before, rss_after = results['rss']
+    print(f"RSS {rss_before:.1f} MB -> {rss_after:.1f} MB ({rss_after - rss_before:+.1f} MB)")
+
+    if results['errors']:
+        print()
+        print("Errors:")
+        for error, count in sorted(results['errors'].items(), key=lambda item: -item[1]):
+            print(f"{count:>6}  {error}")
+
+
+async def run(args):
+    names, weights = parse_mix(args.mix)
+    latency = Latency(args.extract_ms / 1000, args.search_ms / 1000, args.source_ms / 1000, args.network_ms / 1000, seed=args.seed)
+    simulation = Simulation(latency, SongPool(args.songs, args.song_seconds))
+    await simulation.start()
+
+    async def workload(latencies, errors):
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(
+            run_guild(simulation, guild_id, args, names, weights, latencies, errors, deadline)
+            for guild_id in range(1, args.guilds + 1)
+        ))
+
+    return await measure(simulation, workload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--mix", default="play=50,skip=15,queue=20,search=10,pick=5", help="command=weight,...")
+    parser.add_argument("--think-ms", type=float, default=3000, help="mean pause between two commands of a guild")
+    parser.add_argument("--songs", type=int, default=500, help="number of distinct songs")
+    parser.add_argument("--song-seconds", type=float, default=20)
+    parser.add_argument("--extract-ms", type=float, default=800, help="yt-dlp extraction of one song")
+    parser.add_argument("--search-ms", type=float, default=1200, help="yt-dlp search listing")
+    parser.add_argument("--source-ms", type=float, default=150, help="ffmpeg start")
+    parser.add_argument("--network-ms", type=float, default=80, help="Discord REST call or thumbnail download")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    offline_environment()
+    report(f"{args.guilds} guilds", asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compares the cursor-based Queue against the original list.index() based one.
+
+Enqueues N songs, then walks the whole queue the way the bot does at the end of
+each song (theres_next, peek_next, next, current_music, size).
+
+Usage: python -m benchmarks.bench_queue [--sizes 1000 10000 50000]
+"""
+import argparse
+import time
+from collections import namedtuple
+
+from bot.utils.music_utilities import Queue
+
+LegacyMusic = namedtuple('music', ('title', 'url', 'thumb', 'ytube', 'duration', 'user'))
+
+
+class LegacyQueue:
+    """
+    The original queue: advancing looks the current song up with list.index().
+    """
+
+    def __init__(self):
+        self.current_music = LegacyMusic('', '', '', '', '', '')
+        self.queue = []
+
+    def enqueue(self, music_title, music_url, music_thumb, music_ytube, music_duration, music_user):
+        music = LegacyMusic(music_title, music_url, music_thumb, music_ytube, music_duration, music_user)
+        self.queue.append(music)
+        if len(self.queue) == 1:
+            self.current_music = LegacyMusic(*music)
+
+    def next(self):
+        if self.current_music in self.queue:
+            index = self.queue.index(self.current_music) + 1
+            if len(self.queue) - 1 >= index:
+                if self.current_music.title == self.queue[index].title and len(self.queue) - 1 > index + 1:
+                    self.current_music = self.queue[index + 1]
+                else:
+                    self.current_music = self.queue[index]
+
+    def theres_next(self):
+        return self.queue.index(self.current_music) + 1 <= len(self.queue) - 1
+
+    def peek_next(self):
+        if not self.theres_next():
+            return None
+        return self.queue[self.queue.index(self.current_music) + 1]
+
+    def size(self):
+        return len(self.queue)
+
+
+def run(queue_class, size):
+    """
+    Returns (enqueue seconds, walk seconds, songs visited) for one queue.
+    """
+    queue = queue_class()
+
+    started = time.perf_counter()
+    for i in range(size):
+        queue.enqueue(f"Song {i}", f"https://stream/{i}", "https://thumb", f"https://youtube/{i}", 180, 1)
+    enqueued = time.perf_counter()
+
+    visited = 1
+    while queue.theres_next():
+        queue.peek_next()
+        queue.next()
+        queue.current_music.title
+        queue.size()
+        visited += 1
+    walked = time.perf_counter()
+
+    return enqueued - started, walked - enqueued, visited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'queue':<8} {'size':>7} {'enqueue':>12} {'walk':>12} {'per song':>12} {'visited':>8}")
+    for size in args.sizes:
+        for name, queue_class in (("legacy", LegacyQueue), ("cursor", Queue)):
+            enqueue_seconds, walk_seconds, visited = run(queue_class, size)
+            print(
+                f"{name:<8} {size:>7} {enqueue_seconds * 1000:>10.2f}ms {walk_seconds * 1000:>10.2f}ms "
+                f"{walk_seconds / size * 1e6:>10.2f}us {visited:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
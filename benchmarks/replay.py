@@ -0,0 +1,158 @@
+"""
+Replays a command trace recorded by the bot (COMMAND_TRACE_PATH) through the Music
+cog, against the offline stand-ins of benchmarks/standins.py.
+
+Commands are sent at their recorded times, divided by --speed, each guild and
+user of the trace mapped to a simulated one. Unless overridden, the stand-ins
+take the recorded median yt-dlp extraction and search times, and songs last the
+recorded median duration (divided by --speed as well).
+
+Reports the same measurements as bench_load, plus the inter-track gap seen in
+the recording, so changes to caches, pools or scheduling can be compared on
+identical input.
+
+Usage: python -m benchmarks.replay trace.jsonl [--speed 10] [--start 2024-05-03T20:00] [--minutes 30]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+from collections import defaultdict
+
+from benchmarks.bench_load import measure, ms, offline_environment, report
+from benchmarks.standins import Latency, Simulation, SongPool
+
+# Gaps longer than this (seconds) in the recording are a queue that ended and a new play, not a handoff.
+MAX_RECORDED_GAP = 10
+
+
+def load(path, start=None, minutes=None):
+    """
+    Reads the events of a trace, optionally keeping only a time window.
+
+    :param path: str - JSONL trace file.
+    :param start: float or None - Unix time of the start of the window.
+    :param minutes: float or None - Length of the window.
+    :return: list of dict - Events, by time.
+    """
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                events.append(json.loads(line))
+    events.sort(key=lambda event: event['t'])
+
+    if start is not None:
+        events = [event for event in events if event['t'] >= start]
+    if minutes is not None and events:
+        end = (start if start is not None else events[0]['t']) + minutes * 60
+        events = [event for event in events if event['t'] < end]
+    return events
+
+
+def recorded_gaps(events):
+    """
+    Returns the recorded seconds between the end of a song and the start of the next one in the same guild.
+    """
+    gaps = []
+    ended = {}
+    for event in events:
+        if event['ev'] == "end":
+            ended[event.get('guild')] = event['t']
+        elif event['ev'] == "start" and event.get('guild') in ended:
+            gap = event['t'] - ended.pop(event['guild'])
+            if gap <= MAX_RECORDED_GAP:
+                gaps.append(gap)
+    return gaps
+
+
+def recorded_median(events, event_type, key, **match):
+    values = [
+        event[key] for event in events
+        if event['ev'] == event_type and key in event and all(event.get(k) == v for k, v in match.items())
+    ]
+    return statistics.median(values) if values else None
+
+
+async def replay(commands, speed, simulation):
+    guilds = {}  # recorded guild ID -> simulated guild ID
+    users = {}  # recorded user ID -> simulated user ID
+
+    async def workload(latencies, errors):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = commands[0]['t']
+        tasks = []
+
+        async def send(event):
+            guild_id = guilds.setdefault(event.get('guild'), len(guilds) + 1)
+            user_id = users.setdefault(event.get('user'), len(users) + 1)
+            command = event['cmd']
+            try:
+                latencies[command].append(await simulation.invoke(guild_id, user_id, command, event.get('arg')))
+            except Exception as e:
+                errors[f"{command}: {type(e).__name__}: {e}"] += 1
+
+        for event in commands:
+            delay = started + (event['t'] - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(event)))
+        await asyncio.gather(*tasks)
+
+    return await measure(simulation, workload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="JSONL file recorded with COMMAND_TRACE_PATH")
+    parser.add_argument("--speed", type=float, default=1, help="replay speed (10 = ten times faster)")
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat, help="start of the window to replay (local time)")
+    parser.add_argument("--minutes", type=float, help="length of the window to replay")
+    parser.add_argument("--songs", type=int, default=500, help="number of distinct simulated songs")
+    parser.add_argument("--song-seconds", type=float, help="default: recorded median duration")
+    parser.add_argument("--extract-ms", type=float, help="default: recorded median")
+    parser.add_argument("--search-ms", type=float, help="default: recorded median")
+    parser.add_argument("--source-ms", type=float, default=150, help="ffmpeg start")
+    parser.add_argument("--network-ms", type=float, default=80, help="Discord REST call or thumbnail download")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    events = load(args.trace, args.start.timestamp() if args.start else None, args.minutes)
+    commands = [event for event in events if event['ev'] == "command" and event.get('guild') is not None]
+    if not commands:
+        parser.error("no commands to replay in this trace (window)")
+
+    extract_ms = args.extract_ms or recorded_median(events, "resolve", "ms", fn="extract_track", outcome="ok") or 800
+    search_ms = args.search_ms or recorded_median(events, "resolve", "ms", fn="extract_search", outcome="ok") or 1200
+    song_seconds = args.song_seconds or (recorded_median(events, "start", "duration") or 180) / args.speed
+    latency = Latency(extract_ms / 1000, search_ms / 1000, args.source_ms / 1000, args.network_ms / 1000, seed=args.seed)
+
+    counts = defaultdict(int)
+    for event in commands:
+        counts[event['cmd']] += 1
+    span = commands[-1]['t'] - commands[0]['t']
+    print(
+        f"Replaying {len(commands)} commands over {span / 60:.1f} min at {args.speed:g}x "
+        f"({', '.join(f'{command} {count}' for command, count in sorted(counts.items()))})"
+    )
+    print(f"extract {extract_ms:.0f} ms, search {search_ms:.0f} ms, songs {song_seconds:.1f} s")
+    print()
+
+    offline_environment()
+
+    async def run():
+        simulation = Simulation(latency, SongPool(args.songs, song_seconds))
+        await simulation.start()
+        return await replay(commands, args.speed, simulation)
+
+    results = asyncio.run(run())
+    report(f"{len({event.get('guild') for event in commands})} guilds", results)
+
+    gaps = recorded_gaps(events)
+    print(f"{'recorded gap':<12}{len(gaps):>7}{ms(gaps, 50)} {ms(gaps, 95)} {ms(gaps, 99)}  max {max(gaps, default=0) * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    main()
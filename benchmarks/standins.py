@@ -0,0 +1,434 @@
+"""
+Offline stand-ins for Discord, yt-dlp and ffmpeg, used to run the real Music cog
+without network access (see bench_load and replay).
+
+- yt-dlp: StandInYoutubeDL returns canned metadata for a fixed pool of songs after
+  a configurable (blocking) delay, like a real extraction inside the resolver pool.
+- ffmpeg: create_audio_source is replaced by one returning SilentOpusAudio after
+  a configurable delay (process spawn), which yields Opus silence frames.
+- Discord: StandInGuild/StandInVoiceChannel/StandInContext implement the parts of
+  discord.py the cog uses. StandInVoiceClient plays sources on one thread per guild,
+  reading a frame every 20 ms and calling `after` on that thread, as discord.AudioPlayer does.
+  REST calls (messages, reactions, voice connects, thumbnails) take --network-ms.
+"""
+import asyncio
+import datetime
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+import bot.cogs.music_cog as music_cog
+import bot.utils.resolver as resolver
+from bot.utils.query_classifier import classify_query
+
+# Duration (seconds) of one Opus frame, and an Opus frame of silence.
+FRAME_LENGTH = 0.02
+SILENCE_FRAME = b"\xf8\xff\xfe"
+
+
+class Latency:
+    """
+    Delays of the simulated services, in seconds. Each delay is drawn uniformly
+    between half and one and a half times its mean.
+    """
+
+    def __init__(self, extract=0.8, search=1.2, source=0.15, network=0.08, seed=None):
+        self.extract = extract
+        self.search = search
+        self.source = source
+        self.network = network
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # Drawn from resolver threads too
+
+    def draw(self, mean):
+        with self._lock:
+            return mean * self._random.uniform(0.5, 1.5)
+
+    async def sleep(self, mean):
+        await asyncio.sleep(self.draw(mean))
+
+
+class SongPool:
+    """
+    A fixed set of songs that every query resolves to, so repeated queries hit the caches.
+    """
+
+    def __init__(self, size=500, song_seconds=30):
+        self.size = size
+        self.song_seconds = song_seconds
+
+    def video_id(self, key):
+        """
+        Returns the video ID a query or URL resolves to.
+        """
+        index = int(hashlib.sha1(key.encode()).hexdigest(), 16) % self.size
+        return f"sim{index:08d}"  # 11 characters, like a YouTube video ID
+
+    def info(self, video_id, flat=False):
+        """
+        Returns the yt-dlp info dict of a song. Flat (search) entries have no stream URL.
+        """
+        page = f"https://www.youtube.com/watch?v={video_id}"
+        info = {
+            'id': video_id,
+            'title': f"Simulated song {video_id}",
+            'duration': self.song_seconds,
+            'webpage_url': page,
+            'url': page if flat else f"https://stream.invalid/{video_id}?expire={int(time.time()) + 6 * 3600}",
+            'thumbnails': [{'url': f"https://i.invalid/{video_id}.jpg", 'width': 120, 'height': 90}],
+            'uploader': "Simulated channel",
+        }
+        if not flat:
+            info.update(acodec='opus', asr=48000, abr=128)
+        return info
+
+
+class StandInYoutubeDL:
+    """
+    Replaces yt_dlp.YoutubeDL in the resolver. Blocks for the configured delay, then
+    returns canned info dicts. Set `pool` and `latency` on the class before use.
+    """
+
+    pool = SongPool()
+    latency = Latency()
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, target, download=False):
+        flat = bool(self.params.get('extract_flat'))
+        if target.startswith("ytsearch"):
+            prefix, _, query = target.partition(":")
+            limit = int(prefix[len("ytsearch"):] or 1)
+            time.sleep(self.latency.draw(self.latency.search if flat else self.latency.extract))
+            ids = [self.pool.video_id(f"{query}#{i}") for i in range(limit)]
+            return {'entries': [self.pool.info(video_id, flat) for video_id in ids]}
+
+        time.sleep(self.latency.draw(self.latency.extract))
+        video_id = target.rsplit("=", 1)[-1] if "watch?v=" in target else self.pool.video_id(target)
+        return self.pool.info(video_id, flat)
+
+
+class SilentOpusAudio(discord.AudioSource):
+    """
+    Plays `seconds` of Opus silence, standing in for an ffmpeg process.
+    """
+
+    def __init__(self, seconds):
+        self.frames = int(seconds / FRAME_LENGTH)
+
+    def read(self):
+        if self.frames <= 0:
+            return b""
+        self.frames -= 1
+        return SILENCE_FRAME
+
+    def is_opus(self):
+        return True
+
+
+class StandInVoiceClient:
+    """
+    Plays audio sources like discord.VoiceClient, without a voice connection.
+
+    Each song plays on its own thread, which reads a frame every 20 ms and calls
+    `after` on that thread once the source is exhausted or stopped. Song starts
+    and ends are recorded in `events` (shared by all guilds) as
+    (guild ID, "start"/"end", time.perf_counter()).
+    """
+
+    def __init__(self, client, channel, events):
+        self.client = client
+        self.channel = channel
+        self.guild = channel.guild
+        self.events = events
+        self.source = None
+        self._connected = True
+        self._paused = threading.Event()
+        self._ended = None  # Set when the current song ends, before `after` runs
+        self._threads = []
+
+    def is_connected(self):
+        return self._connected
+
+    def is_playing(self):
+        return self._ended is not None and not self._ended.is_set() and not self._paused.is_set()
+
+    def is_paused(self):
+        return self._ended is not None and not self._ended.is_set() and self._paused.is_set()
+
+    def play(self, source, *, after=None):
+        if self.is_playing():
+            raise discord.ClientException("Already playing audio.")
+        self.source = source
+        self._ended = threading.Event()
+        self._paused.clear()
+        self.events.append((self.guild.id, "start", time.perf_counter()))
+        thread = threading.Thread(target=self._run, args=(source, self._ended, after), daemon=True)
+        self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def _run(self, source, ended, after):
+        next_frame = time.perf_counter()
+        while not ended.is_set():
+            if self._paused.is_set():
+                time.sleep(FRAME_LENGTH)
+                next_frame = time.perf_counter()
+                continue
+            if not source.read():
+                break
+            next_frame += FRAME_LENGTH
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+        ended.set()
+        self.events.append((self.guild.id, "end", time.perf_counter()))
+        if after is not None:
+            after(None)
+        source.cleanup()
+
+    def join(self):
+        """
+        Waits for the player threads to finish. Blocking.
+        """
+        for thread in self._threads:
+            thread.join()
+
+    def pause(self):
+        self._paused.set()
+
+    def resume(self):
+        self._paused.clear()
+
+    def stop(self):
+        if self._ended is not None:
+            self._ended.set()
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self, *, force=False):
+        self.stop()
+        self._connected = False
+        self.client._connection._voice_clients.pop(self.guild.id, None)
+        self.guild.me.voice = None
+
+
+class StandInVoiceChannel:
+    def __init__(self, simulation, guild, channel_id):
+        self.simulation = simulation
+        self.guild = guild
+        self.id = channel_id
+        self.bitrate = 64000
+        self.members = [SimpleNamespace(id=guild.id * 10 + 1, bot=False)]
+
+    async def connect(self):
+        await self.simulation.latency.sleep(self.simulation.latency.network)
+        voice = StandInVoiceClient(self.simulation.bot, self, self.simulation.events)
+        self.simulation.bot._connection._voice_clients[self.guild.id] = voice
+        self.guild.me.voice = SimpleNamespace(channel=self)
+        return voice
+
+
+class StandInGuild:
+    def __init__(self, simulation, guild_id):
+        self.id = guild_id
+        self.simulation = simulation
+        self.me = SimpleNamespace(voice=None)
+        self.voice_channel = StandInVoiceChannel(simulation, self, guild_id * 10)
+        self.text_channel = StandInTextChannel(simulation, guild_id * 10 + 2)
+
+    @property
+    def voice_client(self):
+        return self.simulation.bot._connection._voice_clients.get(self.id)
+
+
+class StandInMessage:
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+
+    async def add_reaction(self, emoji):
+        await self.simulation.latency.sleep(self.simulation.latency.network)
+
+    async def edit(self, **kwargs):
+        await self.simulation.latency.sleep(self.simulation.latency.network)
+
+
+class StandInTextChannel:
+    def __init__(self, simulation, channel_id):
+        self.simulation = simulation
+        self.id = channel_id
+
+    async def send(self, content=None, **kwargs):
+        await self.simulation.latency.sleep(self.simulation.latency.network)
+        self.simulation.messages_sent += 1
+        return StandInMessage(self.simulation)
+
+
+class _Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class StandInContext:
+    """
+    The parts of commands.Context used by the Music cog, for a user in the guild's voice channel.
+    """
+
+    def __init__(self, simulation, guild, user_id, command_name):
+        self.bot = simulation.bot
+        self.guild = guild
+        self.channel = guild.text_channel
+        self.author = SimpleNamespace(id=user_id, voice=SimpleNamespace(channel=guild.voice_channel))
+        self.message = StandInMessage(simulation)
+        self.command = simulation.bot.get_command(command_name)
+        self.kwargs = {}
+        self.command_failed = False
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    def typing(self):
+        return _Typing()
+
+
+class Simulation:
+    """
+    A Music cog running against the stand-ins.
+
+    Usage:
+        simulation = Simulation(latency, SongPool())
+        await simulation.start()
+        await simulation.invoke(guild_id, user_id, "play", "some song")
+        await simulation.close()
+    """
+
+    def __init__(self, latency, pool):
+        self.latency = latency
+        self.pool = pool
+        self.events = []  # (guild ID, "start"/"end", time.perf_counter()) of every song
+        self.messages_sent = 0
+        self.guilds = {}
+        self.bot = None
+        self.music = None
+        self._patched = []
+
+    async def start(self):
+        """
+        Installs the yt-dlp and ffmpeg stand-ins and loads the Music cog.
+        """
+        StandInYoutubeDL.pool = self.pool
+        StandInYoutubeDL.latency = self.latency
+        self._patch(resolver, 'youtube_dl', SimpleNamespace(YoutubeDL=StandInYoutubeDL))
+        self._patch(music_cog, 'create_audio_source', self.create_audio_source)
+
+        self.bot = commands.Bot(command_prefix=".", intents=discord.Intents(guilds=True, voice_states=True))
+        self.bot.loop = asyncio.get_running_loop()  # Normally set when the bot logs in
+        self.bot.get_guild = self.guilds.get
+        self.bot.get_channel = self.get_channel
+        await self.bot.add_cog(music_cog.Music(self.bot))
+        self.music = self.bot.get_cog("Music")
+        self.music.handoff_gaps = deque()  # Keep every gap, not just the recent ones
+
+        async def color(*args, **kwargs):
+            await self.latency.sleep(self.latency.network)
+            return 0
+        self.music.colors.get = color
+
+    async def close(self):
+        """
+        Disconnects every guild, unloads the cog and removes the stand-ins.
+        """
+        for session in list(self.music.sessions):
+            self.music.sessions.close(session)  # As .leave does, so ending songs start nothing new
+        for guild in self.guilds.values():
+            voice = guild.voice_client
+            if voice is not None:
+                await voice.disconnect()
+                await asyncio.to_thread(voice.join)
+        await asyncio.sleep(0.1)  # Lets the last track-end handoffs run
+        await asyncio.gather(*self.music.background_tasks, return_exceptions=True)
+        await self.bot.remove_cog("Music")
+        for module, name, value in reversed(self._patched):
+            setattr(module, name, value)
+        self._patched = []
+
+    def _patch(self, module, name, value):
+        self._patched.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    async def create_audio_source(self, url, fmt=None, channel_bitrate=None):
+        await self.latency.sleep(self.latency.source)
+        return SilentOpusAudio(self.pool.song_seconds), "passthrough"
+
+    def get_channel(self, channel_id):
+        guild = self.guilds.get(channel_id // 10)
+        return guild.voice_channel if guild is not None and guild.voice_channel.id == channel_id else None
+
+    def guild(self, guild_id):
+        """
+        Returns the stand-in guild with this ID, creating it if needed. IDs must be positive.
+        """
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = StandInGuild(self, guild_id)
+        return self.guilds[guild_id]
+
+    async def invoke(self, guild_id, user_id, command, argument=None):
+        """
+        Runs a command of the cog as a user in the guild's voice channel.
+
+        Commands: the cog's prefix commands ("play", "skip", "queue", "search", ...),
+        and "pick" which plays a search result. `argument` is then the URL of the song,
+        or a search query whose first result is picked.
+
+        :return: float - Seconds the command took.
+        """
+        guild = self.guild(guild_id)
+        ctx = StandInContext(self, guild, user_id, "play" if command == "pick" else command)
+        started = time.perf_counter()
+        if command == "pick":
+            video_id = classify_query(argument).video_id
+            if video_id is not None:
+                entries = [self.pool.info(video_id, flat=True)]
+            else:
+                entries = await self.music.resolver.search(argument, 20)
+            if entries:
+                await self.music.play_search_result(ctx, resolver.search_result_info(entries[0]))
+        else:
+            if argument is not None:
+                ctx.kwargs['query'] = argument
+            await self.music.cog_before_invoke(ctx)  # As commands.Command.invoke does
+            try:
+                await ctx.command(ctx, **ctx.kwargs)
+            except Exception:
+                ctx.command_failed = True
+                raise
+            finally:
+                await self.music.cog_after_invoke(ctx)
+        return time.perf_counter() - started
+
+    def gaps(self):
+        """
+        Returns the seconds between the end of a song and the start of the next one in the queue.
+
+        :return: list of float
+        """
+        return list(self.music.handoff_gaps)
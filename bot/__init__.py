@@ -4,13 +4,11 @@ __author__ = "estes-sj"
 __license__ = "GNU General Public License v3"
 __version__ = "0.1.0"
 
-# Import the bot instance from main.py
-from .main import bot
-
 # Import cogs
 from .cogs.music_cog import Music
 from .cogs.server_assistant_cog import ServerAssistant
 
 # Import utilities
-from .utils.music_utilities import Queue, Session
+from .utils.music_utilities import Queue, Session, SessionState, Track
+from .utils.session_registry import SessionRegistry
 from .utils.custom_paginator import CustomPaginator
\ No newline at end of file
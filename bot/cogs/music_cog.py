@@ -1,30 +1,54 @@
 import asyncio
-import io
 import logging
 import logging.handlers
+import os
 import re
-
-import requests
+import time
+from collections import Counter, deque
 
 import discord
 from discord.ext import commands
 from discord import app_commands
 
-import yt_dlp as youtube_dl
-from PIL import Image
-
 import bot.utils.custom_paginator as Paginator
+import bot.utils.metrics as Metrics
+import bot.utils.tracing as Tracing
 import bot.utils.music_utilities as Utilities
-
-# List of active sessions.
-sessions = []
-
-# YouTube will sometimes try to disconnect the bot from its servers. Use this to reconnect instantly.
-# (Because of this disconnect/reconnect cycle, sometimes you will listen a sudden and brief stop)
-FFMPEG_OPTIONS = {
-    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-    'options': '-vn'
-}
+from bot.utils.audio_cache import AudioCache
+from bot.utils.audio_source import audio_format, create_audio_source, source_mode
+from bot.utils.command_recorder import CommandRecorder
+from bot.utils.music_utilities import SessionState
+from bot.utils.dominant_color import DEFAULT_COLOR, ColorService, smallest_thumbnail
+from bot.utils.idle_scheduler import IdleScheduler
+from bot.utils.query_classifier import PLAYLIST, SEARCH, classify_query
+from bot.utils.resolver import Resolver, search_result_info
+from bot.utils.session_registry import SessionRegistry
+from bot.utils.suggestions import SuggestionBudget, SuggestionIndex
+from bot.utils.track_cache import STREAM_EXPIRY_MARGIN, TrackCache, stream_url_expiry
+from bot.utils.track_catalog import TrackCatalog
+from bot.utils.voice_workers import VoiceWorkerPool
+
+# Seconds before the current song ends at which the next song's audio source is prepared.
+PREFETCH_SECONDS = float(os.getenv("PREFETCH_SECONDS", "15"))
+
+# Number of playlist songs resolved at the same time when importing a playlist.
+PLAYLIST_WORKERS = int(os.getenv("PLAYLIST_WORKERS", "4"))
+
+# Min seconds between two edits of the playlist import progress message.
+PLAYLIST_PROGRESS_INTERVAL = 2
+
+# Seconds before the bot leaves a voice channel with nothing playing, or with no one (but bots) left.
+IDLE_TIMEOUT = 600
+EMPTY_CHANNEL_TIMEOUT = 60
+
+# /play autocomplete: when the local suggestions have fewer than AUTOCOMPLETE_MIN_LOCAL
+# matches, a small YouTube search is run once the user stops typing for
+# AUTOCOMPLETE_DEBOUNCE seconds, at most AUTOCOMPLETE_SEARCHES_PER_MINUTE per user.
+# The search gets AUTOCOMPLETE_SEARCH_TIMEOUT seconds to fit in Discord's 3 second window.
+AUTOCOMPLETE_MIN_LOCAL = 5
+AUTOCOMPLETE_DEBOUNCE = 0.4
+AUTOCOMPLETE_SEARCH_TIMEOUT = 2.0
+AUTOCOMPLETE_SEARCHES_PER_MINUTE = float(os.getenv("AUTOCOMPLETE_SEARCHES_PER_MINUTE", "6"))
 
 logger = logging.getLogger("discord")
 
@@ -32,6 +56,162 @@ class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+        # Active sessions, shared with other cogs through bot.sessions
+        self.sessions = getattr(bot, "sessions", None)
+        if self.sessions is None:
+            self.sessions = SessionRegistry()
+            bot.sessions = self.sessions
+
+        self.track_cache = TrackCache.from_env()
+        self.catalog = TrackCatalog.from_env()
+        self.recorder = CommandRecorder.from_env()
+        self.resolver = Resolver.from_env(cache=self.track_cache, catalog=self.catalog, recorder=self.recorder)
+        self.colors = ColorService.from_env()
+        self.stream_refreshes = Counter()  # "prefetch"/"just_in_time" -> number of stale stream URLs refreshed
+        self.source_modes = Counter()  # "cached"/"passthrough"/"encode"/"probe" -> number of audio sources created
+        self.audio_cache = AudioCache.from_env()
+        self.voice_workers = VoiceWorkerPool.from_env()  # None: voice connections run in this process
+
+        # Auto-disconnect
+        self.idle = IdleScheduler(self.on_idle_timeout)
+        self.text_channels = {}  # guild ID -> text channel where auto-disconnects are announced
+
+        self.background_tasks = set()  # Song handoffs and announcements in progress
+        self.handoff_gaps = deque(maxlen=256)  # Seconds between the end of a song and the start of the next one
+
+        self.register_metrics()
+
+        # /play autocomplete
+        self.suggestions = SuggestionIndex()
+        self.suggestion_budget = SuggestionBudget(per_minute=AUTOCOMPLETE_SEARCHES_PER_MINUTE)
+        self.autocomplete_requests = {}  # user ID -> token of their latest autocomplete request, to debounce
+
+    async def cog_load(self):
+        """
+        Opens the track catalog when the cog is added, and seeds the /play suggestions from it.
+        Starts the audio cache, the command recorder and the voice workers, if enabled.
+        """
+        if self.voice_workers is not None:
+            await self.voice_workers.start()
+        if self.recorder is not None:
+            await self.recorder.start()
+        if self.audio_cache is not None:
+            await self.audio_cache.start()
+        if self.catalog is not None:
+            await self.catalog.start()
+            for label, value in reversed(await self.catalog.recent()):  # Oldest first, so recent ones are kept
+                self.suggestions.add(label, value)
+
+    async def cog_unload(self):
+        """
+        Stops the auto-disconnect timers, the background tasks, the resolver pool, the color service,
+        the audio cache downloads and the voice workers, and flushes the track catalog and the command
+        trace when the cog is removed.
+        """
+        self.unregister_metrics()
+        self.idle.close()
+        for task in list(self.background_tasks):
+            task.cancel()
+        self.resolver.shutdown()
+        await self.colors.close()
+        if self.audio_cache is not None:
+            await self.audio_cache.close()
+        if self.catalog is not None:
+            await self.catalog.close()
+        if self.recorder is not None:
+            await self.recorder.close()
+        if self.voice_workers is not None:
+            await self.voice_workers.close()
+
+    async def cog_before_invoke(self, ctx):
+        """
+        Notes when a command started, for the command latency metrics, and records it in the command trace.
+        """
+        ctx.started_at = time.perf_counter()
+        if self.recorder is not None:
+            self.record_command(ctx, ctx.command.qualified_name, ctx.kwargs.get('query'))
+
+    async def cog_after_invoke(self, ctx):
+        """
+        Records how long a command took in the command latency metrics.
+        """
+        started_at = getattr(ctx, "started_at", None)
+        if started_at is not None:
+            outcome = "error" if ctx.command_failed else "ok"
+            Metrics.COMMAND_SECONDS.observe(time.perf_counter() - started_at, command=ctx.command.qualified_name, outcome=outcome)
+
+    def record_command(self, ctx, command, argument=None):
+        """
+        Records a command in the command trace (see benchmarks/replay.py).
+
+        :param ctx: discord.ext.commands.Context
+        :param command: str - Name of the command ("pick" for a song picked from search results).
+        :param argument: str or None - The query, or the URL of the picked song.
+        """
+        guild_id = ctx.guild.id if ctx.guild else None
+        self.recorder.record("command", guild=guild_id, user=ctx.author.id, cmd=command, arg=argument)
+
+    def register_metrics(self):
+        """
+        Registers the gauges reading the cog's state. They are only evaluated when the metrics are scraped.
+        """
+        self.metric_names = []
+        for metric in (
+            Metrics.Gauge("musicbot_sessions", "Active sessions.", lambda: len(self.sessions)),
+            Metrics.Gauge("musicbot_queue_length", "Songs in a guild's queue.", self.queue_lengths, ("guild",)),
+            Metrics.Gauge("musicbot_ffmpeg_processes", "Running ffmpeg processes (playing, prefetched or caching).", self.ffmpeg_processes),
+            Metrics.CallbackCounter("musicbot_cache_hits_total", "Cache lookups that found a live entry.", lambda: self.cache_stats(0), ("cache",)),
+            Metrics.CallbackCounter("musicbot_cache_misses_total", "Cache lookups that found nothing.", lambda: self.cache_stats(1), ("cache",)),
+            Metrics.Gauge("musicbot_cache_hit_ratio", "Share of cache lookups that were hits.", lambda: self.cache_stats(2), ("cache",)),
+            Metrics.CallbackCounter("musicbot_audio_sources_total", "Audio sources created, by mode.", lambda: {(mode,): count for mode, count in self.source_modes.items()}, ("mode",)),
+            Metrics.CallbackCounter("musicbot_stream_refreshes_total", "Stale stream URLs refreshed.", lambda: {(reason,): count for reason, count in self.stream_refreshes.items()}, ("reason",)),
+            Metrics.Gauge("musicbot_voice_worker_guilds", "Voice connections run by each voice worker process.", lambda: self.voice_workers.load() if self.voice_workers is not None else {}, ("worker",)),
+        ):
+            Metrics.REGISTRY.register(metric)
+            self.metric_names.append(metric.name)
+
+    def unregister_metrics(self):
+        """
+        Removes the gauges registered by register_metrics().
+        """
+        for name in self.metric_names:
+            Metrics.REGISTRY.unregister(name)
+
+    def queue_lengths(self):
+        """
+        :return: dict - (guild ID,) -> number of songs in the guild's queue.
+        """
+        return {(session.guild,): session.q.size() for session in self.sessions}
+
+    def ffmpeg_processes(self):
+        """
+        :return: int - Number of running ffmpeg processes started by the cog (or by its voice workers).
+        """
+        count = 0
+        for voice in self.bot.voice_clients:
+            if runs_ffmpeg(getattr(voice, 'source', None)) and (voice.is_playing() or voice.is_paused()):
+                count += 1
+        count += sum(1 for session in self.sessions if session.prefetched and runs_ffmpeg(session.prefetched[1]))
+        if self.audio_cache is not None:
+            count += self.audio_cache.downloading()
+        return count
+
+    def cache_stats(self, field):
+        """
+        :param field: int - 0 for hits, 1 for misses, 2 for the hit ratio.
+        :return: dict - (cache name,) -> value.
+        """
+        caches = {
+            "track_query": self.track_cache.queries,
+            "track_metadata": self.track_cache.metadata,
+            "stream_url": self.track_cache.streams,
+            "search": self.track_cache.searches,
+            "color": self.colors.cache,
+        }
+        if self.audio_cache is not None:
+            caches["audio"] = self.audio_cache
+        return {(name,): (cache.hits, cache.misses, cache.hit_ratio())[field] for name, cache in caches.items()}
+
     async def get_session(self, ctx):
         """
         Retrieves the session (or creates if none) for the current guild and voice channel.
@@ -41,28 +221,19 @@ class Music(commands.Cog):
         :param ctx: discord.ext.commands.Context
         :return: session() or None if an error occurs
         """
-        for session in sessions:
-            if session.guild == ctx.guild.id:
-                # Get bot's actual voice channel
-                bot_voice_state = ctx.guild.me.voice
-                if bot_voice_state and bot_voice_state.channel:
-                    actual_channel_id = bot_voice_state.channel.id
-
-                    # Update session if bot moved
-                    if session.channel != actual_channel_id:
-                        session.channel = actual_channel_id
-
-                # Ensure session matches user's current voice channel
-                if session.channel == ctx.author.voice.channel.id:
-                    return session
-                else:
-                    await ctx.send("⚠️ *There is already an active session in this server. Multiple sessions in different channels are not supported.*")
-                    await ctx.message.add_reaction("😵")
-                    return None  # Prevents creating a new session
-        
-        session = Utilities.Session(ctx.guild.id, ctx.author.voice.channel.id)
-        sessions.append(session)
-        return session
+        session = self.sessions.get(ctx.guild.id)
+        if session is not None:
+            self.sync_session_channel(ctx, session)
+
+            # Ensure session matches user's current voice channel
+            if session.channel == ctx.author.voice.channel.id:
+                return session
+            else:
+                await ctx.send("⚠️ *There is already an active session in this server. Multiple sessions in different channels are not supported.*")
+                await ctx.message.add_reaction("😵")
+                return None  # Prevents creating a new session
+
+        return self.sessions.create(ctx.guild.id, ctx.author.voice.channel.id)
 
     async def get_session_in_guild(self, ctx):
         """
@@ -76,130 +247,382 @@ class Music(commands.Cog):
         :param ctx: discord.ext.commands.Context
         :return: session() or None if an error occurs
         """
-        for session in sessions:
-            if session.guild == ctx.guild.id:
-                # Get bot's actual voice channel
-                bot_voice_state = ctx.guild.me.voice
-                if bot_voice_state and bot_voice_state.channel:
-                    actual_channel_id = bot_voice_state.channel.id
+        session = self.sessions.get(ctx.guild.id)
+        if session is not None:
+            self.sync_session_channel(ctx, session)
+            return session
 
-                    # Update session if bot moved
-                    if session.channel != actual_channel_id:
-                        session.channel = actual_channel_id
-
-                return session
-        
         # Create new session if none exists
-        session = Utilities.Session(ctx.guild.id, ctx.author.voice.channel.id)
-        sessions.append(session)
-        return session
+        return self.sessions.create(ctx.guild.id, ctx.author.voice.channel.id)
+
+    def sync_session_channel(self, ctx, session):
+        """
+        Updates the session's channel if the bot was moved.
+
+        :param ctx: discord.ext.commands.Context
+        :param session: Utilities.Session
+        """
+        # Get bot's actual voice channel
+        bot_voice_state = ctx.guild.me.voice
+        if bot_voice_state and bot_voice_state.channel:
+            actual_channel_id = bot_voice_state.channel.id
+
+            # Update session if bot moved
+            if session.channel != actual_channel_id:
+                session.channel = actual_channel_id
 
-    def prepare_continue_queue(self, ctx):
+    def prepare_continue_queue(self, ctx, error=None):
         """
         Calls the next song in the queue after the current one ends.
 
+        Runs on discord's audio player thread: it only hands the event over to the
+        event loop and returns, so the thread is released right away.
+
         :param ctx: discord.ext.commands.Context
+        :param error: Exception or None - The error that stopped the player, if any.
         """
-        fut = asyncio.run_coroutine_threadsafe(self.continue_queue(ctx), self.bot.loop)
-        try:
-            fut.result()
-        except Exception as e:
-            logger.error(e)
+        self.bot.loop.call_soon_threadsafe(self.on_track_end, ctx, error, time.perf_counter())
+
+    def on_track_end(self, ctx, error, ended_at):
+        """
+        Starts the handoff to the next song on the event loop.
+
+        :param ctx: discord.ext.commands.Context
+        :param error: Exception or None - The error that stopped the player, if any.
+        :param ended_at: float - time.perf_counter() when the song ended.
+        """
+        if error is not None:
+            logger.error(f"Player error in guild {ctx.guild.id}: {error}")
+        if self.recorder is not None:
+            self.recorder.record("end", guild=ctx.guild.id, error=str(error) if error is not None else None)
+        self.spawn(self.continue_queue(ctx, ended_at))
+
+    def spawn(self, coro):
+        """
+        Runs a coroutine in the background, keeping a reference to it and logging its failure.
 
-    async def continue_queue(self, ctx):
+        :param coro: coroutine
+        :return: asyncio.Task
+        """
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+
+    def _background_task_done(self, task):
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background task failed: {task.exception()!r}")
+
+    async def continue_queue(self, ctx, ended_at=None):
         """
         Plays the next song in the queue if available.
 
+        The next song starts first; the "Now playing" message is posted afterwards,
+        in the background.
+
         :param ctx: discord.ext.commands.Context
+        :param ended_at: float or None - time.perf_counter() when the previous song ended,
+            to measure the gap between songs.
         """
-        session = await self.get_session_in_guild(ctx)
-        if session is None:
+        session = self.sessions.get(ctx.guild.id)
+        if session is None:  # Session was closed (leave, disconnect) while the song was ending
             return
 
-        if not session.q.theres_next():
-            await ctx.send("*Queue has ended* ✅")
-            await asyncio.sleep(0)
-            if session in sessions:
-                sessions.remove(session)
-            return
+        async with self.sessions.lock(ctx.guild.id):
+            if session.state is SessionState.CLOSING:
+                return
 
-        session.q.next()
-        voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
-        source = await discord.FFmpegOpusAudio.from_probe(session.q.current_music.url, **FFMPEG_OPTIONS)
+            if session.q.is_empty():  # Stopped
+                session.state = SessionState.IDLE
+                self.update_idle_timer(ctx.guild)
+                return
 
-        if voice.is_playing():
-            voice.stop()
+            voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
+            source = None
+            while source is None:
+                if not session.q.theres_next() or voice is None:
+                    self.sessions.close(session)
+                    self.update_idle_timer(ctx.guild)
+                    await ctx.send("*Queue has ended* ✅")
+                    return
 
-        voice.play(source, after=lambda e: self.prepare_continue_queue(ctx))
+                session.q.next()
 
+                # Use the source prepared by prefetch_next() if it is for this song
+                source = session.take_prefetched(session.q.current_music)
+                if source is None:
+                    try:
+                        source = await self.create_source(session, session.q.current_music, "just_in_time")
+                    except Exception as e:  # Unavailable video, yt-dlp error or timeout: skip the song
+                        music = session.q.current_music
+                        logger.warning(f"Skipping '{music.title}' in guild {ctx.guild.id}: {e!r}")
+                        await ctx.send(f"*Skipped* **{escape_markdown(truncate_text(music.title))}** *because it could not be played.*")
+
+            if voice.is_playing():
+                voice.stop()
+
+            self.start_playback(ctx, session, voice, source)
+            music = session.q.current_music
+
+        if ended_at is not None:
+            gap = time.perf_counter() - ended_at
+            self.handoff_gaps.append(gap)
+            Metrics.HANDOFF_SECONDS.observe(gap)
+            logger.debug(f"Handoff to '{music.title}' in guild {ctx.guild.id} took {gap * 1000:.1f} ms")
+
+        self.spawn(self.announce_now_playing(ctx, session, music))
+
+    async def announce_now_playing(self, ctx, session, music):
+        """
+        Posts the "Now playing" message of a song that just started.
+
+        :param ctx: discord.ext.commands.Context
+        :param session: Utilities.Session
+        :param music: Utilities.Track - The song that started.
+        """
         # Convert duration to HH:MM:SS format
-        duration = session.q.current_music.duration
-        duration_str = await convert_duration_pretty(duration)
+        duration_str = await convert_duration_pretty(music.duration)
 
         # Get dominant color from thumbnail
-        dominant_color = await get_dominant_color(session.q.current_music.thumb)
+        dominant_color = await self.track_color(music)
 
         # Create an embed with the song details
         embed = discord.Embed(
-            title=f'{escape_markdown(truncate_text(session.q.current_music.title))}',
-            url=session.q.current_music.ytube,
+            title=f'{escape_markdown(truncate_text(music.title))}',
+            url=music.ytube,
             color=discord.Color(dominant_color),
             description=(
                 f"*▶️ Now playing in <#{session.channel}>*"
             )
         )
-        embed.set_thumbnail(url=session.q.current_music.thumb)
-        embed.set_author(name="Music Stream Link", url=session.q.current_music.url)
+        embed.set_thumbnail(url=music.thumb)
+        embed.set_author(name="Music Stream Link", url=music.url)
         embed.add_field(name="Duration", value=duration_str, inline=True)
         embed.add_field(name="Added By", value=f"<@{ctx.author.id}>", inline=True)
 
         await ctx.send(embed=embed)
 
-    async def auto_disconnect(self, ctx, voice):
+    async def track_color(self, music):
+        """
+        Returns the embed color of a queued song, from its smallest thumbnail and cached by video ID.
+
+        :param music: Utilities.Track
+        :return: int - Discord embed color (DEFAULT_COLOR if the song has no thumbnail).
         """
-        Automatically disconnects the bot if no one is in the voice channel 
-        or if nothing has been playing for 10 minutes.
+        thumb = music.color_thumb or music.thumb
+        if not thumb:
+            return DEFAULT_COLOR
+        return await self.colors.get(thumb, track_video_id(music))
+
+    async def create_source(self, session, music, reason):
+        """
+        Creates the audio source of a song: plays it from the audio cache if it is there,
+        otherwise streams it (see audio_source.create_audio_source), re-encoding if needed
+        at the bitrate of the session's voice channel.
+
+        :param session: Utilities.Session
+        :param music: Utilities.Track - The song.
+        :param reason: str - "prefetch" or "just_in_time", passed on to ensure_fresh_url.
+        :return: discord.AudioSource
         """
-        inactivity_duration = 600  # 10 minutes in seconds
-        check_interval = 60  # Check every 60 seconds
-        elapsed_time = 0
+        if self.voice_workers is not None:
+            return await self.create_remote_source(session, music, reason)
+
+        if self.audio_cache is not None:
+            source = self.audio_cache.source(track_video_id(music))
+            if source is not None:
+                self.source_modes["cached"] += 1
+                return source
+
+        music = await self.ensure_fresh_url(session, music, reason)
+        channel = self.bot.get_channel(session.channel)
+        source, mode = await create_audio_source(music.url, music.audio_format, getattr(channel, 'bitrate', None))
+        self.source_modes[mode] += 1
+        return source
+
+    async def create_remote_source(self, session, music, reason):
+        """
+        Same as create_source, when voice runs in worker processes: the worker of the
+        session's guild opens the cached file or starts ffmpeg, the cog only describes the source.
 
-        while True:
-            await asyncio.sleep(check_interval)
-            elapsed_time += check_interval
+        :param session: Utilities.Session
+        :param music: Utilities.Track - The song.
+        :param reason: str - "prefetch" or "just_in_time", passed on to ensure_fresh_url.
+        :return: voice_workers.RemoteSource
+        """
+        path = self.audio_cache.lookup(track_video_id(music)) if self.audio_cache is not None else None
+        if path is not None:
+            self.source_modes["cached"] += 1
+            return self.voice_workers.prepare_file(session.guild, path)
 
-            # Check if bot is not in the voice channel
-            if not voice.is_connected():
-                break
+        music = await self.ensure_fresh_url(session, music, reason)
+        channel = self.bot.get_channel(session.channel)
+        self.source_modes[source_mode(music.audio_format)] += 1
+        return self.voice_workers.prepare_stream(session.guild, music.url, music.audio_format, getattr(channel, 'bitrate', None))
 
-            # Check if voice channel is empty
-            if len(voice.channel.members) == 1:  # Only the bot is left
-                await ctx.send("👋 *No one is in the channel. Disconnecting...*")
-                await voice.disconnect()
+    async def connect_voice(self, voice_channel):
+        """
+        Joins a voice channel, through a voice worker process if they are enabled.
 
-                session = await self.get_session_in_guild(ctx)
-                if session is None:
-                    return
-                await asyncio.sleep(0)
-                if session in sessions:
-                    sessions.remove(session)
-                break
-
-            # Check if nothing is playing
-            if not voice.is_playing() and not voice.is_paused():
-                if elapsed_time >= inactivity_duration:
-                    await ctx.send("🔇 *No activity detected for 10 minutes. Disconnecting...*")
-                    await voice.disconnect()
-
-                    session = await self.get_session_in_guild(ctx)
-                    if session is None:
-                        return
-                    await asyncio.sleep(0)
-                    if session in sessions:
-                        sessions.remove(session)
-                    break
+        :param voice_channel: discord.VoiceChannel
+        :return: discord.VoiceProtocol
+        """
+        if self.voice_workers is not None:
+            return await voice_channel.connect(cls=self.voice_workers.voice_client)
+        return await voice_channel.connect()
+
+    def start_playback(self, ctx, session, voice, source):
+        """
+        Starts playing an audio source and schedules the prefetch of the song after it.
+
+        :param ctx: discord.ext.commands.Context
+        :param session: Utilities.Session
+        :param voice: discord.VoiceClient
+        :param source: discord.AudioSource
+        """
+        source = Tracing.playback_started(source)  # Ends the play request's trace at the first packet, if traced
+        voice.play(source, after=lambda e: self.prepare_continue_queue(ctx, e))
+        session.state = SessionState.PLAYING
+        session.track_started_at = asyncio.get_running_loop().time()
+        session.paused_at = None
+        self.schedule_prefetch(session)
+
+        self.text_channels[ctx.guild.id] = ctx.channel
+        self.update_idle_timer(ctx.guild)
+
+        music = session.q.current_music
+        if self.audio_cache is not None:
+            self.audio_cache.record_play(track_video_id(music), music)
+        if self.recorder is not None:
+            self.recorder.record("start", guild=ctx.guild.id, video=track_video_id(music), duration=music.duration)
+
+    def schedule_prefetch(self, session):
+        """
+        Schedules the next song's audio source to be prepared PREFETCH_SECONDS before the current one ends.
+        Call when the current song starts playing, or when a song is added after the current one.
+
+        :param session: Utilities.Session
+        """
+        if session.track_started_at is None:
+            return
+
+        duration = session.q.current_music.duration
+        if not duration:  # Live streams and unknown durations never get close to their end
+            return
+
+        session.discard_prefetch()
+        delay = max(0, session.track_started_at + duration - PREFETCH_SECONDS - asyncio.get_running_loop().time())
+        session.prefetch_task = asyncio.create_task(self.prefetch_next(session, delay))
+
+    async def prefetch_next(self, session, delay):
+        """
+        Prepares the next song's audio source after a delay: opens it from the audio cache,
+        or refreshes its stream URL and starts its ffmpeg process, so the handoff at the
+        end of the current song is immediate.
+
+        :param session: Utilities.Session
+        :param delay: float - Seconds to wait before prefetching.
+        """
+        await asyncio.sleep(delay)
+
+        music = session.q.peek_next()
+        if music is None:
+            return
+
+        try:
+            source = await self.create_source(session, music, "prefetch")
+        except Exception as e:
+            logger.warning(f"Failed to prefetch '{music.title}': {e}")
+            return
+
+        if session.q.peek_next() is not music:  # The queue changed while prefetching
+            source.cleanup()
+            return
+        session.prefetched = (music, source)
+
+    async def ensure_fresh_url(self, session, music, reason):
+        """
+        Re-resolves a song's stream URL if it is missing or about to expire.
+
+        :param session: Utilities.Session
+        :param music: Utilities.Track - The queued song.
+        :param reason: str - What triggered the check ("prefetch" or "just_in_time"), for the refresh counter.
+        :return: Utilities.Track - The same song, with a usable stream URL.
+        """
+        if music.url and (music.expires is None or music.expires - STREAM_EXPIRY_MARGIN > time.time()):
+            return music
+
+        status = "stale" if music.url else "missing"  # Songs picked from search results have no stream URL yet
+        info = await self.resolver.resolve(music.ytube)
+        music.url = info['url']
+        music.expires = stream_url_expiry(info['url'])
+        music.audio_format = audio_format(info)
+
+        self.stream_refreshes[reason] += 1
+        logger.info(f"Refreshed {status} stream URL of '{music.title}' ({reason}, totals: {dict(self.stream_refreshes)})")
+        return music
+
+    def update_idle_timer(self, guild):
+        """
+        Sets or clears the guild's auto-disconnect deadline after a voice or playback event:
+        EMPTY_CHANNEL_TIMEOUT once only bots are left in the voice channel, IDLE_TIMEOUT
+        once nothing is playing or paused, none otherwise.
+
+        :param guild: discord.Guild
+        """
+        voice = guild.voice_client
+        if voice is None or not voice.is_connected():
+            self.idle.cancel(guild.id)
+        elif all(member.bot for member in voice.channel.members):
+            self.idle.schedule(guild.id, EMPTY_CHANNEL_TIMEOUT, "empty")
+        elif voice.is_playing() or voice.is_paused():
+            self.idle.cancel(guild.id)
+        else:
+            self.idle.schedule(guild.id, IDLE_TIMEOUT, "idle")
+
+    async def on_idle_timeout(self, guild_id, reason):
+        """
+        Disconnects the bot when a guild's auto-disconnect deadline is reached.
+
+        :param guild_id: int
+        :param reason: str - "empty" (no one left in the channel) or "idle" (nothing played).
+        """
+        guild = self.bot.get_guild(guild_id)
+        voice = guild.voice_client if guild else None
+        if voice is None:
+            return
+
+        channel = self.text_channels.get(guild_id)
+        if channel is not None:
+            if reason == "empty":
+                message = "👋 *No one is in the channel. Disconnecting...*"
             else:
-                elapsed_time = 0  # Reset the timer if something is playing
+                message = f"🔇 *No activity detected for {IDLE_TIMEOUT // 60} minutes. Disconnecting...*"
+            try:
+                await channel.send(message)
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to announce auto-disconnect in guild {guild_id}: {e}")
+
+        session = self.sessions.get(guild_id)
+        if session is not None:
+            self.sessions.close(session)
+        await voice.disconnect()
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """
+        Keeps the auto-disconnect deadlines up to date as members join or leave the bot's channel.
+        """
+        guild = member.guild
+        if member.id == self.bot.user.id and after.channel is None:  # The bot left or was disconnected
+            self.idle.cancel(guild.id)
+            self.text_channels.pop(guild.id, None)
+            return
+
+        voice = guild.voice_client
+        if voice is not None and voice.channel in (before.channel, after.channel):
+            self.update_idle_timer(guild)
 
     async def ensure_user_in_voice(self, ctx):
         """
@@ -236,44 +659,186 @@ class Music(commands.Cog):
         :param ctx: discord.ext.commands.Context
         :param query: str Search query or YouTube URL
         """
-        try:
-            voice_channel = ctx.author.voice.channel
-        except AttributeError:
-            await ctx.send("*You are not connected to a voice channel.*")
-            await ctx.message.add_reaction("❌")
-            return
-        
-        session = await self.get_session(ctx)
-        if session is None:
-            return
-        
-        async with ctx.typing():  # Shows "Bot is typing..." while processing
-            with youtube_dl.YoutubeDL({'format': 'bestaudio', 'noplaylist': 'True'}) as ydl:
+        with Tracing.request("play", ctx.guild.id, ctx.message.created_at):
+            try:
+                voice_channel = ctx.author.voice.channel
+            except AttributeError:
+                await ctx.send("*You are not connected to a voice channel.*")
+                await ctx.message.add_reaction("❌")
+                return
+
+            session = await self.get_session(ctx)
+            if session is None:
+                return
+
+            async with ctx.typing():  # Shows "Bot is typing..." while processing
+                with Tracing.span("classify"):
+                    classified = classify_query(query)
+                if classified.kind == PLAYLIST:
+                    await self.import_playlist(ctx, session, voice_channel, classified.url)
+                    return
+
                 try:
-                    requests.get(query)
-                except:
-                    info = ydl.extract_info(f"ytsearch:{query}", download=False)['entries'][0]
-                else:
-                    info = ydl.extract_info(query, download=False)
-
-            url = info['url']
-            thumb = info['thumbnails'][0]['url']
-            title = info['title']
-            ytube_url = info['webpage_url']
-            duration = info['duration']
-            user = ctx.author.id
-
-            duration_str = await convert_duration_pretty(duration)
-
-            # Get dominant color from thumbnail
-            dominant_color = await get_dominant_color(thumb)
+                    with Tracing.span("extract"):
+                        info = await self.resolver.resolve(query)
+                except asyncio.TimeoutError:
+                    Tracing.set_outcome("timeout")
+                    await ctx.send("*⌛ Looking up the song took too long. Please try again.*")
+                    await ctx.message.add_reaction("❌")
+                    return
+
+                if classified.kind == SEARCH:
+                    self.suggestions.add(query, query)
+                self.suggestions.add(info['title'], info['webpage_url'])
+
+                await self.add_to_session(ctx, session, voice_channel, info)
+
+    @app_commands.command(name='play', description="Play a song from a search query or YouTube URL")
+    @app_commands.describe(query="Search query or YouTube URL")
+    @app_commands.guild_only()
+    async def play_slash(self, interaction: discord.Interaction, query: str):
+        """
+        Slash command version of play, with suggestions while typing.
+
+        :param interaction: discord.Interaction
+        :param query: str Search query or YouTube URL
+        """
+        await interaction.response.send_message(f"*🔎 Looking up* ***{escape_markdown(truncate_text(query))}***")
+
+        ctx = await self.bot.get_context(await interaction.original_response())
+        ctx.author = interaction.user  # Override the author to reflect the user who ran the command
+        if self.recorder is not None:
+            self.record_command(ctx, "play", query)
+        await self.play(ctx, query=query)
+
+    @play_slash.autocomplete('query')
+    async def play_autocomplete(self, interaction: discord.Interaction, current: str):
+        """
+        Suggests songs for /play from recent queries, the track catalog and cached search results.
+
+        Suggestions come from the in-memory index. Only when it has too few matches, and the
+        user paused typing and still has budget left, a small YouTube search fills the gaps.
+
+        :param interaction: discord.Interaction
+        :param current: str - What the user typed so far.
+        :return: list of app_commands.Choice
+        """
+        matches = self.suggestions.lookup(current)
+
+        if len(matches) < AUTOCOMPLETE_MIN_LOCAL and len(current.strip()) >= 3 and classify_query(current).kind == SEARCH:
+            user = interaction.user.id
+            request = object()  # Unique: a finished request can never be mistaken for a later one
+            self.autocomplete_requests[user] = request
+
+            try:
+                await asyncio.sleep(AUTOCOMPLETE_DEBOUNCE)
+                if self.autocomplete_requests.get(user) is not request:  # The user kept typing, a newer request takes over
+                    return []
+
+                if self.suggestion_budget.allow(user):
+                    try:
+                        entries = await asyncio.wait_for(self.resolver.search(current, 5), timeout=AUTOCOMPLETE_SEARCH_TIMEOUT)
+                    except Exception as e:
+                        logger.debug(f"Autocomplete search for '{current}' failed: {e}")
+                        entries = []
+                    self.add_search_suggestions(entries)
+                    matches = self.suggestions.lookup(current)
+            finally:
+                # The user's latest request is done: forget them, so the dict does not grow with every user ever seen
+                if self.autocomplete_requests.get(user) is request:
+                    del self.autocomplete_requests[user]
+
+        return [app_commands.Choice(name=truncate_text(label, 96), value=value[:100]) for label, value in matches]
+
+    def add_search_suggestions(self, entries):
+        """
+        Adds search results to the /play suggestions.
+
+        :param entries: list - Slimmed info dicts of the results.
+        """
+        for entry in entries:
+            if entry.get('title') and entry.get('url'):
+                self.suggestions.add(entry['title'], entry['url'])
+
+    async def play_search_result(self, ctx, info):
+        """
+        Plays (or queues) a song picked from the search results.
+
+        The song is queued from the search metadata, without looking it up again. Its
+        stream URL is resolved when it is about to play.
+
+        :param ctx: discord.ext.commands.Context
+        :param info: dict - Info dict of the search result (see resolver.search_result_info).
+        """
+        if self.recorder is not None:
+            self.record_command(ctx, "pick", info.get('webpage_url'))
+
+        with Tracing.request("search_pick", ctx.guild.id):
+            if not await self.ensure_user_in_voice(ctx):
+                return
+
+            session = await self.get_session(ctx)
+            if session is None:
+                return
+
+            try:
+                await self.add_to_session(ctx, session, ctx.author.voice.channel, info)
+            except asyncio.TimeoutError:
+                Tracing.set_outcome("timeout")
+                await ctx.send("*⌛ Looking up the song took too long. Please try again.*")
+                await ctx.message.add_reaction("❌")
+            except Exception as e:  # Runs from a view callback: nothing else would tell the user
+                logger.warning(f"Failed to play search result '{info.get('webpage_url')}' in guild {ctx.guild.id}: {e!r}")
+                Tracing.set_outcome("error")
+                await ctx.send("*❌ This song could not be played. Please pick another one.*")
+                await ctx.message.add_reaction("❌")
+
+    async def add_to_session(self, ctx, session, voice_channel, info):
+        """
+        Adds a resolved song to the session's queue, announces it, and starts playing
+        it (joining the voice channel if needed) when nothing else is playing.
+
+        :param ctx: discord.ext.commands.Context
+        :param session: Utilities.Session
+        :param voice_channel: discord.VoiceChannel - The channel to join if not connected.
+        :param info: dict - Slimmed info dict of the song (see resolver.TRACK_FIELDS).
+            Its stream URL may be missing, it is then resolved before playing.
+        """
+        url = info['url']
+        thumb = info['thumbnails'][0]['url']
+        title = info['title']
+        ytube_url = info['webpage_url']
+        duration = info['duration']
+        user = ctx.author.id
+
+        duration_str = await convert_duration_pretty(duration)
+
+        # Get dominant color from thumbnail (already known for catalogued songs)
+        dominant_color = info.get('dominant_color')
+        if dominant_color is None:
+            with Tracing.span("color"):
+                dominant_color = await self.colors.get(smallest_thumbnail(info['thumbnails']), info.get('id'), default=None)
+            if dominant_color is None:  # Not recorded, so it is computed again next time
+                dominant_color = DEFAULT_COLOR
+            elif self.catalog is not None:
+                self.catalog.record_color(info.get('id'), dominant_color)
             
-            session.q.enqueue(title, url, thumb, ytube_url, duration, user)
+        async with self.sessions.lock(ctx.guild.id):
+            if session.state is SessionState.CLOSING:  # Closed (e.g. by leave) while resolving
+                session = await self.get_session(ctx)
+                if session is None:
+                    return
+
+            self.enqueue_info(session, info, user)
             voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
             if not voice:
-                await voice_channel.connect()
+                session.state = SessionState.CONNECTING
+                with Tracing.span("connect"):
+                    await self.connect_voice(voice_channel)
+                session.state = SessionState.IDLE
                 voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
-                asyncio.create_task(self.auto_disconnect(ctx, voice))  # Start the auto-disconnect task
+                self.text_channels[ctx.guild.id] = ctx.channel
+                self.update_idle_timer(ctx.guild)  # Until the song starts, in case it fails to
 
             embed = discord.Embed(title=f'{escape_markdown(truncate_text(title))}', url=ytube_url, color=discord.Color(dominant_color))  
             embed.set_thumbnail(url=thumb)
@@ -287,18 +852,162 @@ class Music(commands.Cog):
                 embed.add_field(name="Added By", value=f"<@{ctx.author.id}>", inline=True)
                 await ctx.send(embed=embed)
                 await ctx.message.add_reaction("✅")
+                Tracing.set_outcome("queued")
+
+                self.ensure_prefetch(session)  # The song may now be next in line
             else:
+                session.q.set_last_as_current()
+                try:
+                    with Tracing.span("source"):
+                        source = await self.create_source(session, session.q.current_music, "just_in_time")
+                except Exception as e:  # Unavailable video, yt-dlp error or timeout: do not keep it queued
+                    logger.warning(f"Failed to start '{title}' in guild {ctx.guild.id}: {e!r}")
+                    session.q.remove_last()
+                    self.update_idle_timer(ctx.guild)
+                    Tracing.set_outcome("unavailable")
+                    await ctx.send(f"*❌* **{escape_markdown(truncate_text(title))}** *could not be played.*")
+                    await ctx.message.add_reaction("❌")
+                    return
+
                 embed.description = (
                     f"*▶️ Now playing in <#{session.channel}>*"
                 )
                 embed.add_field(name="Duration", value=duration_str, inline=True)
                 embed.add_field(name="Added By", value=f"<@{ctx.author.id}>", inline=True)
                 await ctx.send(embed=embed)
-                session.q.set_last_as_current()
-                source = await discord.FFmpegOpusAudio.from_probe(url, **FFMPEG_OPTIONS)
-                voice.play(source, after=lambda e: self.prepare_continue_queue(ctx))
+                self.start_playback(ctx, session, voice, source)
                 await ctx.message.add_reaction("▶️")
 
+    def enqueue_info(self, session, info, user):
+        """
+        Adds a resolved song to the session's queue without announcing it.
+
+        :param session: Utilities.Session
+        :param info: dict - Slimmed info dict of the song (see resolver.TRACK_FIELDS).
+        :param user: int - ID of the user who added the song.
+        """
+        thumbnails = info['thumbnails'] or [{}]
+        session.q.enqueue(
+            info['title'],
+            info['url'],
+            thumbnails[0].get('url'),
+            info['webpage_url'],
+            info['duration'],
+            user,
+            stream_url_expiry(info['url']),
+            audio_format(info),
+            classify_query(info['webpage_url'] or '').video_id,  # Only YouTube IDs, as in track_video_id
+            smallest_thumbnail(info['thumbnails'])
+        )
+
+    async def import_playlist(self, ctx, session, voice_channel, url):
+        """
+        Imports a playlist: plays (or queues) its first song as soon as it resolves,
+        then resolves the remaining songs in the background.
+
+        :param ctx: discord.ext.commands.Context
+        :param session: Utilities.Session
+        :param voice_channel: discord.VoiceChannel - The channel to join if not connected.
+        :param url: str - URL of the playlist.
+        """
+        try:
+            playlist = await self.resolver.playlist(url)
+        except asyncio.TimeoutError:
+            await ctx.send("*⌛ Looking up the playlist took too long. Please try again.*")
+            await ctx.message.add_reaction("❌")
+            return
+
+        entries = playlist['entries']
+        for index, entry in enumerate(entries):
+            try:
+                info = await self.resolver.resolve(entry['url'])
+            except Exception as e:
+                logger.warning(f"Failed to resolve playlist entry '{entry.get('title')}': {e}")
+                continue
+
+            await self.add_to_session(ctx, session, voice_channel, info)
+            remaining = entries[index + 1:]
+            if remaining:
+                session.cancel_import()
+                session.import_task = self.spawn(
+                    self.import_remaining(ctx, session, playlist['title'], remaining, len(entries))
+                )
+            return
+
+        await ctx.send("❌ No playable songs found in the playlist.")
+        await ctx.message.add_reaction("❌")
+
+    async def import_remaining(self, ctx, session, title, entries, total):
+        """
+        Resolves playlist entries with a bounded pool of workers and adds them to the
+        queue in playlist order as they come in, reporting progress by editing one message.
+
+        :param ctx: discord.ext.commands.Context
+        :param session: Utilities.Session
+        :param title: str - Title of the playlist.
+        :param entries: list - Flat playlist entries still to import.
+        :param total: int - Number of songs in the whole playlist.
+        """
+        loop = asyncio.get_running_loop()
+        title = escape_markdown(truncate_text(title or "playlist"))
+        progress = await ctx.send(f"*📥 Importing* ***{title}***: 1/{total}")
+
+        pending = iter(enumerate(entries))
+        resolved = {}  # entry index -> info (None if it failed), waiting for earlier entries
+        state = {'next': 0, 'added': 1, 'failed': 0, 'edited_at': loop.time()}
+
+        async def worker():
+            for index, entry in pending:
+                try:
+                    resolved[index] = await self.resolver.resolve(entry['url'])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Failed to resolve playlist entry '{entry.get('title')}': {e}")
+                    resolved[index] = None
+
+                # Add every entry that is now next in playlist order
+                while state['next'] in resolved:
+                    info = resolved.pop(state['next'])
+                    state['next'] += 1
+                    if info is None:
+                        state['failed'] += 1
+                    else:
+                        self.enqueue_info(session, info, ctx.author.id)
+                        state['added'] += 1
+                self.ensure_prefetch(session)
+
+                if loop.time() - state['edited_at'] >= PLAYLIST_PROGRESS_INTERVAL:
+                    state['edited_at'] = loop.time()
+                    await edit_progress(f"*📥 Importing* ***{title}***: {state['added'] + state['failed']}/{total}")
+
+        async def edit_progress(content):
+            try:
+                await progress.edit(content=content)
+            except discord.HTTPException as e:  # Deleted message or rate limit: the import goes on
+                logger.warning(f"Failed to update the import progress of '{title}': {e}")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(PLAYLIST_WORKERS)))
+        except asyncio.CancelledError:  # Stopped, cleared or left the channel
+            await edit_progress(f"*⏹️ Stopped importing* ***{title}***: {state['added']}/{total} songs added")
+            raise
+        except Exception:
+            await edit_progress(f"*❌ Failed to import* ***{title}***: {state['added']}/{total} songs added")
+            raise
+
+        failed = f" ({state['failed']} unavailable)" if state['failed'] else ""
+        await edit_progress(f"*✅ Imported* ***{title}***: {state['added']}/{total} songs{failed}")
+
+    def ensure_prefetch(self, session):
+        """
+        Schedules a prefetch if a song was added after the current one and nothing is prefetched yet.
+
+        :param session: Utilities.Session
+        """
+        if session.prefetched is None and (session.prefetch_task is None or session.prefetch_task.done()):
+            self.schedule_prefetch(session)
+
     @commands.command(name='skip', aliases=['next'])
     async def skip(self, ctx):
         """
@@ -334,13 +1043,9 @@ class Music(commands.Cog):
             if session is None:
                 return
             
-            session.q.clear_queue()
+            self.sessions.close(session)  # Before disconnecting, so the end of the current song finds no session
             await voice.disconnect()
 
-            await asyncio.sleep(0)
-            if session in sessions:
-                sessions.remove(session)
-                
             await ctx.message.add_reaction("👋")
         else:
             await ctx.send("*The bot is not connected to a voice channel.*")
@@ -363,6 +1068,10 @@ class Music(commands.Cog):
         voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
         if voice.is_playing():
             voice.pause()
+            # A prefetched stream URL could expire and its ffmpeg process time out during a long pause
+            session.paused_at = asyncio.get_running_loop().time()
+            session.discard_prefetch()
+            self.update_idle_timer(ctx.guild)
             await ctx.message.add_reaction("⏸️")
         else:
             await ctx.send("*There is no audio currently playing.*")
@@ -385,6 +1094,11 @@ class Music(commands.Cog):
         voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
         if voice.is_paused():
             voice.resume()
+            if session.paused_at is not None:  # The song now ends later by the time spent paused
+                session.track_started_at += asyncio.get_running_loop().time() - session.paused_at
+                session.paused_at = None
+                self.schedule_prefetch(session)
+            self.update_idle_timer(ctx.guild)
             await ctx.message.add_reaction("▶️")
         else:
             await ctx.send("*The music is not paused.* 🔊🆙")
@@ -407,7 +1121,10 @@ class Music(commands.Cog):
         voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
         if voice.is_playing():
             voice.stop()
+            session.cancel_import()
             session.q.clear_queue()
+            session.discard_prefetch()
+            session.state = SessionState.IDLE
             await ctx.message.add_reaction("⏹️")
         else:
             await ctx.send("*There is no music playing.*")
@@ -430,37 +1147,38 @@ class Music(commands.Cog):
             await ctx.message.add_reaction("✅")
             return
 
-        # Get the dominant color of the first song's thumbnail
-        first_song_thumb = session.q.queue[0].thumb if session.q.queue else None
-        dominant_color = await get_dominant_color(first_song_thumb) if first_song_thumb else 0x3498db  # Default to blue
+        # Snapshot the queue so pages stay consistent while it changes
+        songs = session.q.snapshot()
+        channel = session.channel
 
-        # Generate queue list with the new format
-        queue_list = [
-            f"**{i + 1}.** {escape_markdown(truncate_text(song.title))}\n"
-            f"{await convert_duration_pretty(song.duration)} | [Link]({song.ytube}) | <@{song.user}>"
-            for i, song in enumerate(session.q.queue)
-        ]
+        # Get the dominant color and thumbnail of the first song
+        dominant_color = await self.track_color(songs[0])
+        first_song_thumb = songs[0].thumb
 
-        # Split the queue into chunks of 10 songs per page
+        # Pages of 10 songs, rendered only when viewed
         chunk_size = 10
-        chunks = [queue_list[i:i + chunk_size] for i in range(0, len(queue_list), chunk_size)]
+        page_count = (len(songs) + chunk_size - 1) // chunk_size
 
-        embeds = []
-
-        for chunk in chunks:
+        def render_page(index):
+            start = index * chunk_size
             embed = discord.Embed(title="🎧 Current Queue", color=discord.Color(dominant_color))
 
-            # Join the chunk into a single string for the embed
-            embed.description = "\n\n".join(chunk)  # Two newlines for better separation
-            embed.description += f"\n\nChannel: <#{session.channel}>" # Append channel to each page
+            # Two newlines for better separation
+            embed.description = "\n\n".join(
+                f"**{i + 1}.** {escape_markdown(truncate_text(song.title))}\n"
+                f"{format_duration(song.duration)} | [Link]({song.ytube}) | <@{song.user}>"
+                for i, song in enumerate(songs[start:start + chunk_size], start)
+            )
+            embed.description += f"\n\nChannel: <#{channel}>" # Append channel to each page
 
             # Set the thumbnail of the first song in the queue
             if first_song_thumb:
                 embed.set_thumbnail(url=first_song_thumb)
 
-            embeds.append(embed)
+            embed.set_footer(text=f"Page {index + 1}/{page_count} · {len(songs)} songs")
+            return embed
 
-        await Paginator.CustomPaginator(timeout=120).start(ctx, pages=embeds)
+        await Paginator.CustomPaginator(timeout=120).start(ctx, page_provider=render_page, page_count=page_count)
 
         await ctx.message.add_reaction("📜")
 
@@ -488,7 +1206,9 @@ class Music(commands.Cog):
             await ctx.message.add_reaction("✅")
             return
 
+        session.cancel_import()
         session.q.clear_queue_except_current()
+        session.discard_prefetch()
         await ctx.send("*The queue has been cleared.*")
         await ctx.message.add_reaction("🧹")
 
@@ -518,9 +1238,11 @@ class Music(commands.Cog):
             await ctx.send(f"*Moved to:* <#{voice_channel.id}>")
         else:
             # If not connected, join the new channel
-            await voice_channel.connect()
-            voice = discord.utils.get(self.bot.voice_clients, guild=ctx.guild)
-            asyncio.create_task(self.auto_disconnect(ctx, voice))  # Start the auto-disconnect task
+            session.state = SessionState.CONNECTING
+            await self.connect_voice(voice_channel)
+            session.state = SessionState.IDLE
+            self.text_channels[ctx.guild.id] = ctx.channel
+            self.update_idle_timer(ctx.guild)
             await ctx.send(f"*Joined:* <#{voice_channel.id}>")
 
         # Update the session's channel reference
@@ -556,7 +1278,7 @@ class Music(commands.Cog):
         duration_str = await convert_duration_pretty(duration)
 
         # Get dominant color from thumbnail
-        dominant_color = await get_dominant_color(session.q.current_music.thumb)
+        dominant_color = await self.track_color(session.q.current_music)
 
         # Create an embed with the song details
         embed = discord.Embed(
@@ -586,34 +1308,32 @@ class Music(commands.Cog):
         embeds = []
         results = []
         async with ctx.typing():  # Shows "Bot is typing..." while processing
-            
-            ydl_opts = {
-                'quiet': True,
-                'extract_flat': True,
-                'default_search': 'ytsearch20',
-                'skip_download': True,
-            }
-
-            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(f"ytsearch20:{query}", download=False)
+            try:
+                entries = await self.resolver.search(query, 20)
+            except asyncio.TimeoutError:
+                await ctx.send("*⌛ The search took too long. Please try again.*")
+                await ctx.message.add_reaction("❌")
+                return
 
-            if not info or "entries" not in info or not info["entries"]:
+            if not entries:
                 await ctx.send("❌ No results found.")
                 return
+            self.add_search_suggestions(entries)
 
             results = [
                 {
                     "title": entry["title"],
                     "url": entry["url"],
                     "duration": await convert_duration_pretty(entry["duration"]),
-                    "channel": entry.get("uploader", "Unknown"),
+                    "channel": entry.get("uploader") or "Unknown",
                     "thumbnail": entry['thumbnails'][0]['url'],
+                    "info": search_result_info(entry),
                 }
-                for entry in info["entries"][:20]
+                for entry in entries
             ]
 
             first_thumb = results[0]["thumbnail"] if results else None
-            dominant_color = await get_dominant_color(first_thumb)
+            dominant_color = await self.colors.get(smallest_thumbnail(entries[0]['thumbnails']), entries[0]['id'])
 
             search_list = [
                 f"**{i + 1}.** {escape_markdown(truncate_text(video['title']))}\n"
@@ -689,48 +1409,47 @@ class YouTubeSearchDropdown(discord.ui.View):
             await interaction.response.send_message("*❌ Music system not available*")
             return
 
-        # Simulate calling !play command
         await interaction.response.send_message(f"*🎶 Selected:* ***{escape_markdown(truncate_text(selected_video['title']))}***", ephemeral=True)
         
         ctx = await self.bot.get_context(interaction.message)
         ctx.author = interaction.user  # Override the author to reflect the user who selected the song
-        await music_cog.play(ctx, query=selected_video['url'])
+        await music_cog.play_search_result(ctx, selected_video['info'])
+
+def runs_ffmpeg(source):
+    """
+    :param source: discord.AudioSource or None
+    :return: bool - Whether the source streams through an ffmpeg process, here or in a voice worker.
+    """
+    source = getattr(source, 'original', source)  # Unwraps Tracing.FirstPacketProbe
+    return isinstance(source, discord.FFmpegAudio) or getattr(source, 'ffmpeg', False)
+
 
-async def get_dominant_color(image_url):
+def track_video_id(music):
     """
-    Fetches the image from the given URL and returns the dominant color as a Discord-compatible integer.
-    Returns blue (default) if the URL is invalid.
-    
-    :param image_url: str - URL of the image
-    :return: int - Discord embed color
+    Returns the YouTube video ID of a queued song.
+
+    :param music: Utilities.Track
+    :return: str or None - None if the song is not a YouTube video.
     """
-    if not image_url or not image_url.startswith(("http://", "https://")):
-        logger.warning(f"Invalid or missing image URL: '{image_url}' (Defaulting to blue)")
-        return 0x3498db  # Default to blue if the image URL is invalid
-
-    try:
-        response = requests.get(image_url, timeout=5)  # 5-second timeout to avoid hanging
-        response.raise_for_status()  # Raise an error for bad HTTP responses (e.g., 404, 500)
-
-        image = Image.open(io.BytesIO(response.content))
-        image = image.convert("RGB")  # Ensure it's in RGB format
-        image = image.resize((50, 50))  # Reduce size for faster processing
-
-        pixels = list(image.getdata())  # Get pixel data
-        avg_color = tuple(sum(x) // len(x) for x in zip(*pixels))  # Average color
-
-        return (avg_color[0] << 16) + (avg_color[1] << 8) + avg_color[2]  # Convert RGB to int
-    
-    except Exception as e:
-        logger.error(f"Failed to get dominant color: {e}")
-        return 0x3498db  # Default to blue if an error occurs
-    
+    if music.video_id:
+        return music.video_id
+    return classify_query(music.ytube).video_id if music.ytube else None
+
 async def convert_duration_pretty(duration):
     """
     Convert a duration in seconds to a formatted string in HH:MM:SS format.
 
     If the duration is `None` or invalid, returns "Unknown".
 
+    :param duration: int or None - The duration in seconds.
+    :return: str - The formatted duration string in HH:MM:SS format.
+    """
+    return format_duration(duration)
+
+def format_duration(duration):
+    """
+    Synchronous version of convert_duration_pretty, for code that cannot await (e.g. page rendering).
+
     :param duration: int or None - The duration in seconds.
     :return: str - The formatted duration string in HH:MM:SS format.
     """
@@ -1,5 +1,6 @@
 import logging
 import logging.handlers
+import math
 import subprocess
 import time as t
 from datetime import datetime, timedelta
@@ -7,6 +8,9 @@ from datetime import datetime, timedelta
 from discord.ext import commands
 
 from bot import __version__
+from bot.utils.loop_watchdog import LoopWatchdog
+from bot.utils.metrics import MetricsServer
+from bot.utils.tracing import STAGES, TRACER
 
 logger = logging.getLogger("discord")
 
@@ -15,6 +19,26 @@ class ServerAssistant(commands.Cog):
         self.bot = bot
         self.start_time = t.time()  # Store the bot's start time
         self.version = __version__
+        self.metrics_server = MetricsServer.from_env()
+        self.watchdog = LoopWatchdog.from_env()
+
+    async def cog_load(self):
+        """
+        Starts the metrics server (if METRICS_PORT is set) and the event loop watchdog when the cog is added.
+        """
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+        if self.watchdog is not None:
+            await self.watchdog.start()
+
+    async def cog_unload(self):
+        """
+        Stops the metrics server and the event loop watchdog when the cog is removed.
+        """
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        if self.watchdog is not None:
+            await self.watchdog.close()
 
     @commands.command()
     async def time(self, ctx):
@@ -48,7 +72,11 @@ class ServerAssistant(commands.Cog):
         except Exception:
             container_id = "Unknown"
 
-        await ctx.channel.send(f"Discord Music Bot [`{container_id}`] | Version [`v{self.version}`] | Uptime: [`{elapsed_time_formatted}`]")
+        shards = ""
+        if getattr(self.bot, "shard_ids", None) is not None:
+            shards = f" | Shards [`{format_shard_ids(self.bot.shard_ids)}` of `{self.bot.shard_count}`]"
+
+        await ctx.channel.send(f"Discord Music Bot [`{container_id}`] | Version [`v{self.version}`] | Uptime: [`{elapsed_time_formatted}`]{shards}")
         return
 
     @commands.command()
@@ -59,9 +87,111 @@ class ServerAssistant(commands.Cog):
         Usage: ?ping
         """
         logger.info(f"Pong")
-        await ctx.channel.send(f'Pong')
+        shard_id = ctx.guild.shard_id if ctx.guild else 0
+        latency = dict(self.shard_latencies()).get(shard_id)
+        await ctx.channel.send(f'Pong | Shard `{shard_id}` | Gateway latency `{format_latency(latency)}`')
+        return
+
+    @commands.command()
+    async def shards(self, ctx):
+        """
+        Report the gateway latency and guild count of each shard run by this process.
+
+        Usage: ?shards
+        """
+        guilds = {}
+        for guild in self.bot.guilds:
+            guilds[guild.shard_id] = guilds.get(guild.shard_id, 0) + 1
+
+        lines = [f"{'shard':<7}{'latency':>10}{'guilds':>8}"]
+        for shard_id, latency in self.shard_latencies():
+            lines.append(f"{shard_id:<7}{format_latency(latency):>10}{guilds.get(shard_id, 0):>8}")
+        table = "\n".join(lines)
+        await ctx.channel.send(f"Shards of this process ({self.bot.shard_count or 1} in total):\n```\n{table}\n```")
+        return
+
+    def shard_latencies(self):
+        """
+        :return: list - (shard ID, gateway heartbeat latency in seconds) of the shards run by this process.
+        """
+        latencies = getattr(self.bot, "latencies", None)  # Only sharded bots have several
+        if latencies is None:
+            return [(0, self.bot.latency)]
+        return latencies
+
+    @commands.command()
+    async def lag(self, ctx):
+        """
+        Report how late the event loop runs its timers, and how often it was blocked.
+
+        Usage: ?lag
+        """
+        if self.watchdog is None:
+            await ctx.channel.send("The event loop watchdog is disabled (LOOP_LAG_THRESHOLD_MS=0).")
+            return
+
+        summary = self.watchdog.summary()
+        await ctx.channel.send(
+            f"Event loop lag over the last {summary['count']} samples: "
+            f"p50 `{summary['p50'] * 1000:.1f} ms` | p95 `{summary['p95'] * 1000:.1f} ms` | "
+            f"p99 `{summary['p99'] * 1000:.1f} ms` | max `{summary['max'] * 1000:.1f} ms` | "
+            f"blocked over {self.watchdog.threshold * 1000:.0f} ms: `{summary['stalls']}` times since startup"
+        )
+        return
+
+    @commands.command()
+    async def perf(self, ctx):
+        """
+        Report the time to first audio of the recent play requests, per stage.
+
+        Usage: ?perf
+        """
+        summary = TRACER.summary()
+        if summary['count'] == 0:
+            await ctx.channel.send("No song was played since the bot started.")
+            return
+
+        lines = [f"{'stage':<14}{'p50':>10}{'p95':>10}"]
+        for stage in STAGES:
+            p50, p95 = summary['stages'][stage]
+            lines.append(f"{stage:<14}{p50 * 1000:>8.0f}ms{p95 * 1000:>8.0f}ms")
+        p50, p95 = summary['total']
+        lines.append(f"{'total':<14}{p50 * 1000:>8.0f}ms{p95 * 1000:>8.0f}ms")
+
+        slowest = max(STAGES, key=lambda stage: summary['stages'][stage][1])
+        table = "\n".join(lines)
+        await ctx.channel.send(
+            f"Time to first audio over the last {summary['count']} played requests "
+            f"(p95 dominated by `{slowest}`):\n```\n{table}\n```"
+        )
         return
 
+def format_latency(latency):
+    """
+    Formats a gateway latency, which is unknown (inf or nan) before the first heartbeat.
+
+    :param latency: float or None - Seconds.
+    :return: str
+    """
+    if latency is None or not math.isfinite(latency):
+        return "unknown"
+    return f"{latency * 1000:.0f} ms"
+
+def format_shard_ids(shard_ids):
+    """
+    Formats shard IDs compactly, e.g. "0-3, 8".
+
+    :param shard_ids: list of int
+    :return: str
+    """
+    ranges = []
+    for shard_id in sorted(shard_ids):
+        if ranges and shard_id == ranges[-1][1] + 1:
+            ranges[-1][1] = shard_id
+        else:
+            ranges.append([shard_id, shard_id])
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
 def setup(bot):
     bot.add_cog(ServerAssistant(bot))
 
@@ -1,8 +1,10 @@
 import sys
 import os
+import time
 
 import logging
 import logging.handlers
+import multiprocessing
 
 # Third-party dependencies
 from dotenv import load_dotenv
@@ -12,31 +14,25 @@ from discord.ext import commands
 # Local imports
 from bot.cogs import Music, ServerAssistant
 from bot import __version__
+from bot.utils.metrics import RateLimitCounter
+from bot.utils.sharding import ShardConfig
 
 ######################### SETUP #########################
 load_dotenv()
 
-# Bot intents configuration
+# Bot intents configuration: only what the cogs use.
+# Prefix commands need messages and their content; voice_states keeps the members of
+# voice channels cached (for auto-disconnect), so the members and presences intents,
+# and their caches, are not needed.
 intents = discord.Intents(
     messages=True,
     guilds=True,
-    members=True,
     message_content=True,
-    presences=True,
     voice_states=True
 )
 
-# Initialize bot with a command prefix
-# Change the prefix as desired
-activity = discord.Activity(type=discord.ActivityType.listening, name=".help")
-# Parameters are written in the doc string already
-help_command = commands.DefaultHelpCommand(show_parameter_descriptions=False)
-client = commands.Bot(
-    command_prefix=".",
-    intents=intents,
-    activity=activity,
-    help_command=help_command
-    )
+# Seconds before a crashed shard process is restarted ("process" shard mode).
+SHARD_RESTART_DELAY = 5
 
 # Load bot token from environment variables
 TOKEN = os.getenv("DISCORD_TOKEN")
@@ -45,37 +41,145 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 ######################## LOGGER #########################
 # Logger setup for debugging and tracking bot activity
 logger = logging.getLogger("discord")
-logger.setLevel(logging.INFO)  # Change to DEUBUG, INFO, WARNING, ERROR as needed
-logging.getLogger("discord.http").setLevel(logging.INFO)
-
-# Log file path (defaults to local directory if not set)
-log_file_path = "./logs/discord.log"
-os.makedirs(os.path.dirname(log_file_path), exist_ok=True)  # Ensure directory exists
-
-# Configure rotating file handler
-handler = logging.handlers.RotatingFileHandler(
-    filename=log_file_path,
-    encoding="utf-8",
-    maxBytes=8 * 1024 * 1024,  # 8 MB
-    backupCount=5,  # Keep 5 backups
-)
 
-# Log format
-formatter = logging.Formatter(
-    "[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"
-)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+def setup_logging(log_file_path="./logs/discord.log"):
+    """
+    Logs to a rotating file (each shard process gets its own).
+
+    :param log_file_path: str - Log file path (defaults to local directory if not set)
+    """
+    logger.setLevel(logging.INFO)  # Change to DEUBUG, INFO, WARNING, ERROR as needed
+    logging.getLogger("discord.http").setLevel(logging.INFO)
+    logging.getLogger("discord.http").addHandler(RateLimitCounter())  # Counts 429 responses for the metrics
+
+    os.makedirs(os.path.dirname(log_file_path), exist_ok=True)  # Ensure directory exists
+
+    # Configure rotating file handler
+    handler = logging.handlers.RotatingFileHandler(
+        filename=log_file_path,
+        encoding="utf-8",
+        maxBytes=8 * 1024 * 1024,  # 8 MB
+        backupCount=5,  # Keep 5 backups
+    )
+
+    # Log format
+    formatter = logging.Formatter(
+        "[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"
+    )
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
 #########################################################
 
-@client.event
-async def on_ready():
+def create_client(sharded=False, shard_count=None, shard_ids=None):
+    """
+    Creates the bot: a single connection, or an AutoShardedBot running the given shards.
+
+    :param sharded: bool - Whether to use an AutoShardedBot.
+    :param shard_count: int or None - Total number of shards (None: Discord's recommendation).
+    :param shard_ids: list of int or None - Shards run by this bot (None: all of them).
+    :return: commands.Bot
+    """
+    # Initialize bot with a command prefix
+    # Change the prefix as desired
+    activity = discord.Activity(type=discord.ActivityType.listening, name=".help")
+    # Parameters are written in the doc string already
+    help_command = commands.DefaultHelpCommand(show_parameter_descriptions=False)
+    options = dict(
+        command_prefix=".",
+        intents=intents,
+        activity=activity,
+        help_command=help_command,
+        member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+    )
+    if sharded:
+        client = commands.AutoShardedBot(shard_count=shard_count, shard_ids=shard_ids, **options)
+    else:
+        client = commands.Bot(**options)
+
+    @client.event
+    async def on_ready():
+        """
+        To execute once the bot is online
+        """
+        if client.get_cog("Music") is not None:  # Reconnected
+            return
+        await client.add_cog(Music(client))
+        await client.add_cog(ServerAssistant(client))
+
+        # Register the slash commands (e.g. /play) with Discord, once for all shards
+        shard_ids = getattr(client, "shard_ids", None)
+        if shard_ids is None or 0 in shard_ids:
+            try:
+                synced = await client.tree.sync()
+                logger.info(f"Synced {len(synced)} slash command(s)")
+            except discord.HTTPException as e:
+                logger.error(f"Failed to sync slash commands: {e}")
+        shards = f" (shards {shard_ids} of {client.shard_count})" if shard_ids is not None else ""
+        logger.info('We have successfully logged in as {0.user}{1} (Bot version: v{2})'.format(client, shards, __version__))
+
+    return client
+
+def run_shard_group(index, shard_ids, shard_count):
+    """
+    Runs one process of the "process" shard mode.
+
+    Each process logs to its own file, and serves its metrics on METRICS_PORT + index.
+
+    :param index: int - Index of the process.
+    :param shard_ids: list of int - Shards run by this process.
+    :param shard_count: int - Total number of shards.
+    """
+    if os.getenv("METRICS_PORT"):
+        os.environ["METRICS_PORT"] = str(int(os.environ["METRICS_PORT"]) + index)
+    setup_logging(f"./logs/discord-shards-{shard_ids[0]}-{shard_ids[-1]}.log")
+    create_client(sharded=True, shard_count=shard_count, shard_ids=shard_ids).run(TOKEN, log_handler=None)
+
+def run_shard_processes(config):
     """
-    To execute once the bot is online
+    Runs the shard groups in separate processes, restarting those that crash.
+
+    :param config: ShardConfig
     """
-    await client.add_cog(Music(client))
-    await client.add_cog(ServerAssistant(client))
-    logger.info('We have successfully logged in as {0.user} (Bot version: v{1})'.format(client, __version__))
+    setup_logging()
+    context = multiprocessing.get_context("spawn")
+    groups = config.groups()
+    processes = {}
+
+    def start(index):
+        process = context.Process(
+            target=run_shard_group, args=(index, groups[index], config.shard_count), name=f"shards-{index}"
+        )
+        process.start()
+        processes[index] = process
+        logger.info(f"Started shards {groups[index]} of {config.shard_count} in process {process.pid}")
+
+    for index in range(len(groups)):
+        start(index)
+
+    try:
+        while processes:
+            time.sleep(1)
+            for index, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                if process.exitcode == 0:
+                    del processes[index]
+                    continue
+                logger.error(f"Shards {groups[index]} exited with code {process.exitcode}, restarting in {SHARD_RESTART_DELAY}s")
+                time.sleep(SHARD_RESTART_DELAY)
+                start(index)
+    except KeyboardInterrupt:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join()
 
 # Runs bot's loop.
-client.run(TOKEN, log_handler=None)
\ No newline at end of file
+if __name__ == "__main__":
+    config = ShardConfig.from_env()
+    if config.mode == "process":
+        run_shard_processes(config)
+    else:
+        setup_logging()
+        client = create_client(config.mode == "auto", config.shard_count, config.shard_ids)
+        client.run(TOKEN, log_handler=None)
\ No newline at end of file
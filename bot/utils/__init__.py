@@ -1,2 +1,3 @@
-from .music_utilities import Queue, Session
+from .music_utilities import Queue, Session, SessionState, Track
+from .session_registry import SessionRegistry
 from .custom_paginator import CustomPaginator
\ No newline at end of file
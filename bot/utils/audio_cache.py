@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import os
+import shlex
+import time
+from collections import Counter, OrderedDict
+
+import discord
+from discord.oggparse import OggStream
+
+from bot.utils.audio_source import FFMPEG_OPTIONS, can_passthrough, encode_bitrate
+from bot.utils.track_cache import STREAM_EXPIRY_MARGIN, stream_url_expiry
+
+logger = logging.getLogger("discord")
+
+# Extension of the cached files (Ogg Opus), and of files still being written.
+CACHE_EXTENSION = ".opus"
+PARTIAL_EXTENSION = ".part"
+
+# Songs longer than this (seconds), or of unknown duration (live streams), are never cached.
+MAX_CACHED_DURATION = 20 * 60
+
+# Bitrate (kbps) of cached files for streams that have to be re-encoded.
+CACHE_BITRATE = 128
+
+# Seconds after which a partial file is deleted at startup even if the process writing it
+# still seems alive (its pid may have been reused). Downloads take minutes at most.
+PARTIAL_MAX_AGE = 60 * 60
+
+
+class OggFileAudio(discord.AudioSource):
+    """
+    An audio source playing a local Ogg Opus file.
+
+    The Opus packets are read straight from the file, so no ffmpeg process is needed.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._packets = OggStream(self._file).iter_packets()
+
+    def read(self):
+        for packet in self._packets:
+            if not packet.startswith((b"OpusHead", b"OpusTags")):  # Stream headers, not audio
+                return packet
+        return b""
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self._file.close()
+
+
+class AudioCache:
+    """
+    A class used to keep the most played songs as local Opus files.
+
+    Songs are downloaded in the background once they have been played `min_plays`
+    times, one download at a time. Files are written under a temporary name and
+    renamed when complete, so a partial file is never played. When the cache grows
+    past `max_bytes`, the least recently played files are deleted.
+
+    Attributes
+    ----------
+    directory : str
+        Folder holding the cached files.
+    max_bytes : int
+        Max total size of the cached files.
+    min_plays : int
+        Number of plays after which a song gets cached.
+    hits : int
+        Number of songs played from the cache.
+    misses : int
+        Number of songs streamed because they were not cached.
+
+    Methods
+    -------
+    start()
+        Indexes the files already in the cache folder.
+
+    source(video_id)
+        Returns an audio source playing the cached song, or None.
+
+    lookup(video_id)
+        Returns the file of the cached song (to be played by another process), or None.
+
+    record_play(video_id, music)
+        Counts a play of a song, caching it once it reaches min_plays.
+
+    downloading()
+        Returns the number of downloads in progress or waiting.
+
+    hit_ratio()
+        Returns the share of songs played from the cache.
+
+    close()
+        Stops the pending downloads.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 ** 3, min_plays: int = 3) -> None:
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        self.min_plays: int = min_plays
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._files: OrderedDict = OrderedDict()  # video ID -> file size, least recently played first
+        self._size: int = 0
+        self._plays: Counter = Counter()  # video ID -> number of plays since startup
+        self._downloads = {}  # video ID -> asyncio.Task
+        self._download_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates an audio cache configured through environment variables.
+
+        AUDIO_CACHE_DIR (the cache is disabled when unset or empty), AUDIO_CACHE_MAX_MB
+        (default: 1024) and AUDIO_CACHE_MIN_PLAYS (default: 3).
+
+        :return: AudioCache or None if disabled.
+        """
+        directory = os.getenv("AUDIO_CACHE_DIR", "")
+        if not directory:
+            return None
+        return cls(
+            directory,
+            max_bytes=int(os.getenv("AUDIO_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+            min_plays=int(os.getenv("AUDIO_CACHE_MIN_PLAYS", "3")),
+        )
+
+    async def start(self):
+        """
+        Indexes the files already in the cache folder, deleting leftovers of interrupted downloads.
+
+        :return: None
+        """
+        files = await asyncio.to_thread(self._scan)
+        for video_id, size in files:
+            self._files[video_id] = size
+            self._size += size
+        self._evict()
+        logger.info(f"Audio cache opened at '{self.directory}' ({len(self._files)} songs, {self._size / 1024 ** 2:.1f} MB)")
+
+    def source(self, video_id):
+        """
+        Returns an audio source playing the cached song, or None if it is not cached.
+
+        :param video_id: str or None - The YouTube video ID.
+        :return: OggFileAudio or None
+        """
+        path = self.lookup(video_id)
+        if path is None:
+            return None
+        try:
+            return OggFileAudio(path)
+        except OSError as e:
+            logger.warning(f"Failed to open cached song '{path}': {e}")
+            self._forget(video_id)
+            return None
+
+    def lookup(self, video_id):
+        """
+        Returns the file of a cached song, counted as a play of the file, or None if it is not cached.
+
+        :param video_id: str or None - The YouTube video ID.
+        :return: str or None
+        """
+        if video_id and video_id in self._files:
+            path = self._path(video_id)
+            try:
+                os.utime(path)  # Keeps the play order across restarts
+            except OSError as e:
+                logger.warning(f"Cached song '{path}' is not readable: {e}")
+                self._forget(video_id)
+            else:
+                self._files.move_to_end(video_id)
+                self.hits += 1
+                return path
+
+        self.misses += 1
+        return None
+
+    def record_play(self, video_id, music):
+        """
+        Counts a play of a song, and downloads it in the background once it reaches min_plays.
+
+        :param video_id: str or None - The YouTube video ID.
+        :param music: Utilities.Track - The song, with a usable stream URL.
+        :return: None
+        """
+        if not video_id:
+            return
+
+        self._plays[video_id] += 1
+        if (
+            self._plays[video_id] < self.min_plays
+            or video_id in self._files
+            or video_id in self._downloads
+            or not music.url
+            or not music.duration
+            or music.duration > MAX_CACHED_DURATION
+        ):
+            return
+
+        task = asyncio.create_task(self._download(video_id, music.url, music.audio_format))
+        self._downloads[video_id] = task
+        task.add_done_callback(lambda _: self._downloads.pop(video_id, None))
+
+    def downloading(self):
+        """
+        Returns the number of downloads in progress or waiting.
+
+        :return: int
+        """
+        return len(self._downloads)
+
+    def hit_ratio(self):
+        """
+        Returns the share of songs played from the cache.
+
+        :return: float - Between 0 and 1 (0 when nothing was played).
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def close(self):
+        """
+        Stops the pending downloads.
+
+        :return: None
+        """
+        for task in list(self._downloads.values()):
+            task.cancel()
+        await asyncio.gather(*self._downloads.values(), return_exceptions=True)
+
+    async def _download(self, video_id, url, fmt):
+        """
+        Downloads a song to the cache as an Ogg Opus file.
+        """
+        path = self._path(video_id)
+        partial = f"{path}.{os.getpid()}{PARTIAL_EXTENSION}"  # Shard processes may share the cache folder
+
+        if can_passthrough(fmt):
+            codec = ["-c:a", "copy"]
+        else:
+            codec = ["-c:a", "libopus", "-b:a", f"{encode_bitrate(fmt, CACHE_BITRATE * 1000)}k"]
+
+        async with self._download_lock:  # One download at a time, playback comes first
+            expires = stream_url_expiry(url)
+            if expires is not None and expires - STREAM_EXPIRY_MARGIN <= time.time():
+                # Expired while waiting for the downloads before it; a later play queues it again with a fresh URL
+                logger.info(f"Skipped caching song {video_id}: its stream URL expired while waiting")
+                return
+
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+                *shlex.split(FFMPEG_OPTIONS['before_options']), "-i", url,
+                "-vn", "-map_metadata", "-1", *codec, "-f", "opus", partial,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                _, stderr = await process.communicate()
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                self._remove(partial)
+                raise
+
+            if process.returncode != 0:
+                logger.warning(f"Failed to cache song {video_id}: {stderr.decode(errors='replace').strip()[-200:]}")
+                self._remove(partial)
+                return
+
+            try:
+                os.replace(partial, path)  # Atomic: the song is either fully cached or not at all
+                size = os.path.getsize(path)
+            except OSError as e:  # Deleted by another process sharing the folder, or the disk went away
+                logger.warning(f"Failed to cache song {video_id}: {e}")
+                self._remove(partial)
+                return
+
+        self._files[video_id] = size
+        self._size += size
+        self._evict()
+        logger.info(
+            f"Cached song {video_id} ({size / 1024 ** 2:.1f} MB, {len(self._files)} songs, "
+            f"{self._size / 1024 ** 2:.1f} MB total, hit ratio {self.hit_ratio():.0%})"
+        )
+
+    def _evict(self):
+        """
+        Deletes the least recently played files until the cache fits in max_bytes.
+        """
+        while self._size > self.max_bytes and self._files:
+            video_id = next(iter(self._files))
+            self._remove(self._path(video_id))
+            self._forget(video_id)
+
+    def _forget(self, video_id):
+        self._size -= self._files.pop(video_id, 0)
+
+    def _path(self, video_id):
+        return os.path.join(self.directory, video_id + CACHE_EXTENSION)
+
+    @staticmethod
+    def _abandoned(entry):
+        """
+        Tells whether a partial file is left from an interrupted download, rather than being
+        written by another shard process: its writer is gone, or it is older than PARTIAL_MAX_AGE.
+        """
+        try:
+            if time.time() - entry.stat().st_mtime > PARTIAL_MAX_AGE:
+                return True
+            pid = int(entry.name[:-len(PARTIAL_EXTENSION)].rsplit(".", 1)[1])
+        except (OSError, IndexError, ValueError):
+            return True
+        if pid == os.getpid():  # Written before a restart that reused this pid
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:  # Alive, owned by another user
+            return False
+        return False
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _scan(self):
+        """
+        Lists the cached files as (video ID, size), least recently played first.
+        Deletes the partial files left by interrupted downloads.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(PARTIAL_EXTENSION):
+                if self._abandoned(entry):
+                    self._remove(entry.path)
+            elif entry.name.endswith(CACHE_EXTENSION):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len(CACHE_EXTENSION)], stat.st_size))
+        return [(video_id, size) for _, video_id, size in sorted(files)]
@@ -0,0 +1,103 @@
+import logging
+import time
+from collections import namedtuple
+
+import discord
+
+from bot.utils import metrics
+
+logger = logging.getLogger("discord")
+
+# YouTube will sometimes try to disconnect the bot from its servers. Use this to reconnect instantly.
+# (Because of this disconnect/reconnect cycle, sometimes you will listen a sudden and brief stop)
+FFMPEG_OPTIONS = {
+    'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
+    'options': '-vn'
+}
+
+# Discord plays Opus at 48 kHz, so only such streams can be passed through as is.
+OPUS_SAMPLE_RATE = 48000
+
+# Bitrate bounds (kbps) accepted by the Opus encoder.
+MIN_BITRATE = 16
+MAX_BITRATE = 512
+
+# Audio format of a song's stream, as reported by yt-dlp for the chosen format.
+# codec: str or None ('opus', 'mp4a.40.2', ...), sample_rate: int or None (Hz), bitrate: float or None (kbps)
+AudioFormat = namedtuple('AudioFormat', ('codec', 'sample_rate', 'bitrate'))
+
+
+def audio_format(info):
+    """
+    Reads the audio format of a resolved song.
+
+    :param info: dict - Slimmed info dict (see resolver.TRACK_FIELDS).
+    :return: AudioFormat or None if yt-dlp did not report the codec.
+    """
+    codec = info.get('acodec')
+    if not codec or codec == 'none':
+        return None
+    return AudioFormat(codec, info.get('asr'), info.get('abr'))
+
+
+def can_passthrough(fmt):
+    """
+    Tells whether a stream can be sent to Discord without re-encoding.
+
+    :param fmt: AudioFormat or None
+    :return: bool - True for Opus streams at 48 kHz (or an unreported sample rate).
+    """
+    return fmt is not None and fmt.codec == 'opus' and fmt.sample_rate in (None, OPUS_SAMPLE_RATE)
+
+
+def encode_bitrate(fmt, channel_bitrate):
+    """
+    Picks the bitrate (kbps) to re-encode a stream at: the voice channel's bitrate,
+    but never more than the stream itself has.
+
+    :param fmt: AudioFormat or None
+    :param channel_bitrate: int or None - Bitrate of the voice channel in bps.
+    :return: int - Bitrate in kbps.
+    """
+    bitrate = channel_bitrate // 1000 if channel_bitrate else 128
+    if fmt is not None and fmt.bitrate:
+        bitrate = min(bitrate, int(fmt.bitrate))
+    return max(MIN_BITRATE, min(MAX_BITRATE, bitrate))
+
+
+def source_mode(fmt):
+    """
+    Tells how a stream will be turned into Opus by create_audio_source.
+
+    :param fmt: AudioFormat or None
+    :return: str - "passthrough", "encode" or "probe".
+    """
+    if fmt is None:
+        return "probe"
+    return "passthrough" if can_passthrough(fmt) else "encode"
+
+
+async def create_audio_source(url, fmt=None, channel_bitrate=None):
+    """
+    Creates the audio source streaming a song, without probing the stream when its format is known.
+
+    - Opus at 48 kHz (YouTube's webm audio): the packets are copied as is, ffmpeg only remuxes.
+    - Other known formats: re-encoded to Opus at the channel's bitrate.
+    - Unknown format: probed with ffprobe first, as discord.py does by default.
+
+    :param url: str - The stream URL of the song.
+    :param fmt: AudioFormat or None - The format yt-dlp reported for the stream.
+    :param channel_bitrate: int or None - Bitrate of the voice channel in bps.
+    :return: tuple - (discord.FFmpegOpusAudio, mode) with mode "passthrough", "encode" or "probe".
+    """
+    started = time.perf_counter()
+    mode = source_mode(fmt)
+    if mode == "probe":
+        source = await discord.FFmpegOpusAudio.from_probe(url, **FFMPEG_OPTIONS)
+    elif mode == "passthrough":
+        source = discord.FFmpegOpusAudio(url, codec='copy', **FFMPEG_OPTIONS)
+    else:
+        source = discord.FFmpegOpusAudio(url, bitrate=encode_bitrate(fmt, channel_bitrate), **FFMPEG_OPTIONS)
+
+    metrics.AUDIO_SOURCE_SECONDS.observe(time.perf_counter() - started, mode=mode)
+    return source, mode
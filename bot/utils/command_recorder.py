@@ -0,0 +1,140 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger("discord")
+
+
+class CommandRecorder:
+    """
+    A class used to record the bot's traffic as a compact JSONL trace, for benchmarks/replay.py.
+
+    Each line is one event: {"t": unix time, "ev": event, ...fields}. Events are
+    "command" (guild, user, cmd, arg), "resolve" (fn, ms, outcome), "start" (guild,
+    video, duration) and "end" (guild, error). Lines are buffered and appended to
+    the file by a background task on a dedicated thread, so the event loop never
+    blocks on disk.
+
+    Attributes
+    ----------
+    path : str
+        Location of the trace file. Traces of successive runs are appended.
+    flush_interval : float
+        Max seconds an event waits before being written.
+
+    Methods
+    -------
+    start()
+        Opens the trace file and starts the background writer.
+
+    record(event, **fields)
+        Buffers an event to be written.
+
+    close()
+        Writes the buffered events and closes the file.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 2.0) -> None:
+        self.path: str = path
+        self.flush_interval: float = flush_interval
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="recorder")
+        self._file = None
+        self._buffer = []
+        self._writer = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a recorder writing to COMMAND_TRACE_PATH.
+
+        :return: CommandRecorder or None if COMMAND_TRACE_PATH is not set.
+        """
+        path = os.getenv("COMMAND_TRACE_PATH", "")
+        if not path:
+            return None
+        return cls(path)
+
+    async def start(self):
+        """
+        Opens the trace file and starts the background writer.
+
+        :return: None
+        """
+        await self._run(self._open)
+        self._writer = asyncio.create_task(self._write_loop())
+        logger.info(f"Recording commands to '{self.path}'")
+
+    def record(self, event, **fields):
+        """
+        Buffers an event to be written. Does not wait for the write.
+
+        :param event: str - "command", "resolve", "start" or "end".
+        :param fields: Fields of the event (None values are left out).
+        :return: None
+        """
+        if self._writer is None:
+            return
+        line = {"t": round(time.time(), 3), "ev": event}
+        line.update((key, value) for key, value in fields.items() if value is not None)
+        self._buffer.append(json.dumps(line, ensure_ascii=False, separators=(",", ":")))
+
+    async def close(self):
+        """
+        Writes the buffered events and closes the file.
+
+        :return: None
+        """
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+            await self._flush()
+
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _write_loop(self):
+        """
+        Writes the buffered events every flush_interval seconds.
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            await self._run(self._write, lines)
+        except OSError as e:
+            logger.error(f"Failed to write {len(lines)} command trace events: {e}")
+
+    # The methods below run on the recorder thread only.
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, lines):
+        if self._file is None:
+            return
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
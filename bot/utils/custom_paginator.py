@@ -1,20 +1,133 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+
 from Paginator import Simple
 import discord
 
+class LazyPages(Sequence):
+    """
+    A sequence of embed pages rendered on demand.
+
+    Pages are built by a provider function the first time they are viewed, and the
+    few most recently viewed ones are kept so flipping back and forth does not
+    render them again.
+
+    Attributes
+    ----------
+    provider : callable
+        Function taking a page index and returning its discord.Embed.
+    count : int
+        Number of pages.
+    cache_size : int
+        Number of rendered pages kept.
+    """
+
+    def __init__(self, provider, count: int, cache_size: int = 4) -> None:
+        self.provider = provider
+        self.count: int = count
+        self.cache_size: int = cache_size
+        self._rendered: OrderedDict = OrderedDict()  # page index -> discord.Embed
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("page index out of range")
+
+        page = self._rendered.get(index)
+        if page is None:
+            page = self.provider(index)
+            self._rendered[index] = page
+            while len(self._rendered) > self.cache_size:
+                self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(index)
+        return page
+
+class JumpToPageModal(discord.ui.Modal, title="Go to page"):
+    """
+    A modal asking for the page number to jump to.
+    """
+
+    def __init__(self, paginator):
+        super().__init__()
+        self.paginator = paginator
+        self.page = discord.ui.TextInput(
+            label=f"Page (1-{paginator.total_page_count})",
+            placeholder=str(paginator.current_page + 1),
+            max_length=6
+        )
+        self.add_item(self.page)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        """
+        Moves the paginator to the submitted page.
+
+        :param interaction: The Discord interaction triggered by the modal submission.
+        """
+        value = self.page.value.strip()
+        if not value.isdigit() or not 1 <= int(value) <= self.paginator.total_page_count:
+            await interaction.response.send_message(
+                f"*❌ Please enter a page number between 1 and {self.paginator.total_page_count}.*", ephemeral=True
+            )
+            return
+
+        await self.paginator.go_to(int(value) - 1)
+        await interaction.response.defer()
+
 class CustomPaginator(Simple):
     """
-    A subclass of the Paginator's Simple class that customizes the behavior 
+    A subclass of the Paginator's Simple class that customizes the behavior
     of the next and previous buttons in the pagination system.
 
-    The main purpose is to override the original behavior where only the 
+    The main purpose is to override the original behavior where only the
     executor could control the pagination.
+
+    Pages can also come from a page provider instead of a list, in which case they
+    are only rendered when viewed (see LazyPages). Paginators with at least
+    JUMP_MIN_PAGES pages get a "Go to page" button.
     """
 
+    JUMP_MIN_PAGES = 3
+
+    async def start(self, ctx, pages=None, page_provider=None, page_count=None):
+        """
+        Sends the first page and starts handling the buttons.
+
+        :param ctx: The command context or interaction.
+        :param pages: list of discord.Embed - Pre-rendered pages.
+        :param page_provider: callable - Alternative to pages: function taking a page index
+            and returning its discord.Embed, called when the page is first viewed.
+        :param page_count: int - Number of pages, required with page_provider.
+        """
+        if page_provider is not None:
+            pages = LazyPages(page_provider, page_count)
+
+        if len(pages) >= self.JUMP_MIN_PAGES:
+            jump_button = discord.ui.Button(label="Go to page", style=discord.ButtonStyle.grey, row=1)
+            jump_button.callback = self.jump_button_callback
+            self.add_item(jump_button)
+
+        await super().start(ctx, pages=pages)
+
+    async def go_to(self, index: int):
+        """
+        Moves to the page at index.
+
+        :param index: int - Zero-based page index.
+        """
+        self.current_page = index
+        self.page_counter.label = f"{self.current_page + 1}/{self.total_page_count}"
+        await self.message.edit(embed=self.pages[self.current_page], view=self)
+
     async def next_button_callback(self, interaction: discord.Interaction):
         """
         Handles the 'Next' button click event in the paginator.
 
-        Moves to the next page in the pagination and defers the interaction 
+        Moves to the next page in the pagination and defers the interaction
         response to avoid an unnecessary visible loading indicator.
 
         :param interaction: The Discord interaction triggered by the button click.
@@ -26,10 +139,20 @@ class CustomPaginator(Simple):
         """
         Handles the 'Previous' button click event in the paginator.
 
-        Moves to the previous page in the pagination and defers the interaction 
+        Moves to the previous page in the pagination and defers the interaction
         response to avoid an unnecessary visible loading indicator.
 
         :param interaction: The Discord interaction triggered by the button click.
         """
         await self.previous()
-        await interaction.response.defer()
\ No newline at end of file
+        await interaction.response.defer()
+
+    async def jump_button_callback(self, interaction: discord.Interaction):
+        """
+        Handles the 'Go to page' button click event in the paginator.
+
+        Opens a modal asking for the page number.
+
+        :param interaction: The Discord interaction triggered by the button click.
+        """
+        await interaction.response.send_modal(JumpToPageModal(self))
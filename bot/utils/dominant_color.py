@@ -0,0 +1,204 @@
+import asyncio
+import concurrent.futures
+import io
+import logging
+import os
+import time
+
+import aiohttp
+from PIL import Image
+
+from bot.utils import metrics
+from bot.utils.track_cache import LRUCache
+
+logger = logging.getLogger("discord")
+
+# Embed color used when a thumbnail is missing or cannot be processed (blue).
+DEFAULT_COLOR = 0x3498db
+
+# Color modes:
+# "average" - mean color of the thumbnail (cheapest)
+# "dominant" - most common color after quantizing the thumbnail to a small palette
+COLOR_MODES = ("average", "dominant")
+
+# Max width/height the thumbnail is reduced to before any color math.
+SAMPLE_SIZE = 32
+
+# Number of palette colors used by the "dominant" mode.
+PALETTE_SIZE = 8
+
+# CPU seconds a single thumbnail may use. If decoding alone already used it up,
+# the "dominant" mode falls back to the average color.
+CPU_BUDGET = 0.01
+
+
+def smallest_thumbnail(thumbnails):
+    """
+    Picks the smallest thumbnail variant reported by yt-dlp, which is plenty for color math.
+
+    :param thumbnails: list - yt-dlp thumbnail dicts ('url', optionally 'width' and 'height').
+    :return: str or None - URL of the smallest thumbnail (the first one if none report a size).
+    """
+    if not thumbnails:
+        return None
+
+    sized = [t for t in thumbnails if t.get('url') and t.get('width') and t.get('height')]
+    if sized:
+        return min(sized, key=lambda t: t['width'] * t['height'])['url']
+    return thumbnails[0].get('url')
+
+
+def compute_dominant_color(data, mode="average"):
+    """
+    Decodes an image and returns its color as a Discord-compatible integer.
+
+    The image is decoded straight at reduced scale where the format allows it (JPEG),
+    then shrunk to SAMPLE_SIZE. All pixel math happens inside PIL's C code.
+
+    Blocking (PIL decode), so it runs in the color service's executor.
+
+    :param data: bytes - The encoded image.
+    :param mode: str - "average" or "dominant" (default: "average").
+    :return: int - Discord embed color
+    """
+    started = time.thread_time()
+
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (SAMPLE_SIZE, SAMPLE_SIZE))  # Lets the JPEG decoder skip detail we don't need
+    image = image.convert("RGB")  # Ensure it's in RGB format
+    image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BOX)
+
+    if mode == "dominant" and time.thread_time() - started < CPU_BUDGET:
+        palette_image = image.quantize(colors=PALETTE_SIZE, method=Image.Quantize.FASTOCTREE)
+        _, index = max(palette_image.getcolors(PALETTE_SIZE))  # (count, palette index) of the most common color
+        r, g, b = palette_image.getpalette()[index * 3:index * 3 + 3]
+    else:
+        # A box filter down to a single pixel is the average of all pixels
+        r, g, b = image.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+
+    return (r << 16) + (g << 8) + b  # Convert RGB to int
+
+
+class ColorService:
+    """
+    A class used to compute embed colors from song thumbnails without blocking the event loop.
+
+    Thumbnails are downloaded through one shared aiohttp connection pool and decoded
+    in a small executor. Results are memoized per thumbnail URL and per video ID, and
+    concurrent requests for the same thumbnail share a single download.
+
+    Attributes
+    ----------
+    mode : str
+        Color mode, "average" or "dominant".
+    timeout : float
+        Seconds allowed for downloading a thumbnail.
+    cache : LRUCache
+        "url:<thumbnail url>" or "id:<video id>" -> color.
+
+    Methods
+    -------
+    get(image_url, video_id, default)
+        Returns the dominant color of a thumbnail, or default if it cannot be computed.
+
+    close()
+        Closes the HTTP connection pool and the executor.
+    """
+
+    def __init__(
+        self,
+        mode: str = "average",
+        max_size: int = 1024,
+        timeout: float = 5.0,
+        max_workers: int = 2
+    ) -> None:
+        if mode not in COLOR_MODES:
+            raise ValueError(f"Unknown color mode: '{mode}' (expected one of {COLOR_MODES})")
+
+        self.mode: str = mode
+        self.timeout: float = timeout
+        self.cache: LRUCache = LRUCache(max_size)
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="color")
+        self._http = None
+        self._in_flight = {}  # thumbnail url -> asyncio.Future
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a color service using the COLOR_MODE environment variable (average/dominant).
+
+        :return: ColorService
+        """
+        return cls(mode=os.getenv("COLOR_MODE", "average").lower())
+
+    async def get(self, image_url, video_id=None, default=DEFAULT_COLOR):
+        """
+        Returns the dominant color of a thumbnail as a Discord-compatible integer.
+        Returns `default` (blue) if the URL is invalid or the thumbnail cannot be processed.
+
+        :param image_url: str - URL of the thumbnail
+        :param video_id: str or None - ID of the video the thumbnail belongs to
+        :param default: int or None - Returned when no color could be computed
+        :return: int - Discord embed color (or default)
+        """
+        if video_id:
+            color = self.cache.get(f"id:{video_id}")
+            if color is not None:
+                return color
+
+        if not image_url or not image_url.startswith(("http://", "https://")):
+            logger.warning(f"Invalid or missing image URL: '{image_url}' (Defaulting to blue)")
+            return default
+
+        color = self.cache.get(f"url:{image_url}")
+        if color is None:
+            future = self._in_flight.get(image_url)
+            if future is None:
+                future = asyncio.ensure_future(self._fetch(image_url))
+                self._in_flight[image_url] = future
+                future.add_done_callback(lambda _: self._in_flight.pop(image_url, None))
+            color = await asyncio.shield(future)
+            if color is None:  # Failed: nothing is memoized, so a later request can retry
+                return default
+
+        if video_id:
+            self.cache.set(f"id:{video_id}", color)
+        return color
+
+    async def _fetch(self, image_url):
+        """
+        Downloads and decodes a thumbnail, memoizing the result.
+
+        :return: int or None - The color, or None if the thumbnail could not be processed.
+        """
+        started = time.perf_counter()
+        try:
+            if self._http is None or self._http.closed:
+                self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+            async with self._http.get(image_url) as response:
+                response.raise_for_status()  # Raise an error for bad HTTP responses (e.g., 404, 500)
+                data = await response.read()
+
+            loop = asyncio.get_running_loop()
+            color = await loop.run_in_executor(self._executor, compute_dominant_color, data, self.mode)
+        except Exception as e:
+            logger.error(f"Failed to get dominant color: {e}")
+            metrics.COLOR_SECONDS.observe(time.perf_counter() - started, outcome="error")
+            return None
+
+        metrics.COLOR_SECONDS.observe(time.perf_counter() - started, outcome="ok")
+        self.cache.set(f"url:{image_url}", color)
+        return color
+
+    async def close(self):
+        """
+        Closes the HTTP connection pool and the executor.
+
+        :return: None
+        """
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+        self._executor.shutdown(wait=False)
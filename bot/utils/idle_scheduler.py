@@ -0,0 +1,108 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("discord")
+
+
+class IdleScheduler:
+    """
+    A class used to hold one deadline per guild, e.g. to leave idle voice channels.
+
+    Each deadline is an asyncio timer (loop.call_later), kept in the event loop's own
+    timer heap: setting or cancelling one is a single operation, and nothing runs
+    until a deadline is due. When it is, the callback is run as a task that the
+    scheduler keeps track of, so close() can cancel it.
+
+    Attributes
+    ----------
+    callback : coroutine function
+        Called as callback(guild_id, reason) when a guild's deadline is reached.
+
+    Methods
+    -------
+    schedule(guild_id, delay, reason)
+        Sets the guild's deadline, unless one is already set for the same reason.
+
+    cancel(guild_id)
+        Removes the guild's deadline.
+
+    reason(guild_id)
+        Returns the reason of the guild's deadline, or None.
+
+    close()
+        Removes all deadlines and cancels the callbacks still running.
+    """
+
+    def __init__(self, callback) -> None:
+        self.callback = callback
+        self._deadlines = {}  # guild ID -> (asyncio.TimerHandle, reason)
+        self._tasks = set()  # Callbacks still running
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, guild_id, delay, reason):
+        """
+        Sets the guild's deadline to `delay` seconds from now.
+
+        A deadline already set for the same reason is kept as is, so repeated events
+        do not push it back. A deadline set for another reason is replaced.
+
+        :param guild_id: int
+        :param delay: float - Seconds until the callback runs.
+        :param reason: str - Passed to the callback (e.g. "idle", "empty").
+        :return: None
+        """
+        current = self._deadlines.get(guild_id)
+        if current is not None:
+            if current[1] == reason:
+                return
+            current[0].cancel()
+
+        handle = asyncio.get_running_loop().call_later(delay, self._fire, guild_id, reason)
+        self._deadlines[guild_id] = (handle, reason)
+
+    def cancel(self, guild_id):
+        """
+        Removes the guild's deadline, if any.
+
+        :param guild_id: int
+        :return: None
+        """
+        current = self._deadlines.pop(guild_id, None)
+        if current is not None:
+            current[0].cancel()
+
+    def reason(self, guild_id):
+        """
+        Returns the reason of the guild's deadline.
+
+        :param guild_id: int
+        :return: str or None - None if no deadline is set.
+        """
+        current = self._deadlines.get(guild_id)
+        return current[1] if current is not None else None
+
+    def close(self):
+        """
+        Removes all deadlines and cancels the callbacks still running.
+
+        :return: None
+        """
+        for handle, _ in self._deadlines.values():
+            handle.cancel()
+        self._deadlines.clear()
+        for task in self._tasks:
+            task.cancel()
+
+    def _fire(self, guild_id, reason):
+        self._deadlines.pop(guild_id, None)
+        task = asyncio.create_task(self._run(guild_id, reason))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, guild_id, reason):
+        try:
+            await self.callback(guild_id, reason)
+        except Exception as e:
+            logger.error(f"Idle callback for guild {guild_id} ({reason}) failed: {e}")
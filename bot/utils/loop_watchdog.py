@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+import bot
+from bot.utils import metrics
+from bot.utils.tracing import percentile
+
+logger = logging.getLogger("discord")
+
+# Folder of the bot's own code, to find the frame of ours that blocked the loop.
+BOT_DIRECTORY = os.path.dirname(os.path.abspath(bot.__file__))
+
+# Number of innermost frames logged with a stall.
+STACK_DEPTH = 12
+
+
+class LoopWatchdog:
+    """
+    A class used to measure the event loop's scheduling lag and name the code blocking it.
+
+    A heartbeat task on the loop wakes up every `interval` seconds and records how
+    late it woke up. A watchdog thread checks the heartbeat: when it is more than
+    `threshold` seconds overdue, the loop is blocked right now, so the thread
+    captures the loop thread's stack and logs the innermost frame of the bot's own
+    code (e.g. a requests.get inside an async function). One stack is logged per
+    stall, and at most one every `log_interval` seconds.
+
+    Attributes
+    ----------
+    threshold : float
+        Lag in seconds from which the loop counts as blocked.
+    interval : float
+        Seconds between two heartbeats.
+    log_interval : float
+        Min seconds between two logged stacks.
+    lags : deque
+        Recent lag samples in seconds.
+    stalls : int
+        Number of times the loop was blocked for more than threshold.
+
+    Methods
+    -------
+    start()
+        Starts the heartbeat and the watchdog thread.
+
+    summary()
+        Returns lag percentiles over the recent samples.
+
+    close()
+        Stops the heartbeat and the watchdog thread.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, log_interval: float = 60.0, max_samples: int = 3000) -> None:
+        self.threshold: float = threshold
+        self.interval: float = interval
+        self.log_interval: float = log_interval
+        self.lags: deque = deque(maxlen=max_samples)
+        self.stalls: int = 0
+
+        self._loop_thread_id = None
+        self._last_beat = time.monotonic()
+        self._reported_beat = None  # Heartbeat of the stall already reported
+        self._logged_at = None
+        self._suppressed = 0  # Stalls not logged since the last logged one
+        self._heartbeat = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a watchdog with a threshold of LOOP_LAG_THRESHOLD_MS milliseconds (default: 250).
+
+        :return: LoopWatchdog or None if LOOP_LAG_THRESHOLD_MS is 0.
+        """
+        threshold = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250"))
+        if threshold <= 0:
+            return None
+        return cls(threshold=threshold / 1000)
+
+    async def start(self):
+        """
+        Starts the heartbeat on the running loop and the watchdog thread.
+
+        :return: None
+        """
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def summary(self):
+        """
+        Returns lag percentiles over the recent samples.
+
+        :return: dict - {'count', 'p50', 'p95', 'p99', 'max'} (seconds) and 'stalls'.
+        """
+        lags = list(self.lags)
+        return {
+            'count': len(lags),
+            'p50': percentile(lags, 50),
+            'p95': percentile(lags, 95),
+            'p99': percentile(lags, 99),
+            'max': max(lags, default=0.0),
+            'stalls': self.stalls,
+        }
+
+    async def close(self):
+        """
+        Stops the heartbeat and the watchdog thread.
+
+        :return: None
+        """
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _beat(self):
+        """
+        Records how late the loop wakes up from a sleep of `interval` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lags.append(lag)
+            metrics.LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                self.stalls += 1
+            self._last_beat = time.monotonic()
+
+    def _watch(self):
+        """
+        Runs on the watchdog thread: reports the loop's stack when the heartbeat is overdue.
+        """
+        while not self._stopped.wait(self.threshold / 2):
+            last_beat = self._last_beat
+            overdue = time.monotonic() - last_beat - self.interval
+            if overdue < self.threshold or last_beat == self._reported_beat:
+                continue
+            self._reported_beat = last_beat
+
+            now = time.monotonic()
+            if self._logged_at is not None and now - self._logged_at < self.log_interval:
+                self._suppressed += 1
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._logged_at = now
+            self._report(overdue, traceback.extract_stack(frame))
+            del frame
+
+    def _report(self, overdue, stack):
+        """
+        Logs the frame blocking the loop and the innermost frames of its stack.
+        """
+        own = [entry for entry in stack if entry.filename.startswith(BOT_DIRECTORY)]
+        culprit = own[-1] if own else stack[-1]
+        suppressed = f" ({self._suppressed} more stalls since the last report)" if self._suppressed else ""
+        self._suppressed = 0
+        logger.warning(
+            f"Event loop blocked for over {overdue * 1000:.0f} ms in "
+            f"{os.path.relpath(culprit.filename)}:{culprit.lineno} {culprit.name}(): {culprit.line}{suppressed}\n"
+            + "".join(traceback.format_list(stack[-STACK_DEPTH:])).rstrip()
+        )
@@ -0,0 +1,351 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger("discord")
+
+# Upper bounds (seconds) of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """
+    Base class of the metrics: a name, a help text and optional label names.
+
+    Values are kept per label values tuple, in the order of labelnames.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self):
+        """
+        Returns the lines of the metric in Prometheus text format, without the HELP/TYPE header.
+
+        :return: list of str
+        """
+        raise NotImplementedError
+
+    def render(self):
+        """
+        Returns the metric in Prometheus text format.
+
+        :return: str
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    A value that only goes up, e.g. a number of requests.
+    """
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = defaultdict(float)
+        if not self.labelnames:
+            self._values[()] = 0.0  # Exposed as 0 before the first increment
+
+    def inc(self, amount=1, **labels):
+        """
+        Increments the counter.
+
+        :param amount: float - Increment (default: 1).
+        :param labels: Label values.
+        """
+        self._values[self._key(labels)] += amount
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """
+    A value read when the metrics are scraped, so keeping it up to date costs nothing.
+
+    The function returns either a single number, or a dict of label values tuple -> number.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, function, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def samples(self):
+        value = self.function()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {number}" for key, number in value.items()]
+
+
+class CallbackCounter(Gauge):
+    """
+    A Gauge whose function returns a value that only goes up, e.g. cache hits counted elsewhere.
+    """
+
+    type = "counter"
+
+
+class Histogram(Metric):
+    """
+    Counts observed values (e.g. durations in seconds) in cumulative buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        """
+        Records one value.
+
+        :param value: float
+        :param labels: Label values.
+        """
+        key = self._key(labels)
+        counts = self._values.get(key)
+        if counts is None:
+            counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Records the duration of a with block.
+
+        Usage: with metrics.RESOLVER_SECONDS.time(function="extract_track"): ...
+
+        :param labels: Label values.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        lines = []
+        for key, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    A class used to collect the metrics exposed by the metrics server.
+
+    Methods
+    -------
+    register(metric)
+        Adds a metric (replacing one with the same name) and returns it.
+
+    unregister(name)
+        Removes a metric.
+
+    render()
+        Returns all metrics in Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        self._metrics = {}  # name -> Metric
+
+    def register(self, metric):
+        """
+        Adds a metric, replacing one with the same name.
+
+        :param metric: Metric
+        :return: Metric - The registered metric.
+        """
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name):
+        """
+        Removes a metric.
+
+        :param name: str
+        :return: None
+        """
+        self._metrics.pop(name, None)
+
+    def render(self):
+        """
+        Returns all metrics in Prometheus text format.
+
+        :return: str
+        """
+        parts = []
+        for metric in list(self._metrics.values()):
+            try:
+                parts.append(metric.render())
+            except Exception as e:  # A broken gauge should not hide the other metrics
+                logger.warning(f"Failed to render metric {metric.name}: {e}")
+        return "\n".join(parts) + "\n"
+
+
+# Metrics shared by the whole bot.
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.register(Histogram(
+    "musicbot_command_seconds", "Time spent running a command.", ("command", "outcome")
+))
+RESOLVER_SECONDS = REGISTRY.register(Histogram(
+    "musicbot_resolver_seconds", "Time spent in a yt-dlp extraction (extract_info).", ("function", "outcome")
+))
+AUDIO_SOURCE_SECONDS = REGISTRY.register(Histogram(
+    "musicbot_audio_source_seconds", "Time spent creating an audio source (ffprobe and ffmpeg spawn).", ("mode",)
+))
+COLOR_SECONDS = REGISTRY.register(Histogram(
+    "musicbot_color_seconds", "Time spent downloading and decoding a thumbnail for its color.", ("outcome",)
+))
+HANDOFF_SECONDS = REGISTRY.register(Histogram(
+    "musicbot_handoff_seconds", "Time between the end of a song and the start of the next one."
+))
+LOOP_LAG_SECONDS = REGISTRY.register(Histogram(
+    "musicbot_loop_lag_seconds", "How late the event loop runs a timer (blocking code shows up here).",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+))
+RATE_LIMITS = REGISTRY.register(Counter(
+    "musicbot_discord_rate_limits_total", "Discord REST responses with status 429."
+))
+
+# Part of the warnings discord.py's HTTP client logs for each 429 response (retried or not).
+RATE_LIMIT_MESSAGE = "responded with 429"
+
+
+class RateLimitCounter(logging.Handler):
+    """
+    A logging handler counting the 429 responses reported by discord.py's HTTP client.
+
+    Usage: logging.getLogger("discord.http").addHandler(RateLimitCounter())
+    """
+
+    def __init__(self) -> None:
+        super().__init__(level=logging.WARNING)
+
+    def emit(self, record):
+        # One such message per 429 response; a global rate limit logs a second message for the same response
+        if RATE_LIMIT_MESSAGE in str(record.msg):
+            RATE_LIMITS.inc()
+
+
+class MetricsServer:
+    """
+    A class used to expose the metrics over HTTP, for Prometheus to scrape.
+
+    Metrics are only computed when scraped; the server does nothing in between.
+
+    Attributes
+    ----------
+    host : str
+        Address the server listens on.
+    port : int
+        Port the server listens on.
+    registry : Registry
+        Metrics served at /metrics.
+
+    Methods
+    -------
+    start()
+        Starts listening.
+
+    close()
+        Stops listening.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100, registry: Registry = REGISTRY) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.registry: Registry = registry
+        self._server = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a metrics server on METRICS_HOST (default: 127.0.0.1) and METRICS_PORT.
+
+        :return: MetricsServer or None if METRICS_PORT is not set.
+        """
+        port = os.getenv("METRICS_PORT", "")
+        if not port:
+            return None
+        return cls(host=os.getenv("METRICS_HOST", "127.0.0.1"), port=int(port))
+
+    async def start(self):
+        """
+        Starts listening.
+
+        :return: None
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        """
+        Stops listening.
+
+        :return: None
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass  # Headers are not needed
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, content_type, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", self.registry.render()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", "Not found\n"
+
+            body = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -1,45 +1,80 @@
-from collections import namedtuple
+import enum
+import logging
 
-class Queue:
-    """
-    A class used to represent a queue.
+logger = logging.getLogger("discord")
 
-    A Queue is a playlist of songs per Session.
+class Track:
+    """
+    A class used to represent a song in a Queue.
 
     Attributes
     ----------
-    current_music_url : str
-        The url of the current music the bot is playing.
-
-    current_music_title : str
-        The name of the current music the bot is playing.
-
-    current_music_thumb : str
-        The thumbnail url of the current music the bot is playing.
-
-    current_music_ytube : str
-        The youtube url of the current music the bot is playing.
+    title : str
+        The name of the music.
+    url : str
+        The stream url of the music.
+    thumb : str
+        The thumbnail url of the music.
+    ytube : str
+        The youtube url of the music.
+    duration : int
+        The duration of the music in seconds.
+    user : int
+        The user ID that added the music to the queue.
+    expires : float or None
+        Unix timestamp at which the stream url expires (None if unknown).
+    audio_format : AudioFormat or None
+        Codec, sample rate and bitrate of the stream (None if unknown).
+    video_id : str or None
+        The YouTube video ID (None if unknown).
+    color_thumb : str or None
+        The smallest thumbnail url, used to compute the embed color (None if unknown).
+    """
+    __slots__ = ('title', 'url', 'thumb', 'ytube', 'duration', 'user', 'expires', 'audio_format', 'video_id', 'color_thumb')
+
+    def __init__(self, title, url, thumb, ytube, duration, user, expires=None, audio_format=None, video_id=None, color_thumb=None):
+        self.title = title
+        self.url = url
+        self.thumb = thumb
+        self.ytube = ytube
+        self.duration = duration
+        self.user = user
+        self.expires = expires
+        self.audio_format = audio_format
+        self.video_id = video_id
+        self.color_thumb = color_thumb
+
+    def __repr__(self):
+        return f"Track(title={self.title!r}, ytube={self.ytube!r}, duration={self.duration!r})"
+
+# Returned as the current music when there is none.
+NO_TRACK = Track('', '', '', '', '', '')
 
-    current_music_duration : str
-        The duration of the current music the bot is playing in seconds.
+class Queue:
+    """
+    A class used to represent a queue.
 
-    current_music_user : str
-        The user ID that added the current music to the queue.
+    A Queue is a playlist of songs per Session. Songs stay in the queue once played;
+    a cursor points at the current one, so moving to, peeking at and counting songs
+    are O(1), and the same song can be queued more than once.
 
-    last_title_enqueued : str
-        The title of the last music enqueued.
+    Attributes
+    ----------
+    current_music : Track
+        The music the bot is playing (NO_TRACK if none).
 
-    queue : tuple list
+    queue : Track list
         The actual queue of songs to play.
-        (title, url, thumb, ytube, duration)
 
     Methods
     -------
-    enqueue(music_title, music_url, music_thumb, music_ytube, duration, user)
-        Enqueue the music tuple to the queue while setting last_title_enqueued
-	and the current_music variables as needed
+    enqueue(music_title, music_url, music_thumb, music_ytube, duration, user, expires, format, video_id, color_thumb)
+        Enqueue the music to the queue, making it the current one if the queue was empty.
 
     dequeue()
+        Removes the first music enqueued from the queue.
+
+    remove_last()
         Removes the last music enqueued from the queue.
 
     next()
@@ -48,6 +83,9 @@ class Queue:
     theres_next()
         Checks if there is a music in the queue after the current one.
 
+    peek_next()
+        Returns the music after the current one without moving to it.
+
     clear_queue()
         Clears the queue, resetting all variables as needed.
 
@@ -62,11 +100,14 @@ class Queue:
 
     """
     def __init__(self):
-        self.music = namedtuple('music', ('title', 'url', 'thumb', 'ytube', 'duration', 'user'))
-        self.current_music = self.music('', '', '', '', '', '')
-
-        self.last_title_enqueued = ''
         self.queue = []
+        self.cursor = -1  # Index of the current music, -1 if none
+
+    @property
+    def current_music(self):
+        if 0 <= self.cursor < len(self.queue):
+            return self.queue[self.cursor]
+        return NO_TRACK
 
     def set_last_as_current(self):
         """
@@ -74,9 +115,8 @@ class Queue:
 
         :return: None
         """
-        index = len(self.queue) - 1
-        if index >= 0:
-            self.current_music = self.queue[index]
+        if self.queue:
+            self.cursor = len(self.queue) - 1
 
     def enqueue(
         self, 
@@ -85,11 +125,14 @@ class Queue:
         music_thumb: str, 
         music_ytube: str, 
         music_duration: int, 
-        music_user: int
+        music_user: int,
+        music_expires: float = None,
+        music_format=None,
+        music_video_id: str = None,
+        music_color_thumb: str = None
     ) -> None:
         """
-        Enqueue the music tuple to the queue while setting last_title_enqueued
-	    and the current_music variables as needed
+        Enqueue the music to the queue, making it the current one if the queue was empty.
 
         :param music_title: str
             The music title to be added to queue
@@ -103,13 +146,22 @@ class Queue:
             The music duration in seconds to be added to queue
         :param music_user: str
             The user ID for the song to be added to queue
+        :param music_expires: float or None
+            Unix timestamp at which music_url expires (None if unknown)
+        :param music_format: AudioFormat or None
+            Codec, sample rate and bitrate of music_url (None if unknown)
+        :param music_video_id: str or None
+            The YouTube video ID (None if unknown)
+        :param music_color_thumb: str or None
+            The smallest thumbnail url, for the embed color (None if unknown)
         :return: None
         """
-        if len(self.queue) > 0:
-            self.queue.append(self.music(music_title, music_url, music_thumb, music_ytube, music_duration, music_user))
-        else:
-            self.queue.append(self.music(music_title, music_url, music_thumb, music_ytube, music_duration, music_user))
-            self.current_music = self.music(music_title, music_url, music_thumb, music_ytube, music_duration, music_user)
+        self.queue.append(Track(
+            music_title, music_url, music_thumb, music_ytube, music_duration, music_user, music_expires, music_format,
+            music_video_id, music_color_thumb
+        ))
+        if self.cursor < 0:
+            self.cursor = 0
 
     def dequeue(self):
         """
@@ -119,10 +171,18 @@ class Queue:
         """
         if self.queue:
             self.queue.pop(0)  # Removes the first music in the queue
-            if self.queue:  # If there are still songs in the queue
-                self.current_music = self.queue[0]  # Set the next song as current
-            else:
-                self.current_music = self.music('', '', '', '', '', '')  # Clear current music if the queue is empty
+            # The next song (if any) becomes current
+            self.cursor = 0 if self.queue else -1
+
+    def remove_last(self):
+        """
+        Removes the last music enqueued (e.g. one that could not be played), moving the cursor back if it pointed at it.
+
+        :return: None
+        """
+        if self.queue:
+            self.queue.pop()
+            self.cursor = min(self.cursor, len(self.queue) - 1)
 
     def next(self):
         """
@@ -130,16 +190,10 @@ class Queue:
 
         :return: None
         """
-        if self.current_music in self.queue:
-            index = self.queue.index(self.current_music) + 1
-            if len(self.queue) - 1 >= index:
-                if self.current_music.title == self.queue[index].title and len(self.queue) - 1 > index + 1:
-                    self.current_music = self.queue[index + 1]
-                else:
-                    self.current_music = self.queue[index]
-
-        else:
+        if self.cursor < 0:
             self.clear_queue()
+        elif self.theres_next():
+            self.cursor += 1
 
     def theres_next(self):
         """
@@ -149,10 +203,18 @@ class Queue:
             True if there is a next song in queue.
             False if there isn't a next song in queue.
         """
-        if self.queue.index(self.current_music) + 1 > len(self.queue) - 1:
-            return False
-        else:
-            return True
+        return 0 <= self.cursor < len(self.queue) - 1
+
+    def peek_next(self):
+        """
+        Returns the music after the current one without moving to it.
+
+        :return: Track or None
+            The next music in queue, or None if there isn't one.
+        """
+        if not self.theres_next():
+            return None
+        return self.queue[self.cursor + 1]
 
     def clear_queue(self):
         """
@@ -161,7 +223,7 @@ class Queue:
         :return: None
         """
         self.queue.clear()
-        self.current_music = self.music('', '', '', '', '', '')
+        self.cursor = -1
 
     def clear_queue_except_current(self):
         """
@@ -170,14 +232,10 @@ class Queue:
         :return: None
         """
         if len(self.queue) > 1:
-            # Save the current song
+            # Keep the currently playing song
             current = self.current_music
-
-            # Clear the queue and re-add the playing song
-            self.queue.clear()
-            self.current_music = current
-
-            self.queue = [current]  # Keep the currently playing song
+            self.queue = [current] if current is not NO_TRACK else []
+            self.cursor = 0 if self.queue else -1
 
     def is_empty(self):
         """
@@ -197,16 +255,35 @@ class Queue:
             Number of items in the queue
         """
         return len(self.queue)
+
+    def snapshot(self):
+        """
+        Returns the songs currently in the queue, unaffected by later changes to it.
+
+        Only references are copied, so this is cheap even for long queues.
+
+        :return: tuple of Track
+        """
+        return tuple(self.queue)
     
     def get_current_music(self):
         """
         Returns the current music playing from the queue.
 
-        :return: tuple
+        :return: Track
             The current_music of the queue
         """
         return self.current_music
 
+class SessionState(enum.Enum):
+    """
+    Lifecycle states of a Session.
+    """
+    CONNECTING = "connecting"  # Joining the voice channel
+    PLAYING = "playing"        # A song is playing (or paused)
+    IDLE = "idle"              # Connected, nothing playing
+    CLOSING = "closing"        # Being torn down, must not be used anymore
+
 class Session:
     """
     A class used to represent an instance of the bot.
@@ -223,6 +300,18 @@ class Session:
         Voice channel ID where the bot is connected.
     q : Queue
         Queue instance to handle music playback.
+    state : SessionState
+        Where the session is in its lifecycle.
+    track_started_at : float or None
+        Event loop time at which the current music started playing, moved forward by the time spent paused.
+    paused_at : float or None
+        Event loop time at which the current music was paused, if it is paused.
+    prefetch_task : asyncio.Task or None
+        Task preparing the next music's audio source ahead of time.
+    prefetched : tuple or None
+        (Track, audio source) prepared for the next music, if any.
+    import_task : asyncio.Task or None
+        Task adding the remaining songs of an imported playlist to the queue.
     """
 
     def __init__(self, guild: int, channel: int) -> None:
@@ -236,4 +325,56 @@ class Session:
         """
         self.guild: int = guild
         self.channel: int = channel
-        self.q: Queue = Queue()
\ No newline at end of file
+        self.q: Queue = Queue()
+        self.state: SessionState = SessionState.IDLE
+
+        self.track_started_at = None
+        self.paused_at = None
+        self.prefetch_task = None
+        self.prefetched = None
+        self.import_task = None
+
+    def cancel_import(self):
+        """
+        Stops adding the remaining songs of an imported playlist.
+
+        :return: None
+        """
+        if self.import_task is not None:
+            self.import_task.cancel()
+            self.import_task = None
+
+    def take_prefetched(self, music):
+        """
+        Returns the audio source prefetched for a music, discarding any other prefetch.
+
+        :param music: Track
+            The music about to be played.
+        :return: discord.AudioSource or None
+            The ready audio source, or None if nothing was prefetched for this music.
+        """
+        if self.prefetched is not None and self.prefetched[0] is music:
+            source = self.prefetched[1]
+            self.prefetched = None
+            self.discard_prefetch()
+            return source
+
+        self.discard_prefetch()
+        return None
+
+    def discard_prefetch(self):
+        """
+        Cancels a running prefetch and releases a prefetched audio source (and its ffmpeg process).
+
+        :return: None
+        """
+        if self.prefetch_task is not None:
+            self.prefetch_task.cancel()
+            self.prefetch_task = None
+
+        if self.prefetched is not None:
+            try:
+                self.prefetched[1].cleanup()
+            except Exception as e:
+                logger.error(f"Failed to clean up prefetched source: {e}")
+            self.prefetched = None
\ No newline at end of file
@@ -0,0 +1,108 @@
+import re
+from collections import namedtuple
+from urllib.parse import parse_qs, urlparse
+
+# Kinds of play queries.
+SEARCH = 'search'        # Plain text, searched on YouTube
+VIDEO = 'video'          # A single YouTube video (watch, shorts, live, embed, youtu.be, music)
+PLAYLIST = 'playlist'    # A YouTube playlist without a specific video
+URL = 'url'              # Any other link, handed to yt-dlp as is
+
+QueryInfo = namedtuple('QueryInfo', ('kind', 'url', 'video_id', 'playlist_id'))
+
+YOUTUBE_HOSTS = {
+    'youtube.com',
+    'www.youtube.com',
+    'm.youtube.com',
+    'music.youtube.com',
+    'youtube-nocookie.com',
+    'www.youtube-nocookie.com',
+}
+SHORT_HOSTS = {'youtu.be', 'www.youtu.be'}
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_PLAYLIST_ID = re.compile(r"^[A-Za-z0-9_-]{2,}$")
+
+# Path prefixes followed by a video ID, e.g. /shorts/<id>
+_VIDEO_PATH_PREFIXES = ('shorts', 'live', 'embed', 'v', 'e')
+
+# Bare links pasted without a scheme, e.g. "youtu.be/<id>"
+_SCHEMELESS = re.compile(r"^(?:www\.|m\.|music\.)?(?:youtube\.com|youtu\.be|youtube-nocookie\.com)/", re.IGNORECASE)
+
+
+def video_url(video_id):
+    """
+    Builds the canonical watch URL of a YouTube video.
+
+    :param video_id: str - The YouTube video ID.
+    :return: str - The watch URL.
+    """
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def playlist_url(playlist_id):
+    """
+    Builds the canonical URL of a YouTube playlist.
+
+    :param playlist_id: str - The YouTube playlist ID.
+    :return: str - The playlist URL.
+    """
+    return f"https://www.youtube.com/playlist?list={playlist_id}"
+
+
+def classify_query(query):
+    """
+    Classifies a play query locally, without any network round trip.
+
+    YouTube links are recognized and reduced to their video and playlist IDs,
+    other links are passed through, and anything else is treated as search text.
+
+    :param query: str - Search query or URL.
+    :return: QueryInfo - (kind, url, video_id, playlist_id). url is the canonical
+        URL to hand to yt-dlp, or None for searches.
+    """
+    text = query.strip().strip('<>')  # Discord users wrap links in <> to hide embeds
+
+    if _SCHEMELESS.match(text):
+        text = "https://" + text
+
+    if not text.lower().startswith(("http://", "https://")) or any(c.isspace() for c in text):
+        return QueryInfo(SEARCH, None, None, None)
+
+    parsed = urlparse(text)
+    host = (parsed.hostname or '').lower()
+    if not host:
+        return QueryInfo(SEARCH, None, None, None)
+
+    if host not in YOUTUBE_HOSTS and host not in SHORT_HOSTS:
+        return QueryInfo(URL, text, None, None)
+
+    params = parse_qs(parsed.query)
+    playlist_id = _first_match(params.get('list'), _PLAYLIST_ID)
+    segments = [segment for segment in parsed.path.split('/') if segment]
+
+    video_id = None
+    if host in SHORT_HOSTS:
+        video_id = _first_match(segments[:1], _VIDEO_ID)
+    elif segments[:1] == ['watch']:
+        video_id = _first_match(params.get('v'), _VIDEO_ID)
+    elif len(segments) >= 2 and segments[0] in _VIDEO_PATH_PREFIXES:
+        video_id = _first_match(segments[1:2], _VIDEO_ID)
+
+    if video_id:
+        return QueryInfo(VIDEO, video_url(video_id), video_id, playlist_id)
+    if playlist_id:
+        return QueryInfo(PLAYLIST, playlist_url(playlist_id), None, playlist_id)
+
+    # A YouTube page that is neither (channel, search page, ...): let yt-dlp deal with it
+    return QueryInfo(URL, text, None, None)
+
+
+def _first_match(values, pattern):
+    """
+    Returns the first value matching pattern, or None.
+    """
+    for value in values or ():
+        if pattern.match(value):
+            return value
+    return None
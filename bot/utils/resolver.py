@@ -0,0 +1,313 @@
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import time
+
+import yt_dlp as youtube_dl
+
+from bot.utils import metrics
+from bot.utils.command_recorder import CommandRecorder
+from bot.utils.query_classifier import SEARCH, classify_query
+from bot.utils.track_cache import TrackCache
+from bot.utils.track_catalog import TrackCatalog
+
+logger = logging.getLogger("discord")
+
+# yt-dlp options used when resolving a single song to play.
+# Opus is preferred since it can be sent to Discord without re-encoding.
+PLAY_YDL_OPTIONS = {'format': 'bestaudio[acodec=opus]/bestaudio', 'noplaylist': 'True'}
+
+# yt-dlp options used when listing search results (metadata only, no formats).
+SEARCH_YDL_OPTIONS = {
+    'quiet': True,
+    'extract_flat': True,
+    'default_search': 'ytsearch20',
+    'skip_download': True,
+}
+
+# yt-dlp options used when listing the songs of a playlist (metadata only, no formats).
+PLAYLIST_YDL_OPTIONS = {
+    'quiet': True,
+    'extract_flat': 'in_playlist',
+    'skip_download': True,
+}
+
+# Max number of songs imported from a single playlist.
+MAX_PLAYLIST_SIZE = 500
+
+# Keys kept from a yt-dlp info dict. Everything else is dropped inside the worker
+# so results stay small (cheap to pickle back from a process pool).
+TRACK_FIELDS = ('id', 'title', 'duration', 'webpage_url', 'url', 'thumbnails', 'uploader', 'acodec', 'asr', 'abr')
+
+
+def slim_info(info):
+    """
+    Reduces a yt-dlp info dict to the fields the bot actually uses.
+
+    :param info: dict - The info dict returned by yt-dlp.
+    :return: dict - A copy containing only TRACK_FIELDS.
+    """
+    return {key: info.get(key) for key in TRACK_FIELDS}
+
+
+def extract_track(target):
+    """
+    Resolves a URL or "ytsearch:" target to the info of a single playable song.
+
+    Runs inside the resolver pool, never on the event loop.
+
+    :param target: str - URL or "ytsearch:<query>".
+    :return: dict - Slimmed info dict of the song (the first entry for searches and playlists).
+    """
+    with youtube_dl.YoutubeDL(PLAY_YDL_OPTIONS) as ydl:
+        info = ydl.extract_info(target, download=False)
+    if 'entries' in info:
+        info = info['entries'][0]
+    return slim_info(info)
+
+
+def extract_search(query, limit=20):
+    """
+    Lists the top YouTube search results for a query without resolving their streams.
+
+    Runs inside the resolver pool, never on the event loop.
+
+    :param query: str - The search query.
+    :param limit: int - Max number of results (default: 20).
+    :return: list - Slimmed info dicts of the results.
+    """
+    with youtube_dl.YoutubeDL(SEARCH_YDL_OPTIONS) as ydl:
+        info = ydl.extract_info(f"ytsearch{limit}:{query}", download=False)
+
+    if not info or not info.get("entries"):
+        return []
+    return [slim_info(entry) for entry in info["entries"][:limit]]
+
+
+def search_result_info(entry):
+    """
+    Turns a search result into an info dict that can be queued without resolving it again.
+
+    Search results are listed flat: their 'url' is the video page and their stream
+    URL is unknown, so 'url' is left empty to be resolved when the song is about to play.
+
+    :param entry: dict - Slimmed info dict of a search result.
+    :return: dict - Slimmed info dict with 'webpage_url' set and no stream URL.
+    """
+    return dict(entry, webpage_url=entry.get('webpage_url') or entry['url'], url=None)
+
+
+def extract_playlist(url):
+    """
+    Lists the songs of a playlist without resolving their streams.
+
+    Runs inside the resolver pool, never on the event loop.
+
+    :param url: str - URL of the playlist.
+    :return: dict - {'title': playlist title, 'entries': slimmed info dicts of its songs}.
+    """
+    with youtube_dl.YoutubeDL(dict(PLAYLIST_YDL_OPTIONS, playlistend=MAX_PLAYLIST_SIZE)) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    entries = [slim_info(entry) for entry in (info.get('entries') or []) if entry and entry.get('url')]
+    return {'title': info.get('title'), 'entries': entries}
+
+
+class Resolver:
+    """
+    A class used to run yt-dlp extractions off the event loop.
+
+    Extractions are blocking (network + parsing) and take seconds, so they run in a
+    bounded thread or process pool. Every call is awaited with a timeout. When a caller
+    times out or is cancelled, the pending extraction is cancelled too if it has not
+    started yet; a running one finishes in the background and its result is dropped.
+
+    Attributes
+    ----------
+    mode : str
+        Either "thread" or "process".
+    max_workers : int
+        Max number of extractions running at the same time.
+    timeout : float
+        Seconds to wait for a single extraction before giving up.
+    cache : TrackCache or None
+        In-memory cache consulted before any extraction.
+    catalog : TrackCatalog or None
+        On-disk catalog consulted on a cache miss, and updated after every extraction.
+    recorder : CommandRecorder or None
+        Trace recorder notified of every extraction.
+
+    Methods
+    -------
+    resolve(query)
+        Resolves a search query or URL to a single song.
+
+    search(query, limit)
+        Lists the top search results for a query.
+
+    playlist(url)
+        Lists the songs of a playlist.
+
+    shutdown()
+        Stops the pool, cancelling extractions that have not started.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int = 4,
+        timeout: float = 30.0,
+        cache: TrackCache = None,
+        catalog: TrackCatalog = None,
+        recorder: CommandRecorder = None
+    ) -> None:
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown resolver mode: '{mode}' (expected 'thread' or 'process')")
+
+        self.mode: str = mode
+        self.max_workers: int = max_workers
+        self.timeout: float = timeout
+        self.cache: TrackCache = cache
+        self.catalog: TrackCatalog = catalog
+        self.recorder: CommandRecorder = recorder
+
+        if mode == "process":
+            # Spawned, not forked: a fork would copy the event loop, the gateway sockets and the locks held by other threads
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="resolver"
+            )
+
+    @classmethod
+    def from_env(cls, cache=None, catalog=None, recorder=None):
+        """
+        Creates a resolver configured through environment variables.
+
+        RESOLVER_MODE (thread/process), RESOLVER_WORKERS and RESOLVER_TIMEOUT (seconds).
+
+        :param cache: TrackCache or None - Cache consulted before any extraction.
+        :param catalog: TrackCatalog or None - Catalog consulted on a cache miss.
+        :param recorder: CommandRecorder or None - Trace recorder notified of every extraction.
+        :return: Resolver
+        """
+        return cls(
+            mode=os.getenv("RESOLVER_MODE", "thread").lower(),
+            max_workers=int(os.getenv("RESOLVER_WORKERS", "4")),
+            timeout=float(os.getenv("RESOLVER_TIMEOUT", "30")),
+            cache=cache,
+            catalog=catalog,
+            recorder=recorder,
+        )
+
+    async def run(self, func, *args):
+        """
+        Runs a blocking function in the pool and awaits its result.
+
+        :param func: callable - Module-level function (must be picklable in process mode).
+        :param args: Arguments passed to func.
+        :return: The return value of func.
+        :raises asyncio.TimeoutError: If the call takes longer than self.timeout.
+        """
+        started = time.perf_counter()
+        outcome = "ok"
+        future = self.executor.submit(func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled"
+            future.cancel()  # Only effective if the call is still waiting for a worker
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.RESOLVER_SECONDS.observe(elapsed, function=func.__name__, outcome=outcome)
+            if self.recorder is not None:
+                self.recorder.record("resolve", fn=func.__name__, ms=round(elapsed * 1000, 1), outcome=outcome)
+
+    async def resolve(self, query):
+        """
+        Resolves a search query or URL to a single song.
+
+        The query is classified locally: YouTube links are looked up by video ID,
+        other links go to yt-dlp as is, and text is searched. A cached song with a
+        live stream URL is returned without touching yt-dlp. A song known to the
+        cache or the catalog whose stream URL went stale is re-resolved from its
+        video page, skipping the search.
+
+        :param query: str - Search query or URL.
+        :return: dict - Slimmed info dict of the song.
+        """
+        classified = classify_query(query)
+
+        known = None
+        if self.cache is not None:
+            known = self.cache.get(query)
+            if known is None and classified.video_id:
+                known = self.cache.get_by_id(classified.video_id)
+            if known is not None and known['url']:
+                return known
+        if known is None and self.catalog is not None:
+            known = await self.catalog.get(query)
+            if known is None and classified.video_id:
+                known = await self.catalog.get_by_id(classified.video_id)
+
+        if known is not None and known['webpage_url']:
+            target = known['webpage_url']
+        elif classified.kind == SEARCH:
+            target = f"ytsearch:{query}"
+        else:
+            target = classified.url
+
+        info = await self.run(extract_track, target)
+        if known is not None and known.get('dominant_color') is not None:
+            info['dominant_color'] = known['dominant_color']
+
+        if self.cache is not None:
+            self.cache.put(query, info)
+        if self.catalog is not None:
+            self.catalog.record(query, info)
+        return info
+
+    async def search(self, query, limit=20):
+        """
+        Lists the top search results for a query.
+
+        Results are reused from the cache while the same query was searched recently.
+
+        :param query: str - The search query.
+        :param limit: int - Max number of results (default: 20).
+        :return: list - Slimmed info dicts of the results.
+        """
+        if self.cache is not None:
+            entries = self.cache.get_search(query, limit)
+            if entries is not None:
+                return entries
+
+        entries = await self.run(extract_search, query, limit)
+        if self.cache is not None and entries:
+            self.cache.put_search(query, limit, entries)
+        return entries
+
+    async def playlist(self, url):
+        """
+        Lists the songs of a playlist without resolving their streams.
+
+        :param url: str - URL of the playlist.
+        :return: dict - {'title': playlist title, 'entries': slimmed info dicts of its songs}.
+        """
+        return await self.run(extract_playlist, url)
+
+    def shutdown(self):
+        """
+        Stops the pool, cancelling extractions that have not started.
+
+        :return: None
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import weakref
+
+from bot.utils.music_utilities import Session, SessionState
+
+logger = logging.getLogger("discord")
+
+
+class SessionRegistry:
+    """
+    A class used to keep track of the active Sessions, one per guild.
+
+    Lookups are O(1) by guild ID. Each guild also gets an asyncio lock, so
+    commands touching the same session (starting playback, connecting, tearing
+    down) can run one at a time without blocking other guilds. The registry is
+    shared through `bot.sessions`, so other cogs can use it as well.
+
+    Methods
+    -------
+    get(guild_id)
+        Returns the guild's session, or None.
+
+    create(guild_id, channel_id)
+        Creates and registers a new session for the guild.
+
+    lock(guild_id)
+        Returns the guild's asyncio lock.
+
+    close(session)
+        Tears a session down and unregisters it.
+    """
+
+    def __init__(self) -> None:
+        self._sessions = {}  # guild ID -> Session
+        self._locks = weakref.WeakValueDictionary()  # guild ID -> asyncio.Lock, kept alive by its users
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
+
+    def __contains__(self, session):
+        return self._sessions.get(session.guild) is session
+
+    def get(self, guild_id):
+        """
+        Returns the guild's session, or None.
+
+        Sessions being torn down are not returned.
+
+        :param guild_id: int
+        :return: Session or None
+        """
+        session = self._sessions.get(guild_id)
+        if session is None or session.state is SessionState.CLOSING:
+            return None
+        return session
+
+    def create(self, guild_id, channel_id):
+        """
+        Creates and registers a new session for the guild, replacing any previous one.
+
+        :param guild_id: int
+        :param channel_id: int - Voice channel ID of the session.
+        :return: Session
+        """
+        session = Session(guild_id, channel_id)
+        self._sessions[guild_id] = session
+        return session
+
+    def lock(self, guild_id):
+        """
+        Returns the guild's asyncio lock.
+
+        Usage: async with registry.lock(ctx.guild.id): ...
+
+        :param guild_id: int
+        :return: asyncio.Lock
+        """
+        lock = self._locks.get(guild_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[guild_id] = lock
+        return lock
+
+    def close(self, session):
+        """
+        Tears a session down and unregisters it.
+
+        The session is marked CLOSING first, so callbacks still in flight for it
+        (e.g. the end of the current song) find no session and stop. Safe to call
+        more than once.
+
+        :param session: Session
+        :return: None
+        """
+        session.state = SessionState.CLOSING
+        session.cancel_import()
+        session.discard_prefetch()
+        session.q.clear_queue()
+
+        if self._sessions.get(session.guild) is session:
+            del self._sessions[session.guild]
+            logger.info(f"Closed session in guild {session.guild} ({len(self._sessions)} active)")
@@ -0,0 +1,107 @@
+import os
+
+# Shard modes:
+# "none" - one gateway connection for all guilds (default)
+# "auto" - one process running several shards (discord.py's AutoShardedBot)
+# "process" - shard groups running in separate processes, each an AutoShardedBot
+SHARD_MODES = ("none", "auto", "process")
+
+
+def parse_shard_ids(text, shard_count):
+    """
+    Parses a list of shard IDs such as "0-7" or "0,2,4-5".
+
+    :param text: str or None - The shard IDs (all shards when empty).
+    :param shard_count: int - Total number of shards of the bot.
+    :return: list of int - Sorted shard IDs.
+    :raises ValueError: If the text is malformed or an ID is not below shard_count.
+    """
+    if not text:
+        return list(range(shard_count))
+
+    shard_ids = set()
+    for part in text.split(","):
+        start, _, end = part.strip().partition("-")
+        shard_ids.update(range(int(start), int(end or start) + 1))
+
+    out_of_range = [shard_id for shard_id in shard_ids if not 0 <= shard_id < shard_count]
+    if out_of_range:
+        raise ValueError(f"Shard IDs {sorted(out_of_range)} are not in 0-{shard_count - 1}")
+    return sorted(shard_ids)
+
+
+def split_shards(shard_ids, processes):
+    """
+    Splits shard IDs into contiguous groups of (almost) equal size, one per process.
+
+    :param shard_ids: list of int
+    :param processes: int - Number of groups (fewer if there are fewer shards).
+    :return: list of list of int
+    """
+    processes = max(1, min(processes, len(shard_ids)))
+    size, extra = divmod(len(shard_ids), processes)
+    groups, start = [], 0
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(shard_ids[start:end])
+        start = end
+    return groups
+
+
+class ShardConfig:
+    """
+    A class used to describe how the bot splits its guilds between gateway connections.
+
+    Attributes
+    ----------
+    mode : str
+        One of SHARD_MODES.
+    shard_count : int or None
+        Total number of shards of the bot (None: Discord's recommendation, "auto" mode only).
+    shard_ids : list of int or None
+        Shards run by this host (None: all of them).
+    processes : int
+        Number of processes the shards are split into ("process" mode only).
+    """
+
+    def __init__(self, mode: str = "none", shard_count: int = None, shard_ids: list = None, processes: int = 1) -> None:
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode: '{mode}' (expected one of {SHARD_MODES})")
+        if mode == "process" and shard_count is None:
+            raise ValueError("SHARD_COUNT is required in the 'process' shard mode")
+
+        self.mode: str = mode
+        self.shard_count: int = shard_count
+        self.shard_ids: list = shard_ids
+        self.processes: int = processes
+
+    @classmethod
+    def from_env(cls):
+        """
+        Reads the shard configuration from environment variables.
+
+        SHARD_MODE (none/auto/process), SHARD_COUNT (total shards), SHARD_IDS (shards run by
+        this host, e.g. "0-7", default: all) and SHARD_PROCESSES (default: number of CPUs).
+
+        :return: ShardConfig
+        """
+        mode = os.getenv("SHARD_MODE", "none").lower()
+        shard_count = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+        shard_ids = os.getenv("SHARD_IDS", "")
+        if shard_ids and shard_count is None:
+            raise ValueError("SHARD_COUNT is required when SHARD_IDS is set")
+        return cls(
+            mode=mode,
+            shard_count=shard_count,
+            shard_ids=parse_shard_ids(shard_ids, shard_count) if shard_ids else None,
+            processes=int(os.getenv("SHARD_PROCESSES", str(os.cpu_count() or 1))),
+        )
+
+    def groups(self):
+        """
+        Returns the shard IDs run by each process of the "process" mode.
+
+        :return: list of list of int
+        """
+        shard_ids = self.shard_ids if self.shard_ids is not None else list(range(self.shard_count))
+        return split_shards(shard_ids, self.processes)
@@ -0,0 +1,141 @@
+import bisect
+import time
+from collections import OrderedDict
+
+from bot.utils.track_cache import normalize_query
+
+# Max number of words of a label that can start a match ("rhapsody" finds "Bohemian Rhapsody").
+MAX_INDEXED_WORDS = 8
+
+
+class SuggestionIndex:
+    """
+    A class used to look up play suggestions by prefix, entirely in memory.
+
+    Every label is indexed by the start of each of its words, in one sorted list,
+    so a lookup is a binary search followed by a short scan. The least recently
+    added labels are dropped once max_size is reached.
+
+    Attributes
+    ----------
+    max_size : int
+        Max number of labels kept.
+
+    Methods
+    -------
+    add(label, value)
+        Adds a suggestion, or refreshes it if already known.
+
+    lookup(prefix, limit)
+        Returns the suggestions matching a prefix.
+    """
+
+    def __init__(self, max_size: int = 5000) -> None:
+        self.max_size: int = max_size
+        self._entries: OrderedDict = OrderedDict()  # normalized label -> (label, value)
+        self._keys: list = []  # sorted (word suffix of a normalized label, normalized label)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, label, value):
+        """
+        Adds a suggestion, or refreshes it if already known.
+
+        :param label: str - Text shown to the user and matched against.
+        :param value: str - Query played when the suggestion is picked.
+        :return: None
+        """
+        if not label or not value:
+            return
+
+        key = normalize_query(label)
+        if key in self._entries:
+            self._entries[key] = (label, value)
+            self._entries.move_to_end(key)
+            return
+
+        self._entries[key] = (label, value)
+        for suffix in self._suffixes(key):
+            bisect.insort(self._keys, (suffix, key))
+
+        while len(self._entries) > self.max_size:
+            old_key, _ = self._entries.popitem(last=False)
+            for suffix in self._suffixes(old_key):
+                index = bisect.bisect_left(self._keys, (suffix, old_key))
+                if index < len(self._keys) and self._keys[index] == (suffix, old_key):
+                    del self._keys[index]
+
+    def lookup(self, prefix, limit=25):
+        """
+        Returns the suggestions with a word starting with prefix, whole label matches first.
+
+        :param prefix: str - What the user typed so far.
+        :param limit: int - Max number of suggestions (default: 25, Discord's max).
+        :return: list - (label, value) pairs.
+        """
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return [self._entries[key] for key in reversed(self._entries)][:limit]  # Most recent first
+
+        matches = {}  # normalized label -> None, keeps the scan order without duplicates
+        index = bisect.bisect_left(self._keys, (prefix,))
+        while index < len(self._keys) and self._keys[index][0].startswith(prefix) and len(matches) < limit * 4:
+            matches[self._keys[index][1]] = None
+            index += 1
+
+        matches = list(matches)
+        matches.sort(key=lambda key: not key.startswith(prefix))  # Stable, keeps the alphabetical order
+        return [self._entries[key] for key in matches[:limit]]
+
+    @staticmethod
+    def _suffixes(key):
+        words = key.split(" ")
+        return {" ".join(words[i:]) for i in range(min(len(words), MAX_INDEXED_WORDS))}
+
+
+class SuggestionBudget:
+    """
+    A class used to limit how many expensive suggestion lookups each user can trigger.
+
+    Each user has a token bucket: a lookup takes one token, tokens come back at
+    `per_minute` per minute, up to `burst` saved.
+
+    Attributes
+    ----------
+    per_minute : float
+        Tokens regained per minute.
+    burst : int
+        Max tokens a user can save up.
+
+    Methods
+    -------
+    allow(user_id)
+        Takes a token for the user if there is one.
+    """
+
+    def __init__(self, per_minute: float = 6, burst: int = 3) -> None:
+        self.per_minute: float = per_minute
+        self.burst: int = burst
+        self._buckets = {}  # user ID -> (tokens, last update)
+
+    def allow(self, user_id):
+        """
+        Takes a token for the user if there is one.
+
+        :param user_id: int
+        :return: bool - True if the user may run the lookup.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.per_minute / 60)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[user_id] = (tokens, now)
+
+        if len(self._buckets) > 10000:  # Forget users whose bucket is full again
+            refill = self.burst * 60 / self.per_minute
+            self._buckets = {user: bucket for user, bucket in self._buckets.items() if now - bucket[1] < refill}
+        return allowed
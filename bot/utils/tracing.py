@@ -0,0 +1,299 @@
+import asyncio
+import contextvars
+import json
+import logging
+import math
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import discord
+
+logger = logging.getLogger("discord.trace")
+
+# Stages of a play request, in the order they happen.
+STAGES = ("received", "classify", "extract", "color", "connect", "source", "first_packet")
+
+# The trace of the request being handled in the current task.
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """
+    A class used to time the stages of a single play request.
+
+    Attributes
+    ----------
+    request_id : str
+        Random ID tying the stages of the request together in the logs.
+    name : str
+        What is traced (e.g. the command name).
+    guild_id : int
+        Guild of the request.
+    spans : list
+        (stage, start offset, duration) tuples, in seconds since the trace started.
+    outcome : str or None
+        How the request ended ("played", "queued", "timeout", "error", ...).
+    awaiting_audio : bool
+        True once playback started, until the first audio packet is read.
+    """
+
+    def __init__(self, name, guild_id, received_delay=0.0) -> None:
+        self.request_id: str = uuid.uuid4().hex[:12]
+        self.name: str = name
+        self.guild_id: int = guild_id
+        self.started: float = time.perf_counter()
+        self.spans: list = [("received", -received_delay, received_delay)]
+        self.outcome: str = None
+        self.awaiting_audio: bool = False
+        self.finished: bool = False
+        self.playback_started: float = None
+
+    @contextmanager
+    def span(self, stage):
+        """
+        Times a with block as one stage.
+
+        :param stage: str - One of STAGES.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if not self.finished:
+                self.spans.append((stage, started - self.started, time.perf_counter() - started))
+
+    def total(self):
+        """
+        Returns the time from the command being sent to the end of the last stage.
+
+        :return: float - Seconds.
+        """
+        return max(offset + duration for _, offset, duration in self.spans) - self.spans[0][1]
+
+    def stage_durations(self):
+        """
+        Returns the time spent in each stage (summed if a stage ran more than once).
+
+        :return: dict - stage -> seconds.
+        """
+        durations = {}
+        for stage, _, duration in self.spans:
+            durations[stage] = durations.get(stage, 0.0) + duration
+        return durations
+
+
+class Tracer:
+    """
+    A class used to emit finished traces as JSON logs and keep the recent ones for summaries.
+
+    Methods
+    -------
+    finish(trace, outcome)
+        Ends a trace, logging it as one JSON line.
+
+    first_packet(trace, at)
+        Ends a trace when the first audio packet of its song was read.
+
+    summary()
+        Returns p50/p95 per stage over the recent played traces.
+    """
+
+    def __init__(self, max_traces: int = 500) -> None:
+        self.recent: deque = deque(maxlen=max_traces)
+
+    def finish(self, trace, outcome):
+        """
+        Ends a trace, logging it as one JSON line. Does nothing if it already ended.
+
+        :param trace: Trace
+        :param outcome: str - How the request ended.
+        :return: None
+        """
+        if trace.finished:
+            return
+        trace.outcome = outcome
+        trace.finished = True
+        self.recent.append(trace)
+
+        logger.info(json.dumps({
+            "event": "trace",
+            "request_id": trace.request_id,
+            "name": trace.name,
+            "guild_id": trace.guild_id,
+            "outcome": outcome,
+            "total_ms": round(trace.total() * 1000, 1),
+            "spans": [
+                {"stage": stage, "start_ms": round(offset * 1000, 1), "duration_ms": round(duration * 1000, 1)}
+                for stage, offset, duration in trace.spans
+            ],
+        }))
+
+    def first_packet(self, trace, at):
+        """
+        Ends a trace when the first audio packet of its song was read.
+
+        :param trace: Trace
+        :param at: float or None - time.perf_counter() when the packet was read, None if the
+            source ended without any.
+        :return: None
+        """
+        if trace.finished:
+            return
+        if at is None:
+            self.finish(trace, "no_audio")
+            return
+        trace.spans.append(("first_packet", trace.playback_started - trace.started, at - trace.playback_started))
+        self.finish(trace, "played")
+
+    def summary(self):
+        """
+        Returns p50/p95 per stage, and of the time to first audio, over the recent played traces.
+
+        :return: dict - {'count': int, 'total': (p50, p95), 'stages': {stage: (p50, p95)}}, in seconds.
+        """
+        played = [trace for trace in self.recent if trace.outcome == "played"]
+        stages = {}
+        for stage in STAGES:
+            values = [trace.stage_durations().get(stage, 0.0) for trace in played]
+            stages[stage] = (percentile(values, 50), percentile(values, 95))
+        totals = [trace.total() for trace in played]
+        return {'count': len(played), 'total': (percentile(totals, 50), percentile(totals, 95)), 'stages': stages}
+
+
+# Tracer shared by the whole bot.
+TRACER = Tracer()
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of values (nearest rank).
+
+    :param values: list of float
+    :param p: float - Between 0 and 100.
+    :return: float - 0 when values is empty.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+@contextmanager
+def request(name, guild_id, sent_at=None):
+    """
+    Traces the request handled in a with block, in the current task.
+
+    When the block exits, the trace ends with the outcome set along the way (see
+    set_outcome), "error" if the block raised, or "rejected". A trace whose song
+    started playing ends when its first audio packet is read instead.
+
+    Usage: with tracing.request("play", ctx.guild.id, ctx.message.created_at): ...
+
+    :param name: str - What is traced (e.g. the command name).
+    :param guild_id: int
+    :param sent_at: datetime or None - When the user sent the command, to time its delivery ("received").
+    """
+    received_delay = max(0.0, time.time() - sent_at.timestamp()) if sent_at is not None else 0.0
+    trace = Trace(name, guild_id, received_delay)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.outcome = trace.outcome or "error"
+        raise
+    finally:
+        _current.reset(token)
+        if not trace.awaiting_audio:
+            TRACER.finish(trace, trace.outcome or "rejected")
+
+
+def current():
+    """
+    Returns the current task's trace.
+
+    :return: Trace or None
+    """
+    trace = _current.get()
+    return trace if trace is not None and not trace.finished else None
+
+
+def set_outcome(outcome):
+    """
+    Sets how the current task's request ended, if it is traced.
+
+    :param outcome: str - e.g. "queued", "timeout".
+    :return: None
+    """
+    trace = current()
+    if trace is not None:
+        trace.outcome = outcome
+
+
+def playback_started(source):
+    """
+    Marks the start of playback in the current task's trace, and wraps the source so the
+    trace ends when its first packet is read. Must be called on the event loop.
+
+    :param source: discord.AudioSource - The source about to be played.
+    :return: discord.AudioSource - The source to play (unchanged if there is no trace).
+    """
+    trace = current()
+    if trace is None:
+        return source
+
+    trace.awaiting_audio = True
+    trace.playback_started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    return FirstPacketProbe(source, lambda at: loop.call_soon_threadsafe(TRACER.first_packet, trace, at))
+
+
+def span(stage):
+    """
+    Times a with block as a stage of the current task's trace (does nothing without one).
+
+    Usage: with tracing.span("extract"): ...
+
+    :param stage: str - One of STAGES.
+    """
+    trace = current()
+    return trace.span(stage) if trace is not None else nullcontext()
+
+
+class FirstPacketProbe(discord.AudioSource):
+    """
+    Wraps an audio source to report when its first packet is read by the audio player.
+
+    The callback runs on the audio player thread, with time.perf_counter() of the read
+    (or None if the source is cleaned up before any packet).
+    """
+
+    def __init__(self, original, callback):
+        self.original = original
+        self._callback = callback
+
+    def read(self):
+        data = self.original.read()
+        if data:
+            self.report(time.perf_counter())
+        return data
+
+    def report(self, at):
+        """
+        Reports the first packet, when it is read elsewhere (e.g. by a voice worker process).
+
+        :param at: float - time.perf_counter() of the read (the clock is shared by all processes of the host).
+        """
+        if self._callback is not None:
+            callback, self._callback = self._callback, None
+            callback(at)
+
+    def is_opus(self):
+        return self.original.is_opus()
+
+    def cleanup(self):
+        if self._callback is not None:
+            callback, self._callback = self._callback, None
+            callback(None)
+        self.original.cleanup()
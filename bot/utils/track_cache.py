@@ -0,0 +1,270 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+# Stream URLs are treated as stale this many seconds before they actually expire,
+# so a song does not start with a link that dies a moment later.
+STREAM_EXPIRY_MARGIN = 300
+
+# googlevideo links carry their expiry either as a query parameter (?expire=...)
+# or, for manifest style links, as a path segment (/expire/...).
+_EXPIRE_PATH = re.compile(r"/expire/(\d+)")
+
+# Seconds search results are reused for the same query.
+SEARCH_TTL = 15 * 60
+
+
+def normalize_query(query):
+    """
+    Normalizes a play query so equivalent queries share a cache entry.
+
+    Search text is lowercased and its whitespace collapsed. URLs are only stripped
+    since their IDs are case sensitive.
+
+    :param query: str - Search query or URL.
+    :return: str - The normalized query.
+    """
+    query = query.strip()
+    if query.startswith(("http://", "https://")):
+        return query
+    return " ".join(query.lower().split())
+
+
+def stream_url_expiry(url):
+    """
+    Reads the expiry timestamp embedded in a googlevideo stream URL.
+
+    :param url: str - The stream URL.
+    :return: float or None - Unix timestamp of the expiry, None if the URL has none.
+    """
+    if not url:
+        return None
+
+    expire = parse_qs(urlparse(url).query).get("expire")
+    if expire and expire[0].isdigit():
+        return float(expire[0])
+
+    match = _EXPIRE_PATH.search(url)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class LRUCache:
+    """
+    A class used to represent a size bounded LRU cache with optional per-entry expiry.
+
+    Attributes
+    ----------
+    max_size : int
+        Max number of entries kept. The least recently used entry is evicted first.
+    hits : int
+        Number of lookups that found a live entry.
+    misses : int
+        Number of lookups that found nothing or an expired entry.
+
+    Methods
+    -------
+    get(key)
+        Returns the live value for key, or None.
+
+    set(key, value, expires_at)
+        Stores value under key, optionally until the expires_at timestamp.
+
+    pop(key)
+        Removes key from the cache.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict = OrderedDict()  # key -> (value, expires_at)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not None
+
+    def get(self, key, count=True):
+        """
+        Returns the live value for key, or None.
+
+        :param key: The cache key.
+        :param count: bool - Whether the lookup counts towards hits/misses (default: True).
+        :return: The cached value, or None if missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._entries[key]
+
+        if count:
+            self.misses += 1
+        return None
+
+    def set(self, key, value, expires_at=None):
+        """
+        Stores value under key, evicting the least recently used entry if full.
+
+        :param key: The cache key.
+        :param value: The value to store.
+        :param expires_at: float or None - Unix timestamp after which the entry is dropped.
+        :return: None
+        """
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """
+        Removes key from the cache.
+
+        :param key: The cache key.
+        :return: None
+        """
+        self._entries.pop(key, None)
+
+    def hit_ratio(self):
+        """
+        Returns the share of lookups that were hits.
+
+        :return: float - Between 0 and 1 (0 when there were no lookups).
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TrackCache:
+    """
+    A class used to cache resolved songs in memory.
+
+    A song's metadata (title, thumbnail, duration, ...) never changes, so it is kept
+    until evicted by LRU. Its stream URL is only kept until the `expire=` timestamp
+    embedded in it. Queries map to video IDs, so different queries that lead to the
+    same video share one entry. Search result listings are kept for SEARCH_TTL.
+
+    Attributes
+    ----------
+    queries : LRUCache
+        Normalized query -> video ID.
+    metadata : LRUCache
+        Video ID -> slimmed info dict without the stream URL.
+    streams : LRUCache
+        Video ID -> stream URL, expiring with the URL.
+    searches : LRUCache
+        "<limit>:<normalized query>" -> search results, expiring after search_ttl.
+
+    Methods
+    -------
+    get(query)
+        Returns the cached info dict for a query (stream URL set to None if stale).
+
+    get_by_id(video_id)
+        Returns the cached info dict for a video ID (stream URL set to None if stale).
+
+    put(query, info)
+        Stores a freshly resolved info dict.
+
+    get_search(query, limit)
+        Returns the cached search results for a query, or None.
+
+    put_search(query, limit, entries)
+        Stores the search results for a query.
+    """
+
+    def __init__(self, max_size: int = 2048, query_ttl: float = 6 * 3600, search_ttl: float = SEARCH_TTL) -> None:
+        self.query_ttl: float = query_ttl
+        self.search_ttl: float = search_ttl
+        self.queries: LRUCache = LRUCache(max_size)
+        self.metadata: LRUCache = LRUCache(max_size)
+        self.streams: LRUCache = LRUCache(max_size)
+        self.searches: LRUCache = LRUCache(max(1, max_size // 8))  # Listings are ~20 entries each
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a cache configured through the TRACK_CACHE_SIZE environment variable.
+
+        :return: TrackCache
+        """
+        return cls(max_size=int(os.getenv("TRACK_CACHE_SIZE", "2048")))
+
+    def get(self, query):
+        """
+        Returns the cached info dict for a query.
+
+        :param query: str - Search query or URL.
+        :return: dict or None - The info dict ('url' is None if the stream URL is stale),
+            or None if the query is not cached.
+        """
+        video_id = self.queries.get(normalize_query(query))
+        if video_id is None:
+            return None
+        return self.get_by_id(video_id)
+
+    def get_by_id(self, video_id):
+        """
+        Returns the cached info dict for a video ID.
+
+        :param video_id: str - The YouTube video ID.
+        :return: dict or None - The info dict ('url' is None if the stream URL is stale),
+            or None if the video is not cached.
+        """
+        metadata = self.metadata.get(video_id)
+        if metadata is None:
+            return None
+        return dict(metadata, url=self.streams.get(video_id))
+
+    def put(self, query, info):
+        """
+        Stores a freshly resolved info dict under both the query and its video ID.
+
+        :param query: str or None - The query that resolved to info.
+        :param info: dict - Slimmed info dict (see resolver.TRACK_FIELDS).
+        :return: None
+        """
+        video_id = info.get('id')
+        if not video_id:
+            return
+
+        expires_at = time.time() + self.query_ttl
+        for alias in (query, info.get('webpage_url')):
+            if alias:
+                self.queries.set(normalize_query(alias), video_id, expires_at=expires_at)
+        self.metadata.set(video_id, dict(info, url=None))
+
+        expires = stream_url_expiry(info.get('url'))
+        if expires is not None:
+            self.streams.set(video_id, info['url'], expires_at=expires - STREAM_EXPIRY_MARGIN)
+
+    def get_search(self, query, limit):
+        """
+        Returns the cached search results for a query.
+
+        :param query: str - The search query.
+        :param limit: int - Max number of results the search was made with.
+        :return: list or None - Slimmed info dicts of the results, or None if not cached.
+        """
+        entries = self.searches.get(f"{limit}:{normalize_query(query)}")
+        return list(entries) if entries is not None else None
+
+    def put_search(self, query, limit, entries):
+        """
+        Stores the search results for a query until search_ttl passes.
+
+        :param query: str - The search query.
+        :param limit: int - Max number of results the search was made with.
+        :param entries: list - Slimmed info dicts of the results.
+        :return: None
+        """
+        self.searches.set(f"{limit}:{normalize_query(query)}", list(entries), expires_at=time.time() + self.search_ttl)
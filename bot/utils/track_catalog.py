@@ -0,0 +1,303 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import sqlite3
+import time
+
+from bot.utils.track_cache import normalize_query
+
+logger = logging.getLogger("discord")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    video_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    duration INTEGER,
+    thumbnail TEXT,
+    webpage_url TEXT,
+    uploader TEXT,
+    dominant_color INTEGER,
+    last_resolved REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+_UPSERT_TRACK = """
+INSERT INTO tracks (video_id, title, duration, thumbnail, webpage_url, uploader, last_resolved)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(video_id) DO UPDATE SET
+    title = excluded.title,
+    duration = excluded.duration,
+    thumbnail = excluded.thumbnail,
+    webpage_url = excluded.webpage_url,
+    uploader = excluded.uploader,
+    last_resolved = excluded.last_resolved
+"""
+
+_UPSERT_QUERY = """
+INSERT INTO queries (query, video_id, last_used) VALUES (?, ?, ?)
+ON CONFLICT(query) DO UPDATE SET video_id = excluded.video_id, last_used = excluded.last_used
+"""
+
+_UPDATE_COLOR = "UPDATE tracks SET dominant_color = ? WHERE video_id = ?"
+
+_SELECT_TRACK = """
+SELECT video_id, title, duration, thumbnail, webpage_url, uploader, dominant_color
+FROM tracks WHERE video_id = ?
+"""
+
+_SELECT_QUERY = "SELECT video_id FROM queries WHERE query = ?"
+
+_SELECT_RECENT_TRACKS = """
+SELECT title, webpage_url FROM tracks
+WHERE webpage_url IS NOT NULL ORDER BY last_resolved DESC LIMIT ?
+"""
+
+_SELECT_RECENT_QUERIES = """
+SELECT query FROM queries
+WHERE query NOT LIKE 'http%' ORDER BY last_used DESC LIMIT ?
+"""
+
+
+class TrackCatalog:
+    """
+    A class used to persist resolved songs in a local SQLite database.
+
+    The catalog survives restarts, so songs resolved before a redeploy can skip the
+    YouTube search afterwards. All database work happens on one dedicated thread.
+    Writes are queued without waiting and committed in batches, so the event loop
+    never blocks on disk.
+
+    Attributes
+    ----------
+    path : str
+        Location of the SQLite database file.
+    batch_size : int
+        Max number of writes committed in a single transaction.
+    flush_interval : float
+        Max seconds a queued write waits before being committed.
+
+    Methods
+    -------
+    start()
+        Opens the database and starts the background writer.
+
+    get(query)
+        Returns the catalogued info dict for a query, or None.
+
+    get_by_id(video_id)
+        Returns the catalogued info dict for a video ID, or None.
+
+    recent(limit)
+        Returns the most recently used songs and search queries.
+
+    record(query, info)
+        Queues a resolved song to be written.
+
+    record_color(video_id, color)
+        Queues the dominant thumbnail color of a song to be written.
+
+    close()
+        Commits pending writes and closes the database.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50, flush_interval: float = 2.0) -> None:
+        self.path: str = path
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog")
+        self._connection = None
+        self._pending = None
+        self._writer = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a catalog stored at TRACK_CATALOG_PATH (default: ./data/tracks.db).
+
+        :return: TrackCatalog or None if TRACK_CATALOG_PATH is set to an empty value.
+        """
+        path = os.getenv("TRACK_CATALOG_PATH", "./data/tracks.db")
+        if not path:
+            return None
+        return cls(path)
+
+    async def start(self):
+        """
+        Opens the database and starts the background writer.
+
+        :return: None
+        """
+        await self._run(self._open)
+        self._pending = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+        logger.info(f"Track catalog opened at '{self.path}'")
+
+    async def close(self):
+        """
+        Commits pending writes and closes the database.
+
+        :return: None
+        """
+        if self._writer is not None:
+            self._pending.put_nowait(None)  # Tells the writer to commit what is left and stop
+            await self._writer
+            self._writer = None
+
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    async def get(self, query):
+        """
+        Returns the catalogued info dict for a query.
+
+        :param query: str - Search query or URL.
+        :return: dict or None - Info dict (without stream URL), or None if unknown.
+        """
+        return await self._run(self._select_query, normalize_query(query))
+
+    async def get_by_id(self, video_id):
+        """
+        Returns the catalogued info dict for a video ID.
+
+        :param video_id: str - The YouTube video ID.
+        :return: dict or None - Info dict (without stream URL), or None if unknown.
+        """
+        return await self._run(self._select_track, video_id)
+
+    async def recent(self, limit=1000):
+        """
+        Returns the most recently used songs and search queries, e.g. to seed suggestions.
+
+        :param limit: int - Max number of songs and of queries (default: 1000).
+        :return: list - (label, query) pairs: (title, video URL) for songs, (query, query) for searches.
+        """
+        return await self._run(self._select_recent, limit)
+
+    def record(self, query, info):
+        """
+        Queues a resolved song to be written. Does not wait for the write.
+
+        :param query: str or None - The query that resolved to info.
+        :param info: dict - Slimmed info dict (see resolver.TRACK_FIELDS).
+        :return: None
+        """
+        if self._pending is None or not info.get('id'):
+            return
+
+        now = time.time()
+        thumbnails = info.get('thumbnails') or [{}]
+        self._pending.put_nowait((_UPSERT_TRACK, (
+            info['id'],
+            info.get('title') or '',
+            info.get('duration'),
+            thumbnails[0].get('url'),
+            info.get('webpage_url'),
+            info.get('uploader'),
+            now,
+        )))
+        for alias in (query, info.get('webpage_url')):
+            if alias:
+                self._pending.put_nowait((_UPSERT_QUERY, (normalize_query(alias), info['id'], now)))
+
+    def record_color(self, video_id, color):
+        """
+        Queues the dominant thumbnail color of a song to be written. Does not wait for the write.
+
+        :param video_id: str - The YouTube video ID.
+        :param color: int - The Discord embed color.
+        :return: None
+        """
+        if self._pending is not None and video_id:
+            self._pending.put_nowait((_UPDATE_COLOR, (color, video_id)))
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _write_loop(self):
+        """
+        Collects queued writes and commits them in batches.
+        """
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = [await self._pending.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._pending.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            if batch[-1] is None:
+                stopping = True
+                batch.pop()
+
+            try:
+                await self._run(self._commit, batch)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write {len(batch)} track catalog entries: {e}")
+
+    # The methods below run on the catalog thread only.
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._connection.commit()
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _commit(self, batch):
+        if not batch or self._connection is None:
+            return
+        with self._connection:  # One transaction for the whole batch
+            for statement, params in batch:
+                self._connection.execute(statement, params)
+
+    def _select_query(self, query):
+        if self._connection is None:
+            return None
+        row = self._connection.execute(_SELECT_QUERY, (query,)).fetchone()
+        return self._select_track(row[0]) if row else None
+
+    def _select_track(self, video_id):
+        if self._connection is None:
+            return None
+        row = self._connection.execute(_SELECT_TRACK, (video_id,)).fetchone()
+        if row is None:
+            return None
+
+        video_id, title, duration, thumbnail, webpage_url, uploader, dominant_color = row
+        return {
+            'id': video_id,
+            'title': title,
+            'duration': duration,
+            'webpage_url': webpage_url,
+            'url': None,
+            'thumbnails': [{'url': thumbnail}] if thumbnail else [],
+            'uploader': uploader,
+            'dominant_color': dominant_color,
+        }
+
+    def _select_recent(self, limit):
+        if self._connection is None:
+            return []
+        tracks = self._connection.execute(_SELECT_RECENT_TRACKS, (limit,)).fetchall()
+        queries = self._connection.execute(_SELECT_RECENT_QUERIES, (limit,)).fetchall()
+        return [(title, url) for title, url in tracks] + [(query, query) for (query,) in queries]
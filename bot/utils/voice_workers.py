@@ -0,0 +1,938 @@
+import asyncio
+import itertools
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import struct
+import tempfile
+import time
+from types import SimpleNamespace
+
+import aiohttp
+import discord
+
+from bot.utils.audio_cache import OggFileAudio
+from bot.utils.audio_source import AudioFormat, create_audio_source
+from bot.utils.tracing import FirstPacketProbe
+
+logger = logging.getLogger("discord")
+
+# Header of an IPC message: length of the JSON body that follows.
+HEADER = struct.Struct("!I")
+
+# Seconds before a crashed voice worker is restarted.
+WORKER_RESTART_DELAY = 5
+
+# Seconds the pool waits for its workers to connect when starting.
+WORKER_START_TIMEOUT = 30
+
+# Seconds a worker gets to answer a request, on top of the request's own timeout.
+REQUEST_MARGIN = 5
+
+
+async def read_message(reader):
+    """
+    Reads one length-prefixed JSON message.
+
+    :param reader: asyncio.StreamReader
+    :return: dict
+    :raises asyncio.IncompleteReadError: If the other process closed the connection.
+    """
+    size, = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return json.loads(await reader.readexactly(size))
+
+
+def write_message(writer, message):
+    """
+    Writes one length-prefixed JSON message. Does not wait for it to be sent.
+
+    :param writer: asyncio.StreamWriter
+    :param message: dict
+    """
+    body = json.dumps(message, separators=(",", ":")).encode()
+    writer.write(HEADER.pack(len(body)) + body)
+
+
+######################## FRONT END ########################
+# Runs in the bot process, next to the cogs.
+
+class RemoteSource(discord.AudioSource):
+    """
+    An audio source created in the voice worker of a guild (ffmpeg runs in the worker).
+
+    The bot only holds a token naming it. Cleaning it up before it is played
+    releases it (and its ffmpeg process) in the worker.
+    """
+
+    def __init__(self, pool, guild_id, token, spec):
+        self.guild_id = guild_id
+        self.token = token
+        self.spec = spec
+        self._pool = pool
+        self._released = False
+
+    @property
+    def ffmpeg(self):
+        """
+        :return: bool - Whether the source streams through an ffmpeg process (not a cached file).
+        """
+        return self.spec['kind'] == "stream"
+
+    def read(self):
+        return b""
+
+    def is_opus(self):
+        return True
+
+    def take(self):
+        """
+        Hands the source over to the worker playing it. Called by RemoteVoiceClient.play.
+        """
+        self._released = True
+
+    def cleanup(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self.guild_id, self.token)
+
+
+class RemoteVoiceClient(discord.VoiceProtocol):
+    """
+    A voice client whose connection and audio live in a voice worker process.
+
+    Created by discord.py when connecting with `channel.connect(cls=pool.voice_client)`.
+    The gateway events of the bot's voice state are forwarded to the worker, which
+    asks back for the voice state changes it needs (join, move, leave). Playback
+    calls are sent to the worker, and the playback state is mirrored here, so the
+    cog uses it like a discord.VoiceClient.
+
+    Attributes
+    ----------
+    pool : VoiceWorkerPool
+        The pool of the worker owning the connection.
+    source : discord.AudioSource or None
+        The source playing (a RemoteSource, possibly wrapped in a Tracing.FirstPacketProbe).
+    """
+
+    def __init__(self, client, channel, pool):
+        super().__init__(client, channel)
+        self.pool = pool
+        self.source = None
+
+        self._worker = None
+        self._connected = False
+        self._sequence = itertools.count()
+        self._plays = {}  # play sequence number -> (source, after)
+        self._current = None  # Sequence number of the song playing or paused
+        self._paused = False
+
+    @property
+    def guild(self):
+        """
+        :return: discord.Guild - The guild the client is connected in.
+        """
+        return self.channel.guild
+
+    @property
+    def worker(self):
+        """
+        :return: int or None - Index of the worker owning the connection.
+        """
+        return self._worker.index if self._worker is not None else None
+
+    async def connect(self, *, timeout, reconnect, self_deaf=False, self_mute=False):
+        try:
+            self._worker = self.pool.assign(self.guild.id, self)
+        except discord.ClientException:
+            self.cleanup()
+            raise
+        error = await self.pool.request(self._worker, {
+            "op": "connect", "guild": self.guild.id, "channel": self.channel.id, "user": self.client.user.id,
+            "timeout": timeout, "reconnect": reconnect, "self_deaf": self_deaf, "self_mute": self_mute,
+        }, timeout)
+        if error == "timeout":
+            raise asyncio.TimeoutError()  # discord.py disconnects
+        if error is not None:
+            self.cleanup()
+            raise discord.ClientException(f"Voice worker {self.worker} failed to connect: {error}")
+        self._connected = True
+
+    async def on_voice_state_update(self, data):
+        if data.get('channel_id') is not None:
+            self.channel = self.guild.get_channel(int(data['channel_id'])) or self.channel
+        self._send({"op": "voice_state", "data": data})
+
+    async def on_voice_server_update(self, data):
+        self._send({"op": "voice_server", "data": data})
+
+    def is_connected(self):
+        return self._connected
+
+    def is_playing(self):
+        return self._current is not None and not self._paused
+
+    def is_paused(self):
+        return self._current is not None and self._paused
+
+    def play(self, source, *, after=None):
+        """
+        Plays a source prepared with VoiceWorkerPool.prepare_file or prepare_stream.
+
+        :param source: RemoteSource, possibly wrapped in a Tracing.FirstPacketProbe.
+        :param after: function or None - Called with the error (or None) once the song ends.
+        """
+        if not self._connected:
+            raise discord.ClientException("Not connected to voice.")
+        if self._current is not None:
+            raise discord.ClientException("Already playing audio.")
+        remote = getattr(source, 'original', source)
+        if not isinstance(remote, RemoteSource):
+            raise TypeError(f"source must be a RemoteSource, not {type(remote).__name__}")
+
+        remote.take()
+        sequence = next(self._sequence)
+        self._plays[sequence] = (source, after)
+        self._current = sequence
+        self._paused = False
+        self.source = source
+        self._send({"op": "play", "seq": sequence, "token": remote.token})
+
+    def pause(self):
+        if self.is_playing():
+            self._paused = True
+            self._send({"op": "pause"})
+
+    def resume(self):
+        if self.is_paused():
+            self._paused = False
+            self._send({"op": "resume"})
+
+    def stop(self):
+        """
+        Stops the song. Its `after` function runs once the worker reports the end.
+        """
+        if self._current is not None:
+            self._current = None
+            self._paused = False
+            self._send({"op": "stop"})
+
+    async def move_to(self, channel, *, timeout=30.0):
+        if self._worker is None:
+            return
+        error = await self.pool.request(self._worker, {
+            "op": "move", "guild": self.guild.id, "channel": channel.id if channel else None, "timeout": timeout,
+        }, timeout)
+        if error is not None:
+            logger.warning(f"Voice worker {self.worker} failed to move to channel {getattr(channel, 'id', None)}: {error}")
+
+    async def disconnect(self, *, force=False):
+        if not force and not self._connected:
+            return
+        self.stop()
+        if self._worker is not None:
+            error = await self.pool.request(self._worker, {"op": "disconnect", "guild": self.guild.id, "force": force}, 30.0)
+            if error is not None:
+                logger.warning(f"Voice worker {self.worker} failed to disconnect from guild {self.guild.id}: {error}")
+        self.cleanup()
+
+    def cleanup(self):
+        self._connected = False
+        self.pool.forget(self.guild.id, self)
+        super().cleanup()
+
+    def _send(self, message):
+        if self._worker is not None:
+            message.setdefault("guild", self.guild.id)
+            self.pool.send(self._worker, message)
+
+    # The methods below are called by the pool with the worker's events.
+
+    def _on_first_packet(self, sequence, at):
+        source, _ = self._plays.get(sequence, (None, None))
+        if isinstance(source, FirstPacketProbe):
+            source.report(at)
+
+    def _on_ended(self, sequence, error):
+        source, after = self._plays.pop(sequence, (None, None))
+        if sequence == self._current:
+            self._current = None
+            self._paused = False
+        if source is None:
+            return
+        source.cleanup()  # Reports a song that never played to the probe
+        if after is not None:
+            try:
+                after(discord.ClientException(error) if error else None)
+            except Exception:
+                logger.exception(f"Calling the after function of a song in guild {self.guild.id} failed")
+
+    def _on_disconnected(self):
+        """
+        The worker's connection ended (kicked, channel deleted, failed reconnect).
+        """
+        for sequence in list(self._plays):
+            self._on_ended(sequence, None)
+        self.cleanup()
+
+    def _on_worker_lost(self):
+        """
+        The worker process exited: the songs end with an error, and the bot leaves the channel.
+        """
+        self._worker = None
+        for sequence in list(self._plays):
+            self._on_ended(sequence, "The voice worker exited")
+        self.cleanup()
+        asyncio.create_task(self._leave())
+
+    async def _leave(self):
+        try:
+            await self.guild.change_voice_state(channel=None)
+        except Exception as e:
+            logger.warning(f"Failed to leave the voice channel of guild {self.guild.id}: {e}")
+
+    async def _change_voice_state(self, channel_id, self_deaf, self_mute):
+        channel = discord.Object(channel_id) if channel_id is not None else None
+        await self.guild.change_voice_state(channel=channel, self_deaf=self_deaf, self_mute=self_mute)
+
+
+class WorkerHandle:
+    """
+    The bot's side of one voice worker process.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.writer = None
+        self.guilds = {}  # guild ID -> RemoteVoiceClient
+        self.pending = {}  # request ID -> asyncio.Future of the error (None for success)
+        self.connected = asyncio.Event()
+
+
+class VoiceWorkerPool:
+    """
+    A class used to run the voice connections of the bot in separate worker processes.
+
+    Each worker is a process with its own event loop and GIL, owning the voice
+    connections of a set of guilds: their ffmpeg processes, Opus packets, encryption
+    and voice UDP. The bot keeps the gateway connection, the commands and the queues,
+    and drives the workers through length-prefixed JSON messages over a Unix socket.
+    A guild is assigned to the worker with the fewest guilds when the bot joins its
+    voice channel, and stays there until it leaves. A worker that crashes is
+    restarted, its guilds' songs end with an error.
+
+    Attributes
+    ----------
+    size : int
+        Number of worker processes.
+    socket_path : str
+        Unix socket the workers connect to.
+    log_file_path : str or None
+        Log file of the bot; each worker logs next to it ("<name>-voice-<index>.log").
+
+    Methods
+    -------
+    start()
+        Starts the worker processes and waits for them to connect.
+
+    voice_client(client, channel)
+        Creates the voice client of a guild, to pass as `cls` to channel.connect().
+
+    prepare_file(guild_id, path)
+        Prepares a cached song in the guild's worker.
+
+    prepare_stream(guild_id, url, fmt, channel_bitrate)
+        Prepares a streamed song in the guild's worker, starting its ffmpeg process.
+
+    load()
+        Returns the number of guilds of each worker.
+
+    close()
+        Stops the worker processes.
+    """
+
+    def __init__(self, size: int, socket_path: str, log_file_path: str = None) -> None:
+        self.size: int = size
+        self.socket_path: str = socket_path
+        self.log_file_path: str = log_file_path
+
+        self._workers = [WorkerHandle(index) for index in range(size)]
+        self._assignments = {}  # guild ID -> WorkerHandle
+        self._requests = itertools.count()
+        self._tokens = itertools.count()
+        self._server = None
+        self._loop = None
+        self._closing = False
+        self._context = multiprocessing.get_context("spawn")
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a pool of VOICE_WORKERS processes.
+
+        :return: VoiceWorkerPool or None if VOICE_WORKERS is unset or 0 (voice runs in the bot's process).
+        """
+        size = int(os.getenv("VOICE_WORKERS", "0") or 0)
+        if size <= 0:
+            return None
+        socket_path = os.path.join(tempfile.gettempdir(), f"musicbot-voice-{os.getpid()}.sock")
+        log_file_path = next(
+            (handler.baseFilename for handler in logger.handlers if isinstance(handler, logging.FileHandler)), None
+        )
+        return cls(size, socket_path, log_file_path)
+
+    async def start(self):
+        """
+        Starts the worker processes and waits for them to connect.
+
+        :return: None
+        """
+        self._loop = asyncio.get_running_loop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._serve, self.socket_path)
+        for worker in self._workers:
+            self._spawn(worker)
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(worker.connected.wait() for worker in self._workers)), WORKER_START_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            ready = sum(1 for worker in self._workers if worker.connected.is_set())
+            logger.error(f"Only {ready} of {self.size} voice workers connected within {WORKER_START_TIMEOUT}s")
+        else:
+            logger.info(f"Started {self.size} voice workers")
+
+    def voice_client(self, client, channel):
+        """
+        Creates the voice client of a guild, to pass as `cls` to channel.connect().
+
+        :param client: discord.Client
+        :param channel: discord.VoiceChannel
+        :return: RemoteVoiceClient
+        """
+        return RemoteVoiceClient(client, channel, self)
+
+    def assign(self, guild_id, voice):
+        """
+        Returns the worker of a guild, assigning the least loaded connected one if it has none.
+
+        :param guild_id: int
+        :param voice: RemoteVoiceClient - The guild's voice client.
+        :return: WorkerHandle
+        :raises discord.ClientException: If no worker is connected.
+        """
+        worker = self._assignments.get(guild_id)
+        if worker is None:
+            workers = [worker for worker in self._workers if worker.connected.is_set()]
+            if not workers:
+                raise discord.ClientException("No voice worker is running")
+            worker = min(workers, key=lambda worker: len(worker.guilds))
+            self._assignments[guild_id] = worker
+        worker.guilds[guild_id] = voice
+        return worker
+
+    def forget(self, guild_id, voice):
+        """
+        Ends the assignment of a guild whose voice client was cleaned up.
+
+        :param guild_id: int
+        :param voice: RemoteVoiceClient
+        """
+        worker = self._assignments.get(guild_id)
+        if worker is not None and worker.guilds.get(guild_id) in (voice, None):
+            del self._assignments[guild_id]
+            worker.guilds.pop(guild_id, None)
+
+    def prepare_file(self, guild_id, path):
+        """
+        Prepares a cached song (see audio_cache.AudioCache.lookup) in the guild's worker.
+
+        :param guild_id: int
+        :param path: str - The Ogg Opus file.
+        :return: RemoteSource
+        """
+        return self._prepare(guild_id, {"kind": "file", "path": path})
+
+    def prepare_stream(self, guild_id, url, fmt=None, channel_bitrate=None):
+        """
+        Prepares a streamed song in the guild's worker, which starts its ffmpeg process
+        (see audio_source.create_audio_source).
+
+        :param guild_id: int
+        :param url: str - The stream URL of the song.
+        :param fmt: AudioFormat or None - The format yt-dlp reported for the stream.
+        :param channel_bitrate: int or None - Bitrate of the voice channel in bps.
+        :return: RemoteSource
+        """
+        return self._prepare(guild_id, {
+            "kind": "stream", "url": url, "format": list(fmt) if fmt is not None else None, "bitrate": channel_bitrate,
+        })
+
+    def release(self, guild_id, token):
+        """
+        Releases a source that will not be played. Safe to call from any thread.
+
+        :param guild_id: int
+        :param token: int
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._release, guild_id, token)
+        except RuntimeError:  # Loop closed
+            pass
+
+    def load(self):
+        """
+        :return: dict - (worker index,) -> number of guilds connected through it.
+        """
+        return {(worker.index,): len(worker.guilds) for worker in self._workers}
+
+    def send(self, worker, message):
+        """
+        Sends a message to a worker, if it is connected.
+
+        :param worker: WorkerHandle
+        :param message: dict
+        """
+        if worker.writer is not None:
+            write_message(worker.writer, message)
+
+    async def request(self, worker, message, timeout):
+        """
+        Sends a request to a worker and waits for its answer.
+
+        :param worker: WorkerHandle
+        :param message: dict
+        :param timeout: float or None - Timeout of the operation in the worker.
+        :return: str or None - The error, "timeout" if the worker did not answer in time, None on success.
+        """
+        if worker.writer is None:
+            return "The voice worker is not running"
+        request_id = next(self._requests)
+        future = self._loop.create_future()
+        worker.pending[request_id] = future
+        self.send(worker, dict(message, id=request_id))
+        try:
+            return await asyncio.wait_for(future, (timeout or 30.0) + REQUEST_MARGIN)
+        except asyncio.TimeoutError:
+            return "timeout"
+        finally:
+            worker.pending.pop(request_id, None)
+
+    async def close(self):
+        """
+        Disconnects the guilds and stops the worker processes.
+
+        :return: None
+        """
+        self._closing = True
+        for worker in self._workers:
+            for voice in list(worker.guilds.values()):
+                voice.cleanup()
+            if worker.writer is not None:
+                worker.writer.close()  # The worker disconnects its guilds and exits
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for worker in self._workers:
+            if worker.process is not None:
+                self._loop.remove_reader(worker.process.sentinel)
+        await asyncio.gather(*(asyncio.to_thread(self._stop_process, worker) for worker in self._workers))
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def _prepare(self, guild_id, spec):
+        worker = self._assignments.get(guild_id)
+        token = next(self._tokens)
+        if worker is not None:
+            self.send(worker, {"op": "prepare", "guild": guild_id, "token": token, "source": spec})
+        return RemoteSource(self, guild_id, token, spec)
+
+    def _release(self, guild_id, token):
+        worker = self._assignments.get(guild_id)
+        if worker is not None:
+            self.send(worker, {"op": "release", "guild": guild_id, "token": token})
+
+    def _spawn(self, worker):
+        worker.process = self._context.Process(
+            target=run_worker, args=(worker.index, self.socket_path, self.log_file_path),
+            name=f"voice-{worker.index}", daemon=True,
+        )
+        worker.process.start()
+        self._loop.add_reader(worker.process.sentinel, self._exited, worker)  # Readable once the process ends
+        logger.info(f"Started voice worker {worker.index} in process {worker.process.pid}")
+
+    @staticmethod
+    def _stop_process(worker):
+        if worker.process is None:
+            return
+        worker.process.join(5)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join()
+
+    def _exited(self, worker):
+        """
+        Called when a worker process ends: restarts it after WORKER_RESTART_DELAY seconds.
+        """
+        self._loop.remove_reader(worker.process.sentinel)
+        worker.process.join()
+        self._lost(worker)
+        if self._closing:
+            return
+        logger.error(
+            f"Voice worker {worker.index} exited with code {worker.process.exitcode}, restarting in {WORKER_RESTART_DELAY}s"
+        )
+        self._loop.call_later(WORKER_RESTART_DELAY, lambda: self._closing or self._spawn(worker))
+
+    async def _serve(self, reader, writer):
+        """
+        Handles the connection of a worker: its hello, then its events until it exits.
+        """
+        try:
+            hello = await read_message(reader)
+        except (asyncio.IncompleteReadError, ValueError):
+            writer.close()
+            return
+        worker = self._workers[hello['worker']]
+        worker.writer = writer
+        worker.connected.set()
+
+        try:
+            while True:
+                self._dispatch(worker, await read_message(reader))
+        except asyncio.IncompleteReadError:
+            pass
+        except Exception:
+            logger.exception(f"Voice worker {worker.index} sent an invalid message")
+        finally:
+            writer.close()
+            if worker.writer is writer:  # Otherwise _exited() already handled the exit, and may have restarted the worker
+                self._lost(worker)
+                if not self._closing and worker.process.is_alive():
+                    worker.process.terminate()  # Restarted by _exited()
+
+    def _dispatch(self, worker, message):
+        event = message['ev']
+        if event == "reply":
+            future = worker.pending.get(message['id'])
+            if future is not None and not future.done():
+                future.set_result(message.get('error'))
+            return
+
+        voice = worker.guilds.get(message.get('guild'))
+        if voice is None:
+            return
+        if event == "change_voice_state":
+            asyncio.create_task(voice._change_voice_state(message['channel'], message['self_deaf'], message['self_mute']))
+        elif event == "first_packet":
+            voice._on_first_packet(message['seq'], message['at'])
+        elif event == "ended":
+            voice._on_ended(message['seq'], message.get('error'))
+        elif event == "disconnected":
+            voice._on_disconnected()
+
+    def _lost(self, worker):
+        """
+        Ends the guilds of a worker whose connection closed.
+        """
+        worker.writer = None
+        worker.connected.clear()
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_result("The voice worker exited")
+        for guild_id, voice in list(worker.guilds.items()):
+            self._assignments.pop(guild_id, None)
+            voice._on_worker_lost()
+        worker.guilds.clear()
+
+
+######################## WORKER ########################
+# Runs in the worker processes. discord.VoiceClient is used as is, over the small
+# stand-ins below for the parts of the bot's client it reads.
+
+class WorkerChannel:
+    """
+    A voice channel, as seen by a worker: just its ID.
+    """
+
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.guild = guild
+
+    def _get_voice_client_key(self):
+        return self.guild.id, "guild_id"
+
+
+class WorkerGuild:
+    """
+    A guild, as seen by a worker. Voice state changes are asked to the bot, which owns the gateway.
+    """
+
+    def __init__(self, guild_id, worker):
+        self.id = guild_id
+        self.me = SimpleNamespace(id=worker.user_id, voice=None)  # voice: discord.py falls back to the values passed to connect()
+        self._worker = worker
+
+    def get_channel(self, channel_id):
+        return WorkerChannel(channel_id, self)
+
+    async def change_voice_state(self, *, channel, self_deaf=False, self_mute=False):
+        self._worker.notify(
+            "change_voice_state", self.id, channel=channel.id if channel else None, self_deaf=self_deaf, self_mute=self_mute
+        )
+
+
+class WorkerHTTP:
+    """
+    Opens the voice websockets of a worker.
+    """
+
+    def __init__(self):
+        self.session = aiohttp.ClientSession()
+        self.user_agent = f"DiscordBot (https://github.com/Rapptz/discord.py {discord.__version__})"
+
+    async def ws_connect(self, url, *, compress=0):
+        return await self.session.ws_connect(
+            url, max_msg_size=0, timeout=30.0, autoclose=False, headers={'User-Agent': self.user_agent}, compress=compress
+        )
+
+
+class WorkerConnection:
+    """
+    Stands in for the client's connection state, as read by discord.VoiceClient.
+    """
+
+    def __init__(self, worker):
+        self.loop = worker.loop
+        self.http = worker.http
+        self._worker = worker
+
+    @property
+    def user(self):
+        return discord.Object(self._worker.user_id)
+
+    def _remove_voice_client(self, guild_id):
+        self._worker.voice_clients.pop(guild_id, None)
+        self._worker.release_guild(guild_id)
+        self._worker.notify("disconnected", guild_id)
+
+
+class WorkerClient:
+    """
+    Stands in for the bot's client, as read by discord.VoiceClient and its audio player.
+    """
+
+    def __init__(self, worker):
+        self.loop = worker.loop
+        self._connection = WorkerConnection(worker)
+
+
+class VoiceWorker:
+    """
+    The voice worker process: runs the voice connections of the guilds the bot assigns to it.
+
+    Requests of a guild are handled one at a time, in order, except for the voice
+    state and server updates, which a pending connect or move needs to complete.
+    """
+
+    def __init__(self, index, socket_path):
+        self.index = index
+        self.socket_path = socket_path
+        self.user_id = None
+        self.voice_clients = {}  # guild ID -> discord.VoiceClient
+        self.loop = None
+        self.http = None
+
+        self._client = None
+        self._writer = None
+        self._prepared = {}  # token -> (guild ID, asyncio.Task creating the source)
+        self._locks = {}  # guild ID -> asyncio.Lock
+
+    async def run(self):
+        """
+        Connects to the bot and handles its requests until it closes the connection.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.http = WorkerHTTP()
+        self._client = WorkerClient(self)
+        reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        write_message(self._writer, {"worker": self.index, "pid": os.getpid()})
+
+        try:
+            while True:
+                self._dispatch(await read_message(reader))
+        except asyncio.IncompleteReadError:
+            logger.info(f"Voice worker {self.index} stopping")
+        finally:
+            for voice in list(self.voice_clients.values()):
+                await voice.disconnect(force=True)
+            for token in list(self._prepared):
+                self._release(token)
+            await self.http.session.close()
+
+    def notify(self, event, guild_id, **fields):
+        """
+        Sends an event to the bot. Safe to call from the audio player threads.
+        """
+        self.loop.call_soon_threadsafe(self._send, dict(fields, ev=event, guild=guild_id))
+
+    def _send(self, message):
+        if not self._writer.is_closing():
+            write_message(self._writer, message)
+
+    def release_guild(self, guild_id):
+        """
+        Releases the sources prepared for a guild that left.
+        """
+        for token, (guild, _) in list(self._prepared.items()):
+            if guild == guild_id:
+                self._release(token)
+        self._locks.pop(guild_id, None)
+
+    def _dispatch(self, message):
+        op = message['op']
+        guild_id = message['guild']
+        voice = self.voice_clients.get(guild_id)
+        if op == "voice_state":
+            if voice is not None:
+                asyncio.create_task(voice.on_voice_state_update(message['data']))
+        elif op == "voice_server":
+            if voice is not None:
+                asyncio.create_task(voice.on_voice_server_update(message['data']))
+        elif op == "connect":
+            asyncio.create_task(self._reply(message, self._connect(message)))
+        elif op == "prepare":
+            self._prepared[message['token']] = (guild_id, asyncio.create_task(create_source(message['source'])))
+        elif op == "release":
+            self._release(message['token'])
+        else:  # play, pause, resume, stop, move, disconnect
+            lock = self._locks.setdefault(guild_id, asyncio.Lock())
+            asyncio.create_task(self._in_order(lock, message))
+
+    async def _in_order(self, lock, message):
+        async with lock:
+            if message['op'] in ("move", "disconnect"):
+                await self._reply(message, self._control(message))
+            else:
+                await self._playback(message)
+
+    async def _reply(self, message, coro):
+        try:
+            await coro
+            error = None
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except Exception as e:
+            logger.exception(f"Voice worker {self.index} failed to {message['op']} in guild {message['guild']}")
+            error = f"{type(e).__name__}: {e}"
+        self._send({"ev": "reply", "id": message['id'], "error": error})
+
+    async def _connect(self, message):
+        self.user_id = message['user']
+        guild = WorkerGuild(message['guild'], self)
+        voice = discord.VoiceClient(self._client, guild.get_channel(message['channel']))
+        self.voice_clients[guild.id] = voice
+        try:
+            await voice.connect(
+                timeout=message['timeout'], reconnect=message['reconnect'],
+                self_deaf=message['self_deaf'], self_mute=message['self_mute'],
+            )
+        except BaseException:
+            await voice.disconnect(force=True)
+            raise
+
+    async def _control(self, message):
+        voice = self.voice_clients.get(message['guild'])
+        if voice is None:
+            return
+        if message['op'] == "move":
+            channel = voice.guild.get_channel(message['channel']) if message['channel'] is not None else None
+            await voice.move_to(channel, timeout=message['timeout'])
+        else:
+            await voice.disconnect(force=message['force'])
+
+    async def _playback(self, message):
+        op, guild_id = message['op'], message['guild']
+        voice = self.voice_clients.get(guild_id)
+        if op == "play":
+            await self._play(guild_id, voice, message['seq'], message['token'])
+        elif voice is None:
+            return
+        elif op == "stop":
+            voice.stop()
+        elif op == "pause":
+            voice.pause()
+        elif op == "resume":
+            voice.resume()
+
+    async def _play(self, guild_id, voice, sequence, token):
+        _, task = self._prepared.pop(token, (None, None))
+        try:
+            if task is None:
+                raise discord.ClientException("Unknown audio source")
+            source = await task
+            if voice is None or not voice.is_connected():
+                source.cleanup()
+                raise discord.ClientException("Not connected to voice")
+        except Exception as e:
+            self.notify("ended", guild_id, seq=sequence, error=f"{type(e).__name__}: {e}")
+            return
+
+        def first_packet(at):
+            if at is not None:
+                self.notify("first_packet", guild_id, seq=sequence, at=at)
+
+        def ended(error):
+            self.notify("ended", guild_id, seq=sequence, error=f"{type(error).__name__}: {error}" if error else None)
+
+        voice.play(FirstPacketProbe(source, first_packet), after=ended)
+
+    def _release(self, token):
+        _, task = self._prepared.pop(token, (None, None))
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()
+        task.add_done_callback(lambda task: task.cancelled() or task.exception() or task.result().cleanup())
+
+
+async def create_source(spec):
+    """
+    Creates the audio source described by RemoteSource.spec, in a worker.
+
+    :param spec: dict - {"kind": "file", "path"} or {"kind": "stream", "url", "format", "bitrate"}.
+    :return: discord.AudioSource
+    """
+    if spec['kind'] == "file":
+        return OggFileAudio(spec['path'])
+    fmt = AudioFormat(*spec['format']) if spec['format'] is not None else None
+    source, _ = await create_audio_source(spec['url'], fmt, spec['bitrate'])
+    return source
+
+
+def run_worker(index, socket_path, log_file_path=None):
+    """
+    Entry point of a voice worker process.
+
+    :param index: int - Index of the worker in the pool.
+    :param socket_path: str - Unix socket of the bot.
+    :param log_file_path: str or None - Log file of the bot; the worker logs next to it.
+    """
+    logger.setLevel(logging.INFO)
+    if log_file_path:
+        base, extension = os.path.splitext(log_file_path)
+        handler = logging.handlers.RotatingFileHandler(
+            filename=f"{base}-voice-{index}{extension}", encoding="utf-8", maxBytes=8 * 1024 * 1024, backupCount=5,
+        )
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"))
+    logger.addHandler(handler)
+
+    started = time.perf_counter()
+    asyncio.run(VoiceWorker(index, socket_path).run())
+    logger.info(f"Voice worker {index} ran for {time.perf_counter() - started:.0f}s")
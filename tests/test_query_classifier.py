@@ -0,0 +1,98 @@
+import pytest
+
+from bot.utils.query_classifier import PLAYLIST, SEARCH, URL, VIDEO, classify_query
+
+VIDEO_ID = "dQw4w9WgXcQ"
+PLAYLIST_ID = "PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI"
+WATCH_URL = f"https://www.youtube.com/watch?v={VIDEO_ID}"
+PLAYLIST_URL = f"https://www.youtube.com/playlist?list={PLAYLIST_ID}"
+
+
+@pytest.mark.parametrize("query", [
+    f"https://www.youtube.com/watch?v={VIDEO_ID}",
+    f"http://youtube.com/watch?v={VIDEO_ID}&t=42s",
+    f"https://m.youtube.com/watch?feature=share&v={VIDEO_ID}",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}?feature=share",
+    f"https://www.youtube.com/live/{VIDEO_ID}",
+    f"https://www.youtube.com/embed/{VIDEO_ID}",
+    f"https://www.youtube-nocookie.com/embed/{VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}?si=abcdef",
+    f"https://music.youtube.com/watch?v={VIDEO_ID}",
+    f"HTTPS://WWW.YOUTUBE.COM/watch?v={VIDEO_ID}",
+])
+def test_video_links(query):
+    assert classify_query(query) == (VIDEO, WATCH_URL, VIDEO_ID, None)
+
+
+@pytest.mark.parametrize("query", [
+    f"youtu.be/{VIDEO_ID}",
+    f"youtube.com/watch?v={VIDEO_ID}",
+    f"www.youtube.com/watch?v={VIDEO_ID}",
+    f"music.youtube.com/watch?v={VIDEO_ID}",
+])
+def test_schemeless_video_links(query):
+    assert classify_query(query) == (VIDEO, WATCH_URL, VIDEO_ID, None)
+
+
+@pytest.mark.parametrize("query", [
+    f"<{WATCH_URL}>",
+    f"  <https://youtu.be/{VIDEO_ID}>  ",
+    f"\n{WATCH_URL}\n",
+])
+def test_wrapped_and_padded_links(query):
+    assert classify_query(query) == (VIDEO, WATCH_URL, VIDEO_ID, None)
+
+
+@pytest.mark.parametrize("query", [
+    PLAYLIST_URL,
+    f"https://music.youtube.com/playlist?list={PLAYLIST_ID}",
+    f"youtube.com/playlist?list={PLAYLIST_ID}",
+    f"<{PLAYLIST_URL}>",
+])
+def test_playlist_links(query):
+    assert classify_query(query) == (PLAYLIST, PLAYLIST_URL, None, PLAYLIST_ID)
+
+
+def test_watch_link_with_playlist_plays_the_video():
+    query = f"https://www.youtube.com/watch?v={VIDEO_ID}&list={PLAYLIST_ID}&index=3"
+    assert classify_query(query) == (VIDEO, WATCH_URL, VIDEO_ID, PLAYLIST_ID)
+
+
+def test_watch_link_with_invalid_video_id_falls_back_to_playlist():
+    query = f"https://www.youtube.com/watch?v=short&list={PLAYLIST_ID}"
+    assert classify_query(query) == (PLAYLIST, PLAYLIST_URL, None, PLAYLIST_ID)
+
+
+@pytest.mark.parametrize("query", [
+    "https://www.youtube.com/@SomeChannel",
+    "https://www.youtube.com/results?search_query=lofi",
+    "https://www.youtube.com/watch",
+    "https://www.youtube.com/shorts/",
+])
+def test_other_youtube_pages_go_to_yt_dlp(query):
+    assert classify_query(query) == (URL, query, None, None)
+
+
+@pytest.mark.parametrize("query", [
+    "https://soundcloud.com/artist/track",
+    "https://vimeo.com/123456789",
+    f"https://notyoutube.com/watch?v={VIDEO_ID}",
+    f"https://youtube.com.evil.example/watch?v={VIDEO_ID}",
+])
+def test_non_youtube_links(query):
+    assert classify_query(query) == (URL, query, None, None)
+
+
+@pytest.mark.parametrize("query", [
+    "never gonna give you up",
+    "lofi",
+    "AC/DC back in black",
+    "youtube.com is great",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ and more",
+    "http://",
+    "",
+])
+def test_search_text(query):
+    assert classify_query(query) == (SEARCH, None, None, None)
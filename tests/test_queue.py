@@ -0,0 +1,151 @@
+from bot.utils.music_utilities import NO_TRACK, Queue
+
+
+def make_queue(*titles):
+    queue = Queue()
+    for title in titles:
+        queue.enqueue(title, f"stream/{title}", f"thumb/{title}", f"watch/{title}", 60, 1)
+    return queue
+
+
+def titles(tracks):
+    return [track.title for track in tracks]
+
+
+def test_empty_queue():
+    queue = Queue()
+    assert queue.is_empty()
+    assert queue.size() == 0
+    assert queue.current_music is NO_TRACK
+    assert not queue.theres_next()
+    assert queue.peek_next() is None
+    assert queue.snapshot() == ()
+
+
+def test_first_song_becomes_current():
+    queue = make_queue("a")
+    assert queue.current_music.title == "a"
+    assert not queue.theres_next()
+    assert queue.peek_next() is None
+
+
+def test_next_walks_the_queue_and_stops_at_the_end():
+    queue = make_queue("a", "b", "c")
+    assert queue.peek_next().title == "b"
+
+    queue.next()
+    assert queue.current_music.title == "b"
+    assert queue.theres_next()
+    assert queue.peek_next().title == "c"
+
+    queue.next()
+    assert queue.current_music.title == "c"
+    assert not queue.theres_next()
+    assert queue.peek_next() is None
+
+    queue.next()  # At the last song: stays there
+    assert queue.current_music.title == "c"
+    assert queue.size() == 3  # Played songs stay in the queue
+
+
+def test_duplicate_tracks_are_distinct_entries():
+    queue = make_queue("a", "a", "a")
+    first = queue.current_music
+    assert queue.size() == 3
+    assert queue.peek_next() is not first
+
+    queue.next()
+    second = queue.current_music
+    assert second is not first
+    assert second.title == "a"
+    queue.next()
+    assert queue.current_music is not second
+    assert not queue.theres_next()
+
+
+def test_set_last_as_current():
+    queue = make_queue("a", "b", "c")
+    queue.set_last_as_current()
+    assert queue.current_music.title == "c"
+    assert not queue.theres_next()
+
+    queue.enqueue("d", "", "", "", 60, 1)
+    assert queue.current_music.title == "c"
+    assert queue.peek_next().title == "d"
+
+
+def test_set_last_as_current_on_empty_queue():
+    queue = Queue()
+    queue.set_last_as_current()
+    assert queue.current_music is NO_TRACK
+
+
+def test_remove_last_moves_the_cursor_back():
+    queue = make_queue("a", "b")
+    queue.set_last_as_current()
+    queue.remove_last()
+    assert titles(queue.snapshot()) == ["a"]
+    assert queue.current_music.title == "a"
+
+    queue.remove_last()
+    assert queue.is_empty()
+    assert queue.current_music is NO_TRACK
+
+
+def test_clear_queue_except_current_at_the_start():
+    queue = make_queue("a", "b", "c")
+    queue.clear_queue_except_current()
+    assert titles(queue.snapshot()) == ["a"]
+    assert queue.current_music.title == "a"
+    assert not queue.theres_next()
+
+
+def test_clear_queue_except_current_at_the_end():
+    queue = make_queue("a", "b", "c")
+    queue.next()
+    queue.next()
+    queue.clear_queue_except_current()
+    assert titles(queue.snapshot()) == ["c"]
+    assert queue.current_music.title == "c"
+
+    queue.enqueue("d", "", "", "", 60, 1)
+    assert queue.peek_next().title == "d"
+
+
+def test_clear_queue_except_current_keeps_duplicates_out():
+    queue = make_queue("a", "b", "a")
+    queue.next()
+    queue.next()
+    current = queue.current_music
+    queue.clear_queue_except_current()
+    assert queue.snapshot() == (current,)
+
+
+def test_clear_queue():
+    queue = make_queue("a", "b")
+    queue.next()
+    queue.clear_queue()
+    assert queue.is_empty()
+    assert queue.current_music is NO_TRACK
+
+    queue.enqueue("c", "", "", "", 60, 1)
+    assert queue.current_music.title == "c"
+
+
+def test_dequeue():
+    queue = make_queue("a", "b")
+    queue.dequeue()
+    assert queue.current_music.title == "b"
+    queue.dequeue()
+    assert queue.is_empty()
+    assert queue.current_music is NO_TRACK
+
+
+def test_snapshot_is_not_affected_by_later_changes():
+    queue = make_queue("a", "b")
+    snapshot = queue.snapshot()
+    queue.enqueue("c", "", "", "", 60, 1)
+    queue.next()
+    queue.clear_queue_except_current()
+    assert titles(snapshot) == ["a", "b"]
+    assert titles(queue.snapshot()) == ["b"]
@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+from discord.ext import commands
+
+import bot.utils.custom_paginator as Paginator
+from bot.cogs.music_cog import Music
+
+GUILD_ID = 10
+VOICE_CHANNEL_ID = 20
+COLOR = 0x123456
+
+
+class FakeMessage:
+    def __init__(self):
+        self.reactions = []
+
+    async def add_reaction(self, emoji):
+        self.reactions.append(emoji)
+
+
+class FakeContext:
+    """
+    The parts of commands.Context the .queue command uses, for a user next to the connected bot.
+    """
+
+    def __init__(self):
+        voice_channel = SimpleNamespace(id=VOICE_CHANNEL_ID)
+        self.guild = SimpleNamespace(id=GUILD_ID, me=SimpleNamespace(voice=SimpleNamespace(channel=voice_channel)))
+        self.voice_client = SimpleNamespace(is_connected=lambda: True)
+        self.author = SimpleNamespace(id=1, voice=SimpleNamespace(channel=voice_channel))
+        self.message = FakeMessage()
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """
+    Keeps the cog away from the track catalog, the command trace, the audio cache and the voice workers.
+    Returns the arguments the paginator is started with.
+    """
+    monkeypatch.setenv("TRACK_CATALOG_PATH", "")
+    monkeypatch.setenv("COMMAND_TRACE_PATH", "")
+    monkeypatch.setenv("VOICE_WORKERS", "0")
+    monkeypatch.delenv("AUDIO_CACHE_DIR", raising=False)
+
+    started = []
+
+    async def start(self, ctx, pages=None, page_provider=None, page_count=None):
+        started.append(SimpleNamespace(page_provider=page_provider, page_count=page_count))
+    monkeypatch.setattr(Paginator.CustomPaginator, "start", start)
+    return started
+
+
+def run_queue_command(song_count):
+    """
+    Runs .queue with a queue of `song_count` songs.
+
+    :return: tuple - (FakeContext, video IDs passed to the color service)
+    """
+    async def scenario():
+        music = Music(commands.Bot(command_prefix=".", intents=discord.Intents.none()))
+        colored = []
+
+        async def color(image_url, video_id=None, default=None):
+            colored.append((image_url, video_id))
+            return COLOR
+        music.colors.get = color
+
+        session = music.sessions.create(GUILD_ID, VOICE_CHANNEL_ID)
+        for index in range(song_count):
+            session.q.enqueue(
+                f"Song {index + 1}", f"stream/{index}", f"thumb/{index}", f"watch/{index}", 60 + index, 1,
+                music_video_id=f"video{index}", music_color_thumb=f"small/{index}",
+            )
+
+        ctx = FakeContext()
+        try:
+            await music.queue.callback(music, ctx)
+        finally:
+            await music.cog_unload()
+        return ctx, colored
+
+    return asyncio.run(scenario())
+
+
+def test_queue_renders_its_page(offline):
+    ctx, colored = run_queue_command(3)
+
+    assert len(offline) == 1
+    paginator = offline[0]
+    assert paginator.page_count == 1
+
+    embed = paginator.page_provider(0)
+    assert embed.color.value == COLOR
+    assert embed.thumbnail.url == "thumb/0"
+    assert "**1.** Song 1" in embed.description
+    assert "**3.** Song 3" in embed.description
+    assert f"Channel: <#{VOICE_CHANNEL_ID}>" in embed.description
+    assert embed.footer.text == "Page 1/1 · 3 songs"
+
+    assert colored == [("small/0", "video0")]  # Smallest thumbnail, cached by video ID
+    assert ctx.message.reactions == ["📜"]
+
+
+@pytest.mark.parametrize("page, first, last", [(0, 1, 10), (1, 11, 20), (2, 21, 23)])
+def test_queue_pages_are_rendered_on_demand(offline, page, first, last):
+    run_queue_command(23)
+    paginator = offline[0]
+    assert paginator.page_count == 3
+
+    embed = paginator.page_provider(page)
+    numbers = [int(line[2:line.index(".**")]) for line in embed.description.split("\n") if line.startswith("**")]
+    assert numbers == list(range(first, last + 1))
+    assert f"**{first}.** Song {first}" in embed.description
+    assert f"**{last}.** Song {last}" in embed.description
+    assert embed.thumbnail.url == "thumb/0"  # The first song's, on every page
+    assert embed.footer.text == f"Page {page + 1}/3 · 23 songs"
+
+
+def test_empty_queue(offline):
+    ctx, _ = run_queue_command(0)
+    assert offline == []
+    assert ctx.sent == ["*The queue is currently empty.*"]
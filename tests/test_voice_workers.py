@@ -0,0 +1,287 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import bot.utils.voice_workers as voice_workers
+from bot.utils.voice_workers import VoiceWorkerPool, read_message, write_message
+
+GUILD_ID = 10
+CHANNEL_ID = 20
+
+# Seconds a test waits for a message or an event before failing.
+TIMEOUT = 5
+
+
+class FakeWorker:
+    """
+    Speaks the worker side of the IPC in the test's event loop: answers requests,
+    and lets the test read the ops it received and send events.
+    """
+
+    def __init__(self, index, socket_path):
+        self.index = index
+        self.socket_path = socket_path
+        self.received = asyncio.Queue()
+        self.silent = set()  # Ops left unanswered
+        self.writer = None
+
+    async def run(self):
+        reader, self.writer = await asyncio.open_unix_connection(self.socket_path)
+        write_message(self.writer, {"worker": self.index, "pid": os.getpid()})
+        try:
+            while True:
+                message = await read_message(reader)
+                self.received.put_nowait(message)
+                if "id" in message and message['op'] not in self.silent:
+                    write_message(self.writer, {"ev": "reply", "id": message['id'], "error": None})
+        except asyncio.IncompleteReadError:
+            pass
+
+    async def expect(self, op):
+        """
+        Returns the next message with this op, skipping the others.
+        """
+        while True:
+            message = await asyncio.wait_for(self.received.get(), TIMEOUT)
+            if message['op'] == op:
+                return message
+
+    def notify(self, event, guild_id, **fields):
+        write_message(self.writer, dict(fields, ev=event, guild=guild_id))
+
+
+class FakeProcess:
+    """
+    Stands in for a worker process: runs a FakeWorker instead, and exits on crash().
+    """
+
+    def __init__(self, target, args, name, daemon):
+        index, socket_path, _ = args
+        self.worker = FakeWorker(index, socket_path)
+        self.pid = os.getpid()
+        self.exitcode = None
+        self.sentinel, self._exit_pipe = os.pipe()  # Readable once the "process" ends, like a real sentinel
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self.worker.run())
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def join(self, timeout=None):
+        pass
+
+    def terminate(self):
+        self.crash()
+
+    def crash(self):
+        if self.exitcode is None:
+            self.exitcode = -9
+            self._task.cancel()
+            if self.worker.writer is not None:
+                self.worker.writer.close()
+            os.close(self._exit_pipe)
+
+
+class FakeContext:
+    def __init__(self):
+        self.processes = []
+
+    def Process(self, **kwargs):
+        process = FakeProcess(**kwargs)
+        self.processes.append(process)
+        return process
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = GUILD_ID
+        self.voice_states = asyncio.Queue()  # Channel IDs asked by change_voice_state (None to leave)
+
+    def get_channel(self, channel_id):
+        return FakeChannel(channel_id, self)
+
+    async def change_voice_state(self, *, channel, self_deaf=False, self_mute=False):
+        self.voice_states.put_nowait(channel.id if channel is not None else None)
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.guild = guild
+
+    def _get_voice_client_key(self):
+        return self.guild.id, "guild_id"
+
+
+def make_client():
+    return SimpleNamespace(user=SimpleNamespace(id=1), _connection=SimpleNamespace(_remove_voice_client=lambda key: None))
+
+
+def current_worker(context, index):
+    """
+    Returns the FakeWorker running as worker `index` (the latest one, after restarts).
+    """
+    return [process for process in context.processes if process.worker.index == index][-1].worker
+
+
+async def eventually(predicate):
+    for _ in range(TIMEOUT * 100):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met in time")
+
+
+async def start_pool(socket_path, size=1):
+    pool = VoiceWorkerPool(size, str(socket_path))
+    context = FakeContext()
+    pool._context = context
+    await pool.start()
+    return pool, context
+
+
+async def connect(pool, context):
+    guild = FakeGuild()
+    voice = pool.voice_client(make_client(), guild.get_channel(CHANNEL_ID))
+    connecting = asyncio.create_task(voice.connect(timeout=30.0, reconnect=True, self_deaf=True))
+    await eventually(lambda: voice.worker is not None)
+    message = await current_worker(context, voice.worker).expect("connect")
+    await connecting
+    return voice, guild, message
+
+
+def ended_with(errors):
+    """
+    Returns an `after` function appending the song's error to a list.
+    """
+    return lambda error: errors.append(error)
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, TIMEOUT * 4))
+
+
+def test_connect_assigns_the_guild_to_a_worker(tmp_path):
+    async def scenario():
+        pool, context = await start_pool(tmp_path / "voice.sock", size=2)
+        voice, guild, message = await connect(pool, context)
+
+        assert message['guild'] == GUILD_ID
+        assert message['channel'] == CHANNEL_ID
+        assert message['self_deaf'] is True
+        assert voice.is_connected()
+        assert voice.worker is not None
+        assert sorted(pool.load().values()) == [0, 1]
+
+        # The worker asks the bot, which owns the gateway, to join the channel
+        current_worker(context, voice.worker).notify(
+            "change_voice_state", GUILD_ID, channel=CHANNEL_ID, self_deaf=True, self_mute=False
+        )
+        assert await asyncio.wait_for(guild.voice_states.get(), TIMEOUT) == CHANNEL_ID
+        await pool.close()
+
+    run(scenario())
+
+
+def test_play_reports_the_end_of_the_song(tmp_path):
+    async def scenario():
+        pool, context = await start_pool(tmp_path / "voice.sock")
+        voice, _, _ = await connect(pool, context)
+        worker = context.processes[0].worker
+
+        source = pool.prepare_stream(GUILD_ID, "https://example.com/stream", channel_bitrate=64000)
+        prepared = await worker.expect("prepare")
+        assert prepared['token'] == source.token
+        assert prepared['source']['url'] == "https://example.com/stream"
+
+        errors = []
+        voice.play(source, after=ended_with(errors))
+        play = await worker.expect("play")
+        assert play['token'] == source.token
+        assert voice.is_playing()
+        with pytest.raises(discord.ClientException):
+            voice.play(pool.prepare_stream(GUILD_ID, "https://example.com/other"), after=None)
+
+        worker.notify("ended", GUILD_ID, seq=play['seq'], error=None)
+        await eventually(lambda: errors)
+        assert errors == [None]
+        assert not voice.is_playing()
+        await pool.close()
+
+    run(scenario())
+
+
+def test_stop_ends_the_song_once_the_worker_reports_it(tmp_path):
+    async def scenario():
+        pool, context = await start_pool(tmp_path / "voice.sock")
+        voice, _, _ = await connect(pool, context)
+        worker = context.processes[0].worker
+
+        errors = []
+        voice.play(pool.prepare_file(GUILD_ID, "/cache/song.opus"), after=ended_with(errors))
+        play = await worker.expect("play")
+
+        voice.stop()
+        await worker.expect("stop")
+        assert not voice.is_playing()
+        assert errors == []  # Not until the worker reports the end
+
+        worker.notify("ended", GUILD_ID, seq=play['seq'], error=None)
+        await eventually(lambda: errors)
+        assert errors == [None]
+        await pool.close()
+
+    run(scenario())
+
+
+def test_unplayed_source_is_released_in_the_worker(tmp_path):
+    async def scenario():
+        pool, context = await start_pool(tmp_path / "voice.sock")
+        await connect(pool, context)
+        worker = context.processes[0].worker
+
+        source = pool.prepare_stream(GUILD_ID, "https://example.com/stream")
+        source.cleanup()
+        source.cleanup()
+        released = await worker.expect("release")
+        assert released['token'] == source.token
+        await pool.close()
+
+    run(scenario())
+
+
+def test_worker_crash_ends_the_song_and_restarts_the_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(voice_workers, "WORKER_RESTART_DELAY", 0)
+
+    async def scenario():
+        pool, context = await start_pool(tmp_path / "voice.sock")
+        voice, guild, _ = await connect(pool, context)
+        process = context.processes[0]
+
+        errors = []
+        voice.play(pool.prepare_stream(GUILD_ID, "https://example.com/stream"), after=ended_with(errors))
+        await process.worker.expect("play")
+        process.worker.silent.add("move")
+        moving = asyncio.create_task(pool.request(pool._workers[0], {"op": "move", "guild": GUILD_ID}, 30.0))
+        await process.worker.expect("move")
+
+        process.crash()
+
+        assert await moving == "The voice worker exited"
+        await eventually(lambda: errors)
+        assert isinstance(errors[0], discord.ClientException)
+        assert not voice.is_connected()
+        assert await asyncio.wait_for(guild.voice_states.get(), TIMEOUT) is None  # The bot leaves the channel
+        assert pool.load() == {(0,): 0}
+
+        await eventually(lambda: len(context.processes) == 2 and pool._workers[0].connected.is_set())
+        voice, _, _ = await connect(pool, context)  # The restarted worker takes new connections
+        assert voice.is_connected()
+        await pool.close()
+
+    run(scenario())